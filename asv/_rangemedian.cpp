@@ -5,10 +5,12 @@
 //    mu(l, r) = median(y[l:r+1])
 //    dist(l, r) = sum(abs(x - mu(l, r)) for x in y[l:r+1])
 //
-// and an implementation of the find-best-partition dynamic program.
+// and implementations of the find-best-partition dynamic program, and its
+// pruned (PELT) variant.
 //
-// We don't implement a rolling median computation, on the assumption that
-// accesses are concentrated on small windows in the data.
+// Apart from the PELT recursion, we don't implement a range median data
+// structure, on the assumption that accesses are concentrated on small
+// windows in the data.
 
 #include <vector>
 #include <queue>
@@ -79,6 +81,156 @@ void compute_weighted_median(const_iterator start, const_iterator end,
 }
 
 
+//
+// Weighted median and distance of ranges of a dataset, in O(log n) time.
+//
+// The points are ranked by value, and a persistent segment tree over the
+// ranks is built from the prefixes of the dataset: version k holds the
+// weight and weighted value sums of the first k points in each rank
+// range.  The difference of two versions gives the sums for a range of
+// the dataset, from which the median (as in compute_weighted_median) and
+// the distance are found by descending the tree.  The tree takes
+// O(n log n) memory.
+//
+
+class PrefixMedianTree
+{
+private:
+    struct Node
+    {
+        size_t left, right, count;
+        double w, s;
+    };
+
+    std::vector<Node> nodes_;
+    std::vector<size_t> roots_;
+    std::vector<double> values_;
+    size_t size_;
+
+    size_t insert(size_t prev, size_t lo, size_t hi, size_t rank, double w, double s) {
+        Node node = nodes_[prev];
+        node.count += 1;
+        node.w += w;
+        node.s += s;
+        if (lo < hi) {
+            size_t mid = lo + (hi - lo) / 2;
+            if (rank <= mid) {
+                node.left = insert(node.left, lo, mid, rank, w, s);
+            }
+            else {
+                node.right = insert(node.right, mid + 1, hi, rank, w, s);
+            }
+        }
+        nodes_.push_back(node);
+        return nodes_.size() - 1;
+    }
+
+    // Rank of the k-th smallest (0-based) point in the range
+    size_t select(size_t a, size_t b, size_t k) const {
+        size_t lo = 0, hi = size_ - 1;
+        while (lo < hi) {
+            size_t mid = lo + (hi - lo) / 2;
+            size_t count = nodes_[nodes_[a].left].count - nodes_[nodes_[b].left].count;
+            if (k < count) {
+                a = nodes_[a].left;
+                b = nodes_[b].left;
+                hi = mid;
+            }
+            else {
+                k -= count;
+                a = nodes_[a].right;
+                b = nodes_[b].right;
+                lo = mid + 1;
+            }
+        }
+        return lo;
+    }
+
+public:
+    PrefixMedianTree(const std::vector<std::pair<double,double> > &y) : size_(y.size()) {
+        std::vector<size_t> order(size_);
+        for (size_t k = 0; k < size_; ++k) {
+            order[k] = k;
+        }
+        std::sort(order.begin(), order.end(), [&y](size_t i, size_t j) {
+            return y[i] < y[j];
+        });
+
+        std::vector<size_t> ranks(size_);
+        values_.resize(size_);
+        for (size_t k = 0; k < size_; ++k) {
+            ranks[order[k]] = k;
+            values_[k] = y[order[k]].first;
+        }
+
+        size_t depth = 1;
+        while (((size_t)1 << (depth - 1)) < size_) {
+            ++depth;
+        }
+
+        // Node 0 is the empty tree, which is its own child
+        nodes_.reserve(1 + size_ * depth);
+        nodes_.push_back(Node{0, 0, 0, 0, 0});
+        roots_.push_back(0);
+        for (size_t k = 0; k < size_; ++k) {
+            double w = y[k].second;
+            roots_.push_back(insert(roots_.back(), 0, size_ - 1, ranks[k], w, w * y[k].first));
+        }
+    }
+
+    void get(size_t left, size_t right, double *mu, double *dist) const {
+        size_t a = roots_[right + 1], b = roots_[left];
+        size_t count = nodes_[a].count - nodes_[b].count;
+        double w_tot = nodes_[a].w - nodes_[b].w;
+        double s_tot = nodes_[a].s - nodes_[b].s;
+        double midpoint = w_tot / 2;
+
+        if (count == 0) {
+            *mu = 0;
+            *dist = 0;
+            return;
+        }
+
+        // Find the first rank where the cumulative weight reaches the
+        // midpoint, accumulating the sums up to and including it
+        size_t lo = 0, hi = size_ - 1, count_lo = 0;
+        double w_lo = 0, s_lo = 0;
+        while (lo < hi) {
+            size_t mid = lo + (hi - lo) / 2;
+            const Node &la = nodes_[nodes_[a].left], &lb = nodes_[nodes_[b].left];
+            size_t c_left = la.count - lb.count;
+            size_t c_right = nodes_[nodes_[a].right].count - nodes_[nodes_[b].right].count;
+            double w_left = la.w - lb.w;
+            if (c_left > 0 && (c_right == 0 || w_lo + w_left >= midpoint)) {
+                a = nodes_[a].left;
+                b = nodes_[b].left;
+                hi = mid;
+            }
+            else {
+                count_lo += c_left;
+                w_lo += w_left;
+                s_lo += la.s - lb.s;
+                a = nodes_[a].right;
+                b = nodes_[b].right;
+                lo = mid + 1;
+            }
+        }
+        count_lo += 1;
+        w_lo += nodes_[a].w - nodes_[b].w;
+        s_lo += nodes_[a].s - nodes_[b].s;
+
+        *mu = values_[lo];
+        if (w_lo == midpoint && count_lo < count) {
+            size_t next = select(roots_[right + 1], roots_[left], count_lo);
+            *mu = (values_[next] + *mu) / 2;
+        }
+
+        double w_hi = w_tot - w_lo, s_hi = s_tot - s_lo;
+        *dist = std::max(0.0, (*mu * w_lo - s_lo) + (s_hi - *mu * w_hi));
+    }
+};
+
+
 //
 // Cache for cache[left,right] == (mu, dist)
 //
@@ -124,9 +276,7 @@ typedef struct {
     PyObject_HEAD
     std::vector<std::pair<double,double> > *y;
     Cache *cache;
-#ifdef Py_GIL_DISABLED
     std::mutex *use_mtx;
-#endif
 } RangeMedianObject;
 
 #define RangeMedianObject_CAST(op)  ((RangeMedianObject *)(op))
@@ -141,7 +291,6 @@ PyObject *RangeMedian_new(PyTypeObject *type, PyObject *args, PyObject *kwds)
     }
     self->y = NULL;
     self->cache = NULL;
-#ifdef Py_GIL_DISABLED
     self->use_mtx = NULL;
     try {
         self->use_mtx = new std::mutex();
@@ -152,12 +301,12 @@ PyObject *RangeMedian_new(PyTypeObject *type, PyObject *args, PyObject *kwds)
         free((PyObject*)self);
         return NULL;
     }
-#endif
     return (PyObject*)self;
 }
 
 
-#ifdef Py_GIL_DISABLED
+// The partition computations release the GIL, so concurrent use of
+// the same object must be guarded against also when the GIL is enabled.
 class RangeMedianUseGuard
 {
 private:
@@ -183,7 +332,6 @@ RangeMedian_try_acquire_use_lock(RangeMedianObject *self, RangeMedianUseGuard *g
     }
     return true;
 }
-#endif
 
 
 int RangeMedian_init(PyObject *op, PyObject *args, PyObject *kwds)
@@ -199,12 +347,10 @@ int RangeMedian_init(PyObject *op, PyObject *args, PyObject *kwds)
         return -1;
     }
 
-#ifdef Py_GIL_DISABLED
     RangeMedianUseGuard guard(self->use_mtx);
     if (!RangeMedian_try_acquire_use_lock(self, &guard)) {
         return -1;
     }
-#endif
 
     size = PyList_Size(y_obj);
     wsize = PyList_Size(w_obj);
@@ -281,9 +427,10 @@ static void RangeMedian_finalize(void *op)
     RangeMedianObject *self = RangeMedianObject_CAST(op);
     delete self->y;
     delete self->cache;
-#ifdef Py_GIL_DISABLED
+    self->y = NULL;
+    self->cache = NULL;
     delete self->use_mtx;
-#endif
+    self->use_mtx = NULL;
 }
 
 
@@ -298,6 +445,17 @@ static void RangeMedian_dealloc(void *self)
 }
 
 
+// Does not need the GIL; throws std::bad_alloc on failure.
+static void RangeMedian_compute_mu_dist(RangeMedianObject *self, Py_ssize_t left, Py_ssize_t right,
+                                        double *mu, double *dist)
+{
+    if (!self->cache->get(left, right, mu, dist)) {
+        compute_weighted_median(self->y->begin() + left, self->y->begin() + right + 1, mu, dist);
+        self->cache->set(left, right, *mu, *dist);
+    }
+}
+
+
 static int RangeMedian_mu_dist(PyObject *op, Py_ssize_t left, Py_ssize_t right,
                                double *mu, double *dist)
 {
@@ -309,9 +467,12 @@ static int RangeMedian_mu_dist(PyObject *op, Py_ssize_t left, Py_ssize_t right,
         return -1;
     }
 
-    if (!self->cache->get(left, right, mu, dist)) {
-        compute_weighted_median(self->y->begin() + left, self->y->begin() + right + 1, mu, dist);
-        self->cache->set(left, right, *mu, *dist);
+    try {
+        RangeMedian_compute_mu_dist(self, left, right, mu, dist);
+    }
+    catch (const std::bad_alloc&) {
+        PyErr_SetString(PyExc_MemoryError, "Allocating memory failed");
+        return -1;
     }
 
     return 0;
@@ -327,13 +488,11 @@ static PyObject *RangeMedian_mu(PyObject *op, PyObject *args)
         return NULL;
     }
 
-#ifdef Py_GIL_DISABLED
     RangeMedianObject *self = RangeMedianObject_CAST(op);
     RangeMedianUseGuard guard(self->use_mtx);
     if (!RangeMedian_try_acquire_use_lock(self, &guard)) {
         return NULL;
     }
-#endif
 
     if (RangeMedian_mu_dist(op, left, right, &mu, &dist) == -1) {
         return NULL;
@@ -352,13 +511,11 @@ static PyObject *RangeMedian_dist(PyObject *op, PyObject *args)
         return NULL;
     }
 
-#ifdef Py_GIL_DISABLED
     RangeMedianObject *self = RangeMedianObject_CAST(op);
     RangeMedianUseGuard guard(self->use_mtx);
     if (!RangeMedian_try_acquire_use_lock(self, &guard)) {
         return NULL;
     }
-#endif
 
     if (RangeMedian_mu_dist(op, left, right, &mu, &dist) == -1) {
         return NULL;
@@ -379,12 +536,10 @@ static PyObject *RangeMedian_find_best_partition(PyObject *op, PyObject *args)
         return NULL;
     }
 
-#ifdef Py_GIL_DISABLED
     RangeMedianUseGuard guard(self->use_mtx);
     if (!RangeMedian_try_acquire_use_lock(self, &guard)) {
         return NULL;
     }
-#endif
 
     size = self->y->size();
 
@@ -399,26 +554,127 @@ static PyObject *RangeMedian_find_best_partition(PyObject *op, PyObject *args)
     std::vector<double> B(max_pos - min_pos + 1);
     std::vector<Py_ssize_t> p(max_pos - min_pos);
 
+    bool failed = false;
+
     B[0] = -gamma;
 
-    for (Py_ssize_t right = min_pos; right < max_pos; ++right) {
-        B[right + 1 - min_pos] = inf;
+    Py_BEGIN_ALLOW_THREADS
+    try {
+        for (Py_ssize_t right = min_pos; right < max_pos; ++right) {
+            B[right + 1 - min_pos] = inf;
+
+            Py_ssize_t aa = std::max(right + 1 - max_size, min_pos);
+            Py_ssize_t bb = std::max(right + 1 - min_size + 1, min_pos);
+            for (Py_ssize_t left = aa; left < bb; ++left) {
+                double mu, dist;
+                RangeMedian_compute_mu_dist(self, left, right, &mu, &dist);
+
+                double b = B[left - min_pos] + gamma + dist;
+                if (b <= B[right + 1 - min_pos]) {
+                    B[right + 1 - min_pos] = b;
+                    p[right - min_pos] = left - 1;
+                }
+            }
+        }
+    }
+    catch (const std::bad_alloc&) {
+        failed = true;
+    }
+    Py_END_ALLOW_THREADS
+
+    if (failed) {
+        PyErr_SetString(PyExc_MemoryError, "Allocating memory failed");
+        return NULL;
+    }
+
+    PyObject *p_list;
 
-        Py_ssize_t aa = std::max(right + 1 - max_size, min_pos);
-        Py_ssize_t bb = std::max(right + 1 - min_size + 1, min_pos);
-        for (Py_ssize_t left = aa; left < bb; ++left) {
-            double mu, dist;
-            if (RangeMedian_mu_dist(op, left, right, &mu, &dist) == -1) {
-                return NULL;
+    p_list = PyList_New(p.size());
+    if (p_list == NULL) {
+        return NULL;
+    }
+
+    for (Py_ssize_t k = 0; k < (Py_ssize_t)p.size(); ++k) {
+        PyObject *num = PyLong_FromSsize_t(p[k]);
+        if (num == NULL) {
+            Py_DECREF(p_list);
+            return NULL;
+        }
+        PyList_SetItem(p_list, k, num);
+    }
+
+    return p_list;
+}
+
+
+static PyObject *RangeMedian_find_best_partition_pelt(PyObject *op, PyObject *args)
+{
+    RangeMedianObject *self = RangeMedianObject_CAST(op);
+    double gamma;
+
+    if (!PyArg_ParseTuple(args, "d", &gamma)) {
+        return NULL;
+    }
+
+    RangeMedianUseGuard guard(self->use_mtx);
+    if (!RangeMedian_try_acquire_use_lock(self, &guard)) {
+        return NULL;
+    }
+
+    const std::vector<std::pair<double,double> > &y = *self->y;
+    Py_ssize_t size = y.size();
+    double inf = std::numeric_limits<double>::infinity();
+
+    std::vector<double> B(size + 1);
+    std::vector<Py_ssize_t> p(size);
+    bool failed = false;
+
+    Py_BEGIN_ALLOW_THREADS
+    try {
+        PrefixMedianTree tree(y);
+        std::vector<Py_ssize_t> candidates(1, 0);
+        std::vector<double> costs;
+
+        B[0] = -gamma;
+
+        for (Py_ssize_t right = 0; right < size; ++right) {
+            costs.resize(candidates.size());
+            for (size_t j = 0; j < candidates.size(); ++j) {
+                double mu, dist;
+
+                tree.get(candidates[j], right, &mu, &dist);
+                costs[j] = B[candidates[j]] + dist;
             }
 
-            double b = B[left - min_pos] + gamma + dist;
-            if (b <= B[right + 1 - min_pos]) {
-                B[right + 1 - min_pos] = b;
-                p[right - min_pos] = left - 1;
+            B[right + 1] = inf;
+            for (size_t j = 0; j < candidates.size(); ++j) {
+                double b = costs[j] + gamma;
+                if (b <= B[right + 1]) {
+                    B[right + 1] = b;
+                    p[right] = candidates[j] - 1;
+                }
             }
+
+            // Prune left edges that cannot become optimal
+            size_t k = 0;
+            for (size_t j = 0; j < candidates.size(); ++j) {
+                if (costs[j] <= B[right + 1]) {
+                    candidates[k++] = candidates[j];
+                }
+            }
+            candidates.resize(k);
+            candidates.push_back(right + 1);
         }
     }
+    catch (const std::bad_alloc&) {
+        failed = true;
+    }
+    Py_END_ALLOW_THREADS
+
+    if (failed) {
+        PyErr_SetString(PyExc_MemoryError, "Allocating memory failed");
+        return NULL;
+    }
 
     PyObject *p_list;
 
@@ -448,6 +704,7 @@ static PyMethodDef RangeMedian_methods[] = {
     {"mu", (PyCFunction)RangeMedian_mu, METH_VARARGS, NULL},
     {"dist", (PyCFunction)RangeMedian_dist, METH_VARARGS, NULL},
     {"find_best_partition", (PyCFunction)RangeMedian_find_best_partition, METH_VARARGS, NULL},
+    {"find_best_partition_pelt", (PyCFunction)RangeMedian_find_best_partition_pelt, METH_VARARGS, NULL},
     {NULL, NULL}
 };
 
@@ -2,6 +2,9 @@
 
 # Author: Pauli Virtanen, 2016
 
+import bisect
+import collections
+import functools
 import math
 from operator import index
 
@@ -43,18 +46,124 @@ def is_different(samples_a, samples_b, stats_a, stats_b, p_threshold=0.002):
         Input stats data
 
     """
+    p = _get_mann_whitney_u_p(samples_a, samples_b, p_threshold)
+    if p is not None:
+        return p < p_threshold
 
-    if samples_a is not None and samples_b is not None:
-        # Raw data present: Mann-Whitney U test, but only if there's
-        # enough data so that the test can return True
-        a = [x for x in samples_a if not math.isnan(x)]
-        b = [x for x in samples_b if not math.isnan(x)]
+    return _is_ci_different(stats_a, stats_b)
 
-        p_min = 1 / binom(len(a) + len(b), min(len(a), len(b)))
-        if p_min < p_threshold:
-            _, p = mann_whitney_u(a, b)
-            return p < p_threshold
 
+def is_different_batch(items, p_threshold=0.002, fdr=None):
+    """Check whether each of several pairs of samples is statistically different.
+
+    Same as `is_different` applied to each item, except that if `fdr`
+    is given, the false discovery rate among the items decided by the
+    Mann-Whitney U test is controlled with the Benjamini-Hochberg
+    procedure :cite:empty:`isdb-benjaminiControllingFalseDiscovery1995`.
+
+    Parameters
+    ----------
+    items : iterable of (samples_a, samples_b, stats_a, stats_b)
+        Inputs, as for `is_different`
+    p_threshold : float, optional
+        Threshold for the p-value, if `fdr` is not given.
+    fdr : float, optional
+        Threshold for the Benjamini-Hochberg adjusted p-values.
+
+    Returns
+    -------
+    results : list of (different, p, p_adjusted)
+        Whether the samples are different, and the p-value and the
+        adjusted p-value. The p-values are None for items checked based
+        on the confidence intervals.
+
+    References
+    ----------
+    .. bibliography::
+       :filter: docname in docnames
+       :labelprefix: ISDB_
+       :keyprefix: isdb-
+
+    """
+    threshold = p_threshold if fdr is None else fdr
+
+    p_values = []
+    ci_different = []
+    for samples_a, samples_b, stats_a, stats_b in items:
+        p = _get_mann_whitney_u_p(samples_a, samples_b, threshold)
+        p_values.append(p)
+        if p is None:
+            ci_different.append(_is_ci_different(stats_a, stats_b))
+        else:
+            ci_different.append(None)
+
+    tested = [j for j, p in enumerate(p_values) if p is not None]
+    adjusted = benjamini_hochberg([p_values[j] for j in tested])
+    p_adjusted = [None] * len(p_values)
+    for j, q in zip(tested, adjusted):
+        p_adjusted[j] = q
+
+    results = []
+    for p, q, different in zip(p_values, p_adjusted, ci_different):
+        if p is not None:
+            if fdr is None:
+                different = p < p_threshold
+            else:
+                different = q < fdr
+        results.append((different, p, q))
+
+    return results
+
+
+def benjamini_hochberg(p_values):
+    """
+    Benjamini-Hochberg adjusted p-values.
+
+    The hypotheses with adjusted p-value below q are the ones rejected
+    by the Benjamini-Hochberg procedure at false discovery rate q.
+
+    Parameters
+    ----------
+    p_values : list of float
+        p-values
+
+    Returns
+    -------
+    p_adjusted : list of float
+        Adjusted p-values, in the same order.
+
+    """
+    n = len(p_values)
+    order = sorted(range(n), key=lambda j: p_values[j])
+    p_adjusted = [None] * n
+    q_min = 1.0
+    for rank in range(n, 0, -1):
+        j = order[rank - 1]
+        q_min = min(q_min, p_values[j] * n / rank)
+        p_adjusted[j] = q_min
+    return p_adjusted
+
+
+def _get_mann_whitney_u_p(samples_a, samples_b, p_threshold):
+    """
+    Mann-Whitney U p-value for the samples, or None if samples are
+    missing or too small for the test to give p < p_threshold.
+    """
+    if samples_a is None or samples_b is None:
+        return None
+
+    a = [x for x in samples_a if not math.isnan(x)]
+    b = [x for x in samples_b if not math.isnan(x)]
+
+    p_min = 1 / binom(len(a) + len(b), min(len(a), len(b)))
+    if p_min < p_threshold:
+        _, p = mann_whitney_u(a, b)
+        return p
+
+    return None
+
+
+def _is_ci_different(stats_a, stats_b):
     # If confidence intervals overlap, reject.
     # Corresponds to a test with ill-specified threshold p-value,
     # which generally can be significantly smaller than p <= 0.01
@@ -69,7 +178,9 @@ def is_different(samples_a, samples_b, stats_a, stats_b, p_threshold=0.002):
     return True
 
 
-_mann_whitney_u_memo = {}
+# Above this sample size, the p-value is computed from the normal
+# approximation in method='auto'
+MANN_WHITNEY_U_EXACT_MAX = 20
 
 
 def mann_whitney_u(x, y, method='auto'):
@@ -86,7 +197,9 @@ def mann_whitney_u(x, y, method='auto'):
         Samples to test
     method : {'auto', 'exact', 'normal'}
         Whether to compute p-value exactly of via normal approximation.
-        The option 'auto' switches to approximation for sample size > 20.
+        The option 'auto' switches to approximation for sample size >
+        `MANN_WHITNEY_U_EXACT_MAX`. The normal approximation includes
+        the tie correction to the variance.
 
     Returns
     -------
@@ -103,15 +216,11 @@ def mann_whitney_u(x, y, method='auto'):
        :keyprefix: mwu-
 
     """
-    memo = _mann_whitney_u_memo
-    if len(memo) > 100000:
-        memo.clear()
-
     m = len(x)
     n = len(y)
 
     if method == 'auto':
-        if max(m, n) > 20:
+        if max(m, n) > MANN_WHITNEY_U_EXACT_MAX:
             method = 'normal'
         else:
             method = 'exact'
@@ -133,15 +242,22 @@ def mann_whitney_u(x, y, method='auto'):
 
     # Get p-value
     if method == 'exact':
-        p1 = mann_whitney_u_cdf(m, n, ux, memo)
-        p2 = 1.0 - mann_whitney_u_cdf(m, n, max(m * n // 2, m * n - ux - 1), memo)
+        counts = _mann_whitney_u_counts(m, n)
+        total = counts[-1]
+        p1 = counts[ux] / total
+        p2 = (total - counts[max(m * n // 2, m * n - ux - 1)]) / total
         p = p1 + p2
     elif method == 'normal':
         N = m + n
-        var = m * n * (N + 1) / 12
-        z = (ux - m * n / 2) / math.sqrt(var)
-        cdf = 0.5 * math.erfc(-z / math.sqrt(2))
-        p = 2 * cdf
+        tie_term = sum(t**3 - t for t in collections.Counter(x + y).values() if t > 1)
+        var = m * n / 12 * ((N + 1) - tie_term / (N * (N - 1)))
+        if var > 0:
+            z = (ux - m * n / 2) / math.sqrt(var)
+            cdf = 0.5 * math.erfc(-z / math.sqrt(2))
+            p = 2 * cdf
+        else:
+            # All values equal
+            p = 1.0
     else:
         raise ValueError(f"Unknown method {method!r}")
 
@@ -149,30 +265,38 @@ def mann_whitney_u(x, y, method='auto'):
 
 
 def mann_whitney_u_u(x, y):
+    """
+    Number of pairs with x > y, and number of pairs with x == y.
+    Pairs containing nan are not counted.
+    """
+    y = sorted(yy for yy in y if not math.isnan(yy))
     u = 0
     ties = 0
     for xx in x:
-        for yy in y:
-            if xx > yy:
-                u += 1
-            elif xx == yy:
-                ties += 1
+        if math.isnan(xx):
+            continue
+        lo = bisect.bisect_left(y, xx)
+        hi = bisect.bisect_right(y, xx, lo)
+        u += lo
+        ties += hi - lo
     return u, ties
 
 
 def mann_whitney_u_cdf(m, n, u, memo=None):
-    if memo is None:
-        memo = {}
-    cdf = 0
-    for uu in range(u + 1):
-        cdf += mann_whitney_u_pmf(m, n, uu, memo)
-    return cdf
+    """
+    CDF of U for samples of sizes (m, n).
+
+    The `memo` argument is no longer used, and is accepted only for
+    backward compatibility.
+    """
+    if u < 0:
+        return 0.0
+    counts = _mann_whitney_u_counts(m, n)
+    return counts[min(u, m * n)] / counts[-1]
 
 
 def mann_whitney_u_pmf(m, n, u, memo=None):
-    if memo is None:
-        memo = {}
-    return mann_whitney_u_r(m, n, u, memo) / binom(m + n, m)
+    return mann_whitney_u_r(m, n, u) / binom(m + n, m)
 
 
 def mann_whitney_u_r(m, n, u, memo=None):
@@ -194,24 +318,45 @@ def mann_whitney_u_r(m, n, u, memo=None):
        :keyprefix: mwur-
 
     """
-    if u < 0:
-        value = 0
-    elif m == 0 or n == 0:
-        value = 1 if u == 0 else 0
-    else:
-        # Don't bother figuring out table construction, memoization
-        # sorts it out
-        if memo is None:
-            memo = {}
-        key = (m, n, u)
-        value = memo.get(key)
-        if value is not None:
-            return value
-
-        value = mann_whitney_u_r(m, n - 1, u, memo) + mann_whitney_u_r(m - 1, n, u - n, memo)
-
-        memo[key] = value
-    return value
+    if u < 0 or u > m * n:
+        return 0
+    counts = _mann_whitney_u_counts(m, n)
+    if u == 0:
+        return counts[0]
+    return counts[u] - counts[u - 1]
+
+
+@functools.lru_cache(maxsize=128)
+def _mann_whitney_u_counts(m, n):
+    """
+    Cumulative counts of orderings, ``sum(r(m, n, v) for v in range(u + 1))``,
+    for u = 0, ..., m*n.
+
+    The generating function of r(m, n, u) is the Gaussian binomial
+    coefficient, ``prod((1 - q**(n + i)) / (1 - q**i) for i in range(1, m + 1))``,
+    which is expanded here one factor at a time, in O(m**2 n) operations.
+    """
+    if m > n:
+        return _mann_whitney_u_counts(n, m)
+
+    size = m * n + 1
+    c = [1] + [0] * (size - 1)
+
+    for i in range(1, m + 1):
+        # Multiply by (1 - q**(n + i))
+        k = n + i
+        for v in range(size - 1, k - 1, -1):
+            c[v] -= c[v - k]
+
+        # Divide by (1 - q**i)
+        for v in range(i, size):
+            c[v] += c[v - i]
+
+    # Cumulative sum
+    for v in range(1, size):
+        c[v] += c[v - 1]
+
+    return tuple(c)
 
 
 def binom(n, k):
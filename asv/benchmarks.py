@@ -1,12 +1,15 @@
 # Licensed under a 3-clause BSD style license - see LICENSE.rst
 
 
+import hashlib
 import itertools
 import json
 import os
 import re
 import tempfile
 
+from importlib_metadata import version as get_version
+
 from . import runner, util
 from .console import log
 from .repo import NoSuchNameError
@@ -100,7 +103,9 @@ class Benchmarks(dict):
         return benchmarks
 
     @classmethod
-    def discover(cls, conf, repo, environments, commit_hash, regex=None, check=False):
+    def discover(
+        cls, conf, repo, environments, commit_hash, regex=None, check=False, rediscover=False
+    ):
         """
         Discover benchmarks in the given `benchmark_dir`.
 
@@ -126,12 +131,17 @@ class Benchmarks(dict):
         check : bool
             Run additional checks after discovery.
 
+        rediscover : bool
+            Ignore the ``discovery_cache``, and refresh it.
+
         """
-        benchmarks = cls._disc_benchmarks(conf, repo, environments, commit_hash, check)
+        benchmarks = cls._disc_benchmarks(
+            conf, repo, environments, commit_hash, check, rediscover=rediscover
+        )
         return cls(conf, benchmarks, regex=regex)
 
     @classmethod
-    def _disc_benchmarks(cls, conf, repo, environments, commit_hashes, check):
+    def _disc_benchmarks(cls, conf, repo, environments, commit_hashes, check, rediscover=False):
         """
         Discover all benchmarks in a directory tree.
         """
@@ -169,6 +179,10 @@ class Benchmarks(dict):
 
         try_hashes = iter_unique(iter_hashes())
 
+        # The cached list cannot be checked, as that needs the project
+        # installed
+        use_cache = getattr(conf, 'discovery_cache', False) and not check
+
         log.info("Discovering benchmarks")
         with log.indent():
             last_err = None
@@ -179,6 +193,16 @@ class Benchmarks(dict):
                     log.warning("Failed: trying different commit/environment")
                     log.debug("Failure due to: " + str(last_err))
 
+                cache_file = None
+                if use_cache and env.can_install_project():
+                    cache_file = cls._get_discovery_cache_file(conf, env, commit_hash)
+
+                if cache_file is not None and not rediscover:
+                    benchmarks = cls._load_discovery_cache(cache_file)
+                    if benchmarks is not None:
+                        log.info(f"Using cached benchmark list for {env.name}")
+                        break
+
                 result_dir = tempfile.mkdtemp()
                 try:
                     env.install_project(conf, repo, commit_hash)
@@ -206,6 +230,9 @@ class Benchmarks(dict):
                         log.error("Invalid discovery output")
                         raise util.UserError()
 
+                    if cache_file is not None:
+                        cls._save_discovery_cache(cache_file, benchmarks)
+
                     break
                 except (util.UserError, util.ProcessError) as err:
                     last_err = err
@@ -248,6 +275,68 @@ class Benchmarks(dict):
 
         return benchmarks
 
+    @classmethod
+    def _get_discovery_cache_file(cls, conf, env, commit_hash):
+        """
+        Get the discovery cache file for the given environment and
+        commit.  The key covers the contents of the benchmark directory,
+        the asv and asv_runner versions, the environment and the commit.
+        Returns None if the key cannot be determined.
+        """
+        root = os.path.abspath(conf.benchmark_dir)
+
+        try:
+            runner_version = env.run(
+                [
+                    '-c',
+                    'import importlib.metadata as m, sys; sys.stdout.write(m.version("asv_runner"))',
+                ],
+                dots=False,
+            )
+        except util.ProcessError:
+            return None
+
+        h = hashlib.sha256()
+        key = [root, get_version("asv"), runner_version, env.name, commit_hash]
+        h.update(json.dumps(key).encode('utf-8'))
+
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = sorted(name for name in dirnames if name != '__pycache__')
+            for filename in sorted(filenames):
+                path = os.path.join(dirpath, filename)
+                h.update(os.path.relpath(path, root).encode('utf-8') + b'\0')
+                with open(path, 'rb') as fd:
+                    h.update(hashlib.sha256(fd.read()).digest())
+
+        return os.path.join(conf.env_dir, 'asv-discovery-cache', h.hexdigest() + '.json')
+
+    @classmethod
+    def _load_discovery_cache(cls, cache_file):
+        if not os.path.isfile(cache_file):
+            return None
+        try:
+            benchmarks = util.load_json(cache_file, api_version=cls.api_version)['benchmarks']
+        except (util.UserError, KeyError):
+            return None
+        # Mark as recently used
+        os.utime(cache_file)
+        return benchmarks
+
+    @classmethod
+    def _save_discovery_cache(cls, cache_file, benchmarks, size=50):
+        cache_dir = os.path.dirname(cache_file)
+        os.makedirs(cache_dir, exist_ok=True)
+        util.write_json(cache_file, {'benchmarks': benchmarks}, api_version=cls.api_version)
+
+        # Keep only the most recently used entries
+        entries = sorted(
+            (os.path.join(cache_dir, fn) for fn in os.listdir(cache_dir) if fn.endswith('.json')),
+            key=os.path.getmtime,
+            reverse=True,
+        )
+        for path in entries[size:]:
+            os.unlink(path)
+
     @classmethod
     def check_tree(cls, root, require_init_py=True):
         """
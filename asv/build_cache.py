@@ -1,6 +1,10 @@
 # Licensed under a 3-clause BSD style license - see LICENSE.rst
 
+import contextlib
+import hashlib
+import json
 import os
+import shutil
 
 from . import util
 
@@ -18,11 +22,13 @@ class BuildCache:
     If the timestamp file is missing, the subdirectory is ignored (and
     subject to cleanup).
 
-    The cache cleanup retains the latest ``build_cache_size`` items
-    that have a valid timestamp file.
+    The cache cleanup retains the most recently used ``build_cache_size``
+    items that have a valid timestamp file, and whose total size does not
+    exceed ``build_cache_max_bytes`` (if set).
 
     The timestamp files are created by ``self.finalize_cache_dir(commit_hash)``,
-    which also triggers a cache cleanup.
+    which also triggers a cache cleanup.  Their modification time is
+    updated on each cache hit.
 
     The finalization should be called only after package is installed successfully,
     keeping in mind that ``build_cache_size`` may be 0.
@@ -33,6 +39,7 @@ class BuildCache:
         self._root = root
         self._path = os.path.join(root, 'asv-build-cache')
         self._cache_size = getattr(conf, 'build_cache_size', 2)
+        self._max_bytes = getattr(conf, 'build_cache_max_bytes', None)
 
     def _get_cache_dir(self, commit_hash):
         """
@@ -68,6 +75,38 @@ class BuildCache:
         names.sort(key=sort_key, reverse=True)
         return names
 
+    def _get_entries(self):
+        """
+        Return list of (name, size) of the complete cache entries, most
+        recently used first.
+        """
+        entries = []
+        for name in self._get_cache_contents():
+            path, stamp = self._get_cache_dir(name)
+            if os.path.isdir(path) and os.path.isfile(stamp):
+                entries.append((name, _get_tree_size(path)))
+        return entries
+
+    def _evict(self):
+        # Remove least recently used items, until within count and
+        # size limits
+        total_size = 0
+        for j, (name, size) in enumerate(self._get_entries()):
+            total_size += size
+            if j >= self._cache_size or (
+                self._max_bytes is not None and total_size > self._max_bytes
+            ):
+                if self._evict_cache_dir(name):
+                    total_size -= size
+
+    def _evict_cache_dir(self, name):
+        """
+        Remove a cache entry in the cleanup.  Returns whether it was
+        removed.
+        """
+        self._remove_cache_dir(name)
+        return True
+
     def _cleanup_build_cache(self):
         # First remove items without timestamp
         if os.path.isdir(self._path):
@@ -78,13 +117,20 @@ class BuildCache:
                     self._remove_cache_dir(name)
 
         # Then remove old items
-        names = self._get_cache_contents()
-        for name in names[self._cache_size :]:
-            self._remove_cache_dir(name)
+        self._evict()
+
+    def get_size(self):
+        """
+        Return the number of cached builds and their total size in bytes.
+        """
+        entries = self._get_entries()
+        return len(entries), sum(size for name, size in entries)
 
     def get_cache_dir(self, commit_hash):
         path, stamp = self._get_cache_dir(commit_hash)
         if os.path.isdir(path) and os.path.isfile(stamp) and os.listdir(path):
+            # Mark as recently used
+            os.utime(stamp)
             return path
 
         return None
@@ -96,6 +142,22 @@ class BuildCache:
         os.makedirs(path)
         return path
 
+    def add_cache_dir(self, commit_hash, src):
+        """
+        Move a directory with finished build results to the cache.  No
+        cache cleanup is done.
+        """
+        self._remove_cache_dir(commit_hash)
+
+        if not os.listdir(src):
+            return
+
+        path, stamp = self._get_cache_dir(commit_hash)
+        os.makedirs(self._path, exist_ok=True)
+        os.rename(src, path)
+        with open(stamp, 'wb'):
+            pass
+
     def finalize_cache_dir(self, commit_hash):
         path, stamp = self._get_cache_dir(commit_hash)
 
@@ -106,3 +168,157 @@ class BuildCache:
 
         # Cleanup build cache
         self._cleanup_build_cache()
+
+
+class GlobalBuildCache(BuildCache):
+    """
+    Build cache shared between environments
+
+    Data is cached in a directory tree::
+
+        {self._path}/
+            {self._path}/{key}/*
+            {self._path}/{key}.timestamp
+            {self._path}/{key}.lock
+
+    where ``key`` is computed by `get_key` from everything that
+    determines the build output.  Environments that differ only in
+    their runtime requirements share the same entries.
+
+    Files are linked (or copied, if hardlinks are not supported) between
+    the shared cache and the per-environment build caches.  Building an
+    entry is done while holding the lock on its key, so that concurrent
+    builds of the same key in different processes are done only once.
+    The cleanup skips entries whose lock is held by another process.
+
+    The cache cleanup retains the most recently used
+    ``global_build_cache_size`` items, within
+    ``global_build_cache_max_bytes`` (if set).
+
+    """
+
+    def __init__(self, conf):
+        self._root = os.path.abspath(conf.global_build_cache_dir)
+        self._path = self._root
+        self._cache_size = getattr(conf, 'global_build_cache_size', 20)
+        self._max_bytes = getattr(conf, 'global_build_cache_max_bytes', None)
+
+    @staticmethod
+    def get_key(commit_hash, abi_tag, requirements, build_env_vars, build_command, repo_subdir=""):
+        """
+        Compute the cache key for a build.
+        """
+        data = {
+            'commit_hash': commit_hash,
+            'abi_tag': abi_tag,
+            'requirements': sorted(requirements.items()),
+            'build_env_vars': sorted(build_env_vars.items()),
+            'build_command': build_command,
+            'repo_subdir': repo_subdir,
+        }
+        return hashlib.sha256(json.dumps(data, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def _cleanup_build_cache(self):
+        # Entries without timestamp may be in the process of being
+        # written by another process, so only old complete entries are
+        # removed.
+        self._evict()
+
+    def _evict_cache_dir(self, name):
+        # Another process may be fetching or storing the entry, so it
+        # is removed only if its lock is free
+        try:
+            with util.file_lock(os.path.join(self._path, name + '.lock'), blocking=False):
+                self._remove_cache_dir(name)
+        except BlockingIOError:
+            return False
+        return True
+
+    @contextlib.contextmanager
+    def lock(self, key):
+        """
+        Context manager holding an exclusive lock on the given key.
+        """
+        os.makedirs(self._path, exist_ok=True)
+        with util.file_lock(os.path.join(self._path, key + '.lock')):
+            yield
+
+    def fetch(self, key, dst):
+        """
+        Link the cached files for the given key to directory `dst`.
+
+        Returns
+        -------
+        success : bool
+            Whether the key was found in the cache.
+
+        """
+        try:
+            path = self.get_cache_dir(key)
+        except OSError:
+            return False
+
+        if path is None:
+            return False
+
+        try:
+            _link_tree(path, dst)
+        except OSError:
+            # Don't leave partially linked files behind
+            util.long_path_rmtree(dst)
+            os.makedirs(dst)
+            return False
+
+        return True
+
+    def store(self, key, src):
+        """
+        Add the files in directory `src` to the cache under the given key.
+        """
+        if not os.path.isdir(src) or not os.listdir(src):
+            return
+
+        path, stamp = self._get_cache_dir(key)
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        if os.path.isdir(tmp_path):
+            util.long_path_rmtree(tmp_path)
+
+        self._remove_cache_dir(key)
+        try:
+            _link_tree(src, tmp_path)
+            os.rename(tmp_path, path)
+        finally:
+            if os.path.isdir(tmp_path):
+                util.long_path_rmtree(tmp_path)
+        self.finalize_cache_dir(key)
+
+
+def _get_tree_size(path):
+    """
+    Total size in bytes of the files in a directory tree.
+    """
+    size = 0
+    for root, dirs, files in os.walk(path):
+        for fn in files:
+            try:
+                size += os.lstat(os.path.join(root, fn)).st_size
+            except OSError:
+                pass
+    return size
+
+
+def _link_tree(src, dst):
+    """
+    Recreate the directory tree `src` in `dst`, hardlinking files when
+    possible and copying them otherwise.
+    """
+    for root, dirs, files in os.walk(src):
+        dst_root = os.path.join(dst, os.path.relpath(root, src))
+        os.makedirs(dst_root, exist_ok=True)
+        for fn in files:
+            src_fn = os.path.join(root, fn)
+            dst_fn = os.path.join(dst_root, fn)
+            try:
+                os.link(src_fn, dst_fn)
+            except OSError:
+                shutil.copy2(src_fn, dst_fn)
@@ -13,6 +13,7 @@ command_order = [
     'Quickstart',
     'Machine',
     'Setup',
+    'Wheelhouse',
     'Run',
     'Continuous',
     'Find',
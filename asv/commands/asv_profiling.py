@@ -78,6 +78,7 @@ class Profile(Command):
         )
         common_args.add_environment(parser)
         common_args.add_launch_method(parser)
+        common_args.add_rediscover(parser)
 
         parser.set_defaults(func=cls.run_from_args)
 
@@ -101,6 +102,7 @@ class Profile(Command):
             force=args.force,
             env_spec=args.env_spec,
             launch_method=args.launch_method,
+            rediscover=args.rediscover,
             **kwargs,
         )
 
@@ -115,6 +117,7 @@ class Profile(Command):
         force=False,
         env_spec=None,
         launch_method=None,
+        rediscover=False,
         _machine_file=None,
     ):
         cls.find_guis()
@@ -199,7 +202,12 @@ class Profile(Command):
                 )
 
             benchmarks = Benchmarks.discover(
-                conf, repo, environments, [commit_hash], regex=f'^{benchmark}$'
+                conf,
+                repo,
+                environments,
+                [commit_hash],
+                regex=f'^{benchmark}$',
+                rediscover=rediscover,
             )
 
             if len(benchmarks) == 0:
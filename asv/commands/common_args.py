@@ -60,6 +60,26 @@ def add_compare(parser, only_changed_default=False, sort_default='name'):
         and the median result.""",
     )
 
+    parser.add_argument(
+        '--fdr',
+        type=float,
+        default=None,
+        metavar="Q",
+        help="""Control the false discovery rate among the statistically
+        tested results at level Q (e.g. 0.05), using the
+        Benjamini-Hochberg procedure, instead of using a fixed p-value
+        threshold for each result.""",
+    )
+
+    parser.add_argument(
+        '--json',
+        type=str,
+        default=None,
+        metavar="FILE",
+        help="""Also write the comparison results, including p-values,
+        as JSON to FILE.""",
+    )
+
     parser.add_argument(
         '--split',
         '-s',
@@ -87,6 +107,16 @@ def add_compare(parser, only_changed_default=False, sort_default='name'):
     )
 
 
+def add_rediscover(parser):
+    parser.add_argument(
+        "--rediscover",
+        action="store_true",
+        help="""Discover the benchmarks even if a cached benchmark list
+        is available (see the ``discovery_cache`` configuration option),
+        and update the cache.""",
+    )
+
+
 def add_show_stderr(parser):
     parser.add_argument(
         "--show-stderr",
@@ -164,29 +194,6 @@ def add_bench(parser):
         value = (int(min_repeat), int(max_repeat), float(max_time))
         return value
 
-    def parse_affinity(value):
-        if "," in value:
-            value = value.split(",")
-        else:
-            value = [value]
-
-        affinity_list = []
-        for v in value:
-            if "-" in v:
-                a, b = v.split("-", 1)
-                a = int(a)
-                b = int(b)
-                affinity_list.extend(range(a, b + 1))
-            else:
-                affinity_list.append(int(v))
-
-        num_cpu = multiprocessing.cpu_count()
-        for n in affinity_list:
-            if not (0 <= n < num_cpu):
-                raise ValueError(f"CPU {n!r} not in range 0-{num_cpu - 1!r}")
-
-        return affinity_list
-
     converters = {
         'timeout': float,
         'version': str,
@@ -196,7 +203,7 @@ def add_bench(parser):
         'rounds': int,
         'processes': ('rounds', int),  # backward compatibility
         'sample_time': float,
-        'cpu_affinity': parse_affinity,
+        'cpu_affinity': cpu_list,
     }
 
     parser.add_argument(
@@ -346,6 +353,33 @@ def add_record_samples(parser, record_default=False):
     )
 
 
+def cpu_list(value):
+    """
+    Parse a list of CPU numbers, in format 0 or 0,1,2 or 0-3.
+    """
+    if "," in value:
+        value = value.split(",")
+    else:
+        value = [value]
+
+    affinity_list = []
+    for v in value:
+        if "-" in v:
+            a, b = v.split("-", 1)
+            a = int(a)
+            b = int(b)
+            affinity_list.extend(range(a, b + 1))
+        else:
+            affinity_list.append(int(v))
+
+    num_cpu = multiprocessing.cpu_count()
+    for n in affinity_list:
+        if not (0 <= n < num_cpu):
+            raise ValueError(f"CPU {n!r} not in range 0-{num_cpu - 1!r}")
+
+    return affinity_list
+
+
 def positive_int(string):
     """
     Parse a positive integer argument
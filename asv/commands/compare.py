@@ -81,25 +81,39 @@ def _is_result_better(a, b, a_ss, b_ss, factor, use_stats=True):
 
     """
 
-    if (
-        use_stats
-        and a_ss
-        and b_ss
-        and a_ss[0]
-        and b_ss[0]
-        and (a_ss[0].get('repeat', 0) != 1 and b_ss[0].get('repeat', 0) != 1)
-    ):
+    if use_stats and _has_stats(a_ss, b_ss):
         # Return False if estimates don't differ.
-        #
-        # Special-case the situation with only one sample, in which
-        # case we do the comparison only based on `factor` as there's
-        # not enough data to do statistics.
         if not _stats.is_different(a_ss[1], b_ss[1], a_ss[0], b_ss[0]):
             return False
 
     return a < b / factor
 
 
+def _has_stats(a_ss, b_ss):
+    """
+    Check if the (stats, samples) of both results allow statistical
+    comparison.
+
+    Special-case the situation with only one sample, in which case the
+    comparison is done only based on `factor` as there's not enough
+    data to do statistics.
+    """
+    return bool(
+        a_ss
+        and b_ss
+        and a_ss[0]
+        and b_ss[0]
+        and (a_ss[0].get('repeat', 0) != 1 and b_ss[0].get('repeat', 0) != 1)
+    )
+
+
+def _json_value(value):
+    # None (failed) and NaN (skipped) are both null in JSON output
+    if _isna(value):
+        return None
+    return value
+
+
 class Compare(Command):
     @classmethod
     def setup_arguments(cls, subparsers):
@@ -143,6 +157,8 @@ class Compare(Command):
             machine=args.machine,
             env_spec=args.env_spec,
             use_stats=args.use_stats,
+            fdr=args.fdr,
+            json_path=args.json,
         )
 
     @classmethod
@@ -158,6 +174,8 @@ class Compare(Command):
         machine=None,
         env_spec=None,
         use_stats=True,
+        fdr=None,
+        json_path=None,
     ):
         repo = get_repo(conf)
         try:
@@ -212,6 +230,8 @@ class Compare(Command):
             machine=machine,
             env_names=env_names,
             commit_names=commit_names,
+            fdr=fdr,
+            json_path=json_path,
         )
 
     @classmethod
@@ -230,6 +250,8 @@ class Compare(Command):
         use_stats=True,
         env_names=None,
         commit_names=None,
+        fdr=None,
+        json_path=None,
     ):
         results_1 = {}
         results_2 = {}
@@ -314,8 +336,33 @@ class Compare(Command):
         else:
             bench['all'] = []
 
+        # Run the statistical tests for all comparable results at once,
+        # so that multiple comparisons can be accounted for
+        tested = []
+        if use_stats:
+            for benchmark in joint_benchmarks:
+                version_1 = versions_1.get(benchmark)
+                version_2 = versions_2.get(benchmark)
+                if version_1 is not None and version_2 is not None and version_1 != version_2:
+                    continue
+                if _isna(results_1.get(benchmark)) or _isna(results_2.get(benchmark)):
+                    continue
+                if _has_stats(ss_1.get(benchmark), ss_2.get(benchmark)):
+                    tested.append(benchmark)
+
+        significance = dict(
+            zip(
+                tested,
+                _stats.is_different_batch(
+                    [(ss_1[b][1], ss_2[b][1], ss_1[b][0], ss_2[b][0]) for b in tested],
+                    fdr=fdr,
+                ),
+            )
+        )
+
         worsened = False
         improved = False
+        json_rows = []
 
         for benchmark in joint_benchmarks:
             if benchmark in results_1:
@@ -352,6 +399,8 @@ class Compare(Command):
                     ratio_num = 1e9
                     ratio = "n/a"
 
+            different, p_value, p_adjusted = significance.get(benchmark, (True, None, None))
+
             if version_1 is not None and version_2 is not None and version_1 != version_2:
                 # not comparable
                 color = 'lightgrey'
@@ -374,25 +423,11 @@ class Compare(Command):
                 # either one was skipped
                 color = 'default'
                 mark = ' '
-            elif _is_result_better(
-                time_2,
-                time_1,
-                ss_2.get(benchmark),
-                ss_1.get(benchmark),
-                factor,
-                use_stats=use_stats,
-            ):
+            elif different and _is_result_better(time_2, time_1, None, None, factor):
                 color = 'green'
                 mark = '-'
                 improved = True
-            elif _is_result_better(
-                time_1,
-                time_2,
-                ss_1.get(benchmark),
-                ss_2.get(benchmark),
-                factor,
-                use_stats=use_stats,
-            ):
+            elif different and _is_result_better(time_1, time_2, None, None, factor):
                 color = 'red'
                 mark = '+'
                 worsened = True
@@ -406,6 +441,20 @@ class Compare(Command):
                 ):
                     ratio = "~" + ratio.strip()
 
+            json_rows.append(
+                {
+                    'name': benchmark[0],
+                    'machine_env': benchmark[1],
+                    'unit': units[benchmark],
+                    'before': _json_value(time_1),
+                    'after': _json_value(time_2),
+                    'ratio': None if ratio_num == 1e9 else ratio_num,
+                    'change': mark,
+                    'p': p_value,
+                    'p_adjusted': p_adjusted,
+                }
+            )
+
             if only_changed and mark in (' ', 'x', '*'):
                 continue
 
@@ -484,4 +533,17 @@ class Compare(Command):
                 )
             )
 
+        if json_path is not None:
+            util.write_json(
+                json_path,
+                {
+                    'before': hash_1,
+                    'after': hash_2,
+                    'factor': factor,
+                    'fdr': fdr,
+                    'benchmarks': json_rows,
+                },
+                api_version=1,
+            )
+
         return worsened, improved
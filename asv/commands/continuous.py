@@ -5,11 +5,11 @@ import os
 
 from asv_runner.console import color_print
 
-from .. import results, util
+from .. import _stats, results, util
 from ..console import log
 from ..repo import NoSuchNameError, get_repo
 from . import Command, common_args
-from .compare import Compare
+from .compare import Compare, _has_stats, _isna, unroll_result
 from .run import Run
 
 
@@ -70,12 +70,29 @@ class Continuous(Command):
             dest="interleave_rounds",
             help=argparse.SUPPRESS,
         )
+        parser.add_argument(
+            "--sequential",
+            action="store_true",
+            help="""Run interleaved rounds of the two commits until the
+            comparison of each benchmark is settled, that is, the
+            difference is statistically significant or the confidence
+            intervals exclude a change larger than `factor`, or until
+            --max-rounds rounds are done.""",
+        )
+        parser.add_argument(
+            "--max-rounds",
+            type=int,
+            default=10,
+            help="""Maximum number of rounds in --sequential mode.
+            Default: 10.""",
+        )
         common_args.add_compare(parser, sort_default='ratio', only_changed_default=True)
         common_args.add_show_stderr(parser)
         common_args.add_bench(parser)
         common_args.add_machine(parser)
         common_args.add_environment(parser)
         common_args.add_launch_method(parser)
+        common_args.add_rediscover(parser)
         parser.set_defaults(func=cls.run_from_args)
 
         return parser
@@ -91,6 +108,8 @@ class Continuous(Command):
             only_changed=args.only_changed,
             sort=args.sort,
             use_stats=args.use_stats,
+            fdr=args.fdr,
+            json_path=args.json,
             show_stderr=args.show_stderr,
             bench=args.bench,
             attribute=args.attribute,
@@ -100,7 +119,10 @@ class Continuous(Command):
             append_samples=args.append_samples,
             quick=args.quick,
             interleave_rounds=args.interleave_rounds,
+            sequential=args.sequential,
+            max_rounds=args.max_rounds,
             launch_method=args.launch_method,
+            rediscover=args.rediscover,
             **kwargs,
         )
 
@@ -115,6 +137,8 @@ class Continuous(Command):
         only_changed=True,
         sort='ratio',
         use_stats=True,
+        fdr=None,
+        json_path=None,
         show_stderr=False,
         bench=None,
         attribute=None,
@@ -124,7 +148,10 @@ class Continuous(Command):
         append_samples=False,
         quick=False,
         interleave_rounds=None,
+        sequential=False,
+        max_rounds=10,
         launch_method=None,
+        rediscover=False,
         _machine_file=None,
     ):
         repo = get_repo(conf)
@@ -146,6 +173,44 @@ class Continuous(Command):
         commit_hashes = [head, parent]
         run_objs = {}
 
+        def results_iter(commit_hash):
+            for env in run_objs['environments']:
+                machine_name = run_objs['machine_params']['machine']
+                filename = results.get_filename(machine_name, commit_hash, env.name)
+                filename = os.path.join(conf.results_dir, filename)
+                try:
+                    result = results.Results.load(filename, machine_name)
+                except util.UserError as err:
+                    log.warning(str(err))
+                    continue
+
+                for name, benchmark in run_objs['benchmarks'].items():
+                    params = benchmark['params']
+                    version = benchmark['version']
+
+                    value = result.get_result_value(name, params)
+                    stats = result.get_result_stats(name, params)
+                    samples = result.get_result_samples(name, params)
+                    yield name, params, value, stats, samples, version, machine_name, env.name
+
+        round_callback = None
+
+        if sequential:
+            if interleave_rounds is False:
+                raise util.UserError("--sequential cannot be used with --no-interleave-rounds")
+            interleave_rounds = True
+
+            attribute = dict(attribute or {})
+            attribute['rounds'] = max_rounds
+
+            def round_callback(rounds_done):
+                # Run at least one round in each commit order
+                if rounds_done < 2:
+                    return []
+                settled = cls._get_settled(results_iter(parent), results_iter(head), factor or 1.1)
+                log.info(f"Settled {len(settled)} benchmarks after {rounds_done} rounds")
+                return settled
+
         result = Run.run(
             conf,
             range_spec=commit_hashes,
@@ -159,34 +224,16 @@ class Continuous(Command):
             quick=quick,
             interleave_rounds=interleave_rounds,
             launch_method=launch_method,
+            rediscover=rediscover,
             _returns=run_objs,
             _machine_file=_machine_file,
+            _round_callback=round_callback,
         )
         if result:
             return result
 
         log.flush()
 
-        def results_iter(commit_hash):
-            for env in run_objs['environments']:
-                machine_name = run_objs['machine_params']['machine']
-                filename = results.get_filename(machine_name, commit_hash, env.name)
-                filename = os.path.join(conf.results_dir, filename)
-                try:
-                    result = results.Results.load(filename, machine_name)
-                except util.UserError as err:
-                    log.warning(str(err))
-                    continue
-
-                for name, benchmark in run_objs['benchmarks'].items():
-                    params = benchmark['params']
-                    version = benchmark['version']
-
-                    value = result.get_result_value(name, params)
-                    stats = result.get_result_stats(name, params)
-                    samples = result.get_result_samples(name, params)
-                    yield name, params, value, stats, samples, version, machine_name, env.name
-
         commit_names = {
             parent: repo.get_name_from_hash(parent),
             head: repo.get_name_from_hash(head),
@@ -204,6 +251,8 @@ class Continuous(Command):
             only_changed=only_changed,
             sort=sort,
             commit_names=commit_names,
+            fdr=fdr,
+            json_path=json_path,
         )
         worsened, improved = status
 
@@ -218,3 +267,50 @@ class Continuous(Command):
             color_print("BENCHMARKS NOT SIGNIFICANTLY CHANGED.", 'green')
 
         return worsened
+
+    @classmethod
+    def _get_settled(cls, resultset_1, resultset_2, factor):
+        """
+        Find benchmarks whose comparison is not expected to change with
+        further rounds: the difference is statistically significant, or
+        the confidence intervals exclude a change by more than `factor`.
+
+        Returns
+        -------
+        settled : list of (env_name, benchmark_name)
+
+        """
+        results_1 = {}
+        for name, params, value, stats, samples, version, machine, env_name in resultset_1:
+            results_1[(env_name, name)] = (value, stats, samples)
+
+        settled = []
+        for name, params, value, stats, samples, version, machine, env_name in resultset_2:
+            key = (env_name, name)
+            if key not in results_1:
+                continue
+            rows_1 = unroll_result(name, params, *results_1[key])
+            rows_2 = unroll_result(name, params, value, stats, samples)
+            if all(_is_settled(r1[1:], r2[1:], factor) for r1, r2 in zip(rows_1, rows_2)):
+                settled.append(key)
+
+        return settled
+
+
+def _is_settled(a, b, factor):
+    value_a, stats_a, samples_a = a
+    value_b, stats_b, samples_b = b
+
+    if _isna(value_a) or _isna(value_b):
+        return True
+
+    if not _has_stats((stats_a, samples_a), (stats_b, samples_b)):
+        # Compared based on factor only
+        return True
+
+    if _stats.is_different(samples_a, samples_b, stats_a, stats_b):
+        return True
+
+    lo_a, hi_a = stats_a['ci_99_a'], stats_a['ci_99_b']
+    lo_b, hi_b = stats_b['ci_99_a'], stats_b['ci_99_b']
+    return lo_a > 0 and lo_b > 0 and hi_b / lo_a < factor and hi_a / lo_b < factor
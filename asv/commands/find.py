@@ -1,8 +1,10 @@
 # Licensed under a 3-clause BSD style license - see LICENSE.rst
 
+import concurrent.futures
 import math
+import os
 
-from .. import util
+from .. import _stats, util
 from ..benchmarks import Benchmarks
 from ..console import log
 from ..machine import Machine
@@ -19,7 +21,10 @@ def draw_graph(lo, mid, hi, total):
     graph = ['-'] * nchars
     graph[int(lo * scale)] = '<'
     graph[int(hi * scale)] = '>'
-    graph[int(mid * scale)] = 'O'
+    if isinstance(mid, int):
+        mid = [mid]
+    for m in mid:
+        graph[int(m * scale)] = 'O'
     return ''.join(graph)
 
 
@@ -56,16 +61,37 @@ class Find(Command):
             help="""Search for a decrease in the benchmark value,
             rather than an increase.""",
         )
+        parser.add_argument(
+            "--extra-rounds",
+            type=int,
+            default=2,
+            help="""How many times at most to measure the commits of a
+            search step again, when none of the differences between them
+            is statistically significant. Default: 2.""",
+        )
         parser.add_argument(
             "--skip-save",
             action="store_true",
             help="""Do not save intermediate results from the search""",
         )
-        common_args.add_parallel(parser)
+        parser.add_argument(
+            "--parallel",
+            "-j",
+            nargs='?',
+            type=int,
+            default=1,
+            const=-1,
+            help="""Build this many commits at the same time, in
+            separate copies of the environment, splitting the search
+            range into parallel+1 pieces at each step. The commits are
+            benchmarked one at a time. If no number is provided, use the
+            number of cores on this machine.""",
+        )
         common_args.add_show_stderr(parser)
         common_args.add_machine(parser)
         common_args.add_environment(parser)
         common_args.add_launch_method(parser)
+        common_args.add_rediscover(parser)
 
         parser.set_defaults(func=cls.run_from_args)
 
@@ -84,6 +110,8 @@ class Find(Command):
             env_spec=args.env_spec,
             launch_method=args.launch_method,
             skip_save=args.skip_save,
+            extra_rounds=args.extra_rounds,
+            rediscover=args.rediscover,
             **kwargs,
         )
 
@@ -101,6 +129,8 @@ class Find(Command):
         _machine_file=None,
         launch_method=None,
         skip_save=False,
+        extra_rounds=2,
+        rediscover=False,
     ):
         params = {}
         machine_params = Machine.load(machine_name=machine, _path=_machine_file, interactive=True)
@@ -121,7 +151,9 @@ class Find(Command):
             log.error("No environments selected")
             return 1
 
-        benchmarks = Benchmarks.discover(conf, repo, environments, commit_hashes, regex=bench)
+        benchmarks = Benchmarks.discover(
+            conf, repo, environments, commit_hashes, regex=bench, rediscover=rediscover
+        )
         if len(benchmarks) == 0:
             log.error(f"'{bench}' benchmark not found")
             return 1
@@ -137,16 +169,34 @@ class Find(Command):
         (benchmark_name,) = benchmarks.keys()
         benchmark_type = benchmarks[benchmark_name]["type"]
 
-        steps = int(math.log(len(commit_hashes)) / math.log(2))
+        parallel, multiprocessing = util.get_multiprocessing(parallel)
 
-        log.info(f"Running approximately {steps} benchmarks within {len(commit_hashes)} commits")
+        if parallel == 1:
+            steps = int(math.log(len(commit_hashes)) / math.log(2))
+            log.info(
+                f"Running approximately {steps} benchmarks within {len(commit_hashes)} commits"
+            )
+        else:
+            steps = int(math.log(len(commit_hashes)) / math.log(parallel + 1))
+            log.info(
+                f"Running approximately {steps} rounds of {parallel} benchmarks "
+                f"within {len(commit_hashes)} commits"
+            )
 
         env = environments[0]
 
+        # Copies of the environment for benchmarking several commits at once
+        envs = [env] + [env.copy(conf, f"find-{j}") for j in range(1, parallel)]
+        if len(envs) > 1:
+            Setup.perform_setup(envs[1:], parallel=1)
+
         results = [None] * len(commit_hashes)
+        samples = [None] * len(commit_hashes)
+        stats = [None] * len(commit_hashes)
+        result_objs = [None] * len(commit_hashes)
 
-        def do_benchmark(i):
-            if results[i] is not None:
+        def do_benchmark(i, env=env, remeasure=False, install=True):
+            if results[i] is not None and not remeasure:
                 return results[i]
 
             commit_hash = commit_hashes[i]
@@ -154,37 +204,49 @@ class Find(Command):
             commit_name = repo.get_decorated_hash(commit_hash, 8)
             log.info(f"For {conf.project} commit {commit_name}:")
 
-            env.install_project(conf, repo, commit_hash)
-            params['python'] = env.python
-            params.update(env.requirements)
-
-            result = Results(
-                params,
-                env.requirements,
-                commit_hash,
-                repo.get_date(commit_hash),
-                env.python,
-                env.name,
-                env.env_vars,
-            )
+            if install:
+                env.install_project(conf, repo, commit_hash)
 
-            if not skip_save:
-                result.load_data(conf.results_dir)
+            if remeasure:
+                result = result_objs[i]
+            else:
+                result_params = dict(params)
+                result_params['python'] = env.python
+                result_params.update(env.requirements)
+
+                result = Results(
+                    result_params,
+                    env.requirements,
+                    commit_hash,
+                    repo.get_date(commit_hash),
+                    env.python,
+                    env.name,
+                    env.env_vars,
+                )
+
+                if not skip_save:
+                    result.load_data(conf.results_dir)
 
             res = run_benchmarks(
                 benchmarks,
                 env,
                 results=result,
                 show_stderr=show_stderr,
+                record_samples=True,
+                append_samples=remeasure,
                 launch_method=launch_method,
             )
 
             if not skip_save:
                 res.save(conf.results_dir)
 
-            result = res.get_result_value(benchmark_name, benchmarks[benchmark_name]['params'])
+            benchmark_params = benchmarks[benchmark_name]['params']
+            result = res.get_result_value(benchmark_name, benchmark_params)
 
             results[i] = result
+            samples[i] = res.get_result_samples(benchmark_name, benchmark_params)
+            stats[i] = res.get_result_stats(benchmark_name, benchmark_params)
+            result_objs[i] = res
 
             # If we failed due to timeout in a timing benchmark, set
             # runtime as the timeout to prevent falling back to linear
@@ -196,6 +258,31 @@ class Find(Command):
 
             return results[i]
 
+        def do_benchmarks(indices, remeasure=False):
+            """
+            Benchmark several commits, building them concurrently in the
+            environment copies.
+            """
+            todo = [i for i in dict.fromkeys(indices) if remeasure or results[i] is None]
+            if len(envs) == 1 or len(todo) <= 1:
+                for i in todo:
+                    do_benchmark(i, remeasure=remeasure)
+                return
+
+            def install(i, env):
+                env.install_project(conf, repo, commit_hashes[i])
+
+            with concurrent.futures.ThreadPoolExecutor(len(envs)) as executor:
+                for chunk in util.iter_chunks(todo, len(envs)):
+                    log.info(f"Building {len(chunk)} commits")
+                    with log.indent():
+                        list(executor.map(install, chunk, envs))
+
+                    # Benchmark one at a time, so that the measurements
+                    # do not disturb each other
+                    for i, chunk_env in zip(chunk, envs):
+                        do_benchmark(i, chunk_env, remeasure=remeasure, install=False)
+
         def non_null_results(*results):
             """
             Whether some value is non-null in all result sets
@@ -205,27 +292,83 @@ class Find(Command):
                     return True
             return False
 
-        def difference_3way(a, b, c):
+        def difference_kway(values):
             """
-            Return largest regression (a-b, b-c).
+            Return largest regression between consecutive result sets.
             """
-            results_ab = [0]
-            results_bc = [0]
-            for va, vb, vc in zip(a, b, c):
-                if va is not None and vb is not None and vc is not None:
-                    denom = abs(va) + abs(vb) + abs(vc)
+            diffs = [[0] for j in range(len(values) - 1)]
+            for vs in zip(*values):
+                if all(v is not None for v in vs):
+                    denom = sum(abs(v) for v in vs)
                     if denom == 0:
                         denom = 1.0
                     if invert:
                         denom *= -1.0
 
-                    results_ab.append((va - vb) / denom)
-                    results_bc.append((vb - vc) / denom)
-            return max(results_ab), max(results_bc)
+                    for j in range(len(vs) - 1):
+                        diffs[j].append((vs[j + 1] - vs[j]) / denom)
+            return [max(d) for d in diffs]
+
+        def has_samples(i):
+            return samples[i] is not None and any(x for x in samples[i])
+
+        def is_significant(i, j):
+            """
+            Whether the results for commits i and j differ significantly
+            for some parameter.
+            """
+            for k, (va, vb) in enumerate(zip(results[i], results[j])):
+                if va is None or vb is None:
+                    continue
+                if stats[i] is None or stats[j] is None or not (stats[i][k] and stats[j][k]):
+                    # No statistics: compare values only
+                    if va != vb:
+                        return True
+                elif _stats.is_different(samples[i][k], samples[j][k], stats[i][k], stats[j][k]):
+                    return True
+            return False
+
+        def choose_piece(points):
+            """
+            Return the index of the piece between consecutive commits
+            in `points` with the largest regression, preferring
+            statistically significant ones. If none is significant, the
+            commits are measured again, at most `extra_rounds` times.
+            """
+            for extra in range(extra_rounds + 1):
+                diffs = difference_kway([results[j] for j in points])
+                significant = [
+                    k
+                    for k, diff in enumerate(diffs)
+                    if diff > 0 and is_significant(points[k], points[k + 1])
+                ]
+                if significant or extra == extra_rounds or not all(map(has_samples, points)):
+                    break
+
+                log.info("Differences are not statistically significant, measuring again")
+                with log.indent():
+                    do_benchmarks(points, remeasure=True)
+
+            candidates = significant or range(len(diffs))
+            return max(candidates, key=diffs.__getitem__)
+
+        def get_p_value(i, j):
+            """
+            Smallest Mann-Whitney U p-value between the results for
+            commits i and j, over parameters.
+            """
+            p_min = None
+            if has_samples(i) and has_samples(j):
+                for a, b in zip(samples[i], samples[j]):
+                    if a and b:
+                        _, p = _stats.mann_whitney_u(a, b)
+                        if p_min is None or p < p_min:
+                            p_min = p
+            return p_min
 
         def do_search(lo, hi):
             if hi - lo <= 1:
-                return hi
+                return lo, hi
 
             mid = int(math.floor((hi - lo) / 2) + lo)
 
@@ -259,14 +402,44 @@ class Find(Command):
                         if hi <= mid:
                             raise util.UserError("Too many commits failed")
 
-            diff_b, diff_a = difference_3way(hi_result, mid_result, lo_result)
-
-            if diff_a >= diff_b:
+            if choose_piece([lo, mid, hi]) == 0:
                 return do_search(lo, mid)
             else:
                 return do_search(mid, hi)
 
-        result = do_search(0, len(commit_hashes) - 1)
+        def do_search_parallel(lo, hi):
+            while hi - lo > 1:
+                num = min(parallel, hi - lo - 1)
+                mids = sorted({lo + (hi - lo) * (j + 1) // (num + 1) for j in range(num)})
+
+                log.info(f"Testing {draw_graph(lo, mids, hi, len(commit_hashes))}")
+
+                points = [lo] + mids + [hi]
+                with log.indent():
+                    do_benchmarks(points)
+
+                # Drop failed commits
+                points = [j for j in points if non_null_results(results[j])]
+                if len(points) < 2 or not non_null_results(*[results[j] for j in points]):
+                    raise util.UserError("Too many commits failed")
+
+                # Narrow to the piece with the largest regression
+                k = choose_piece(points)
+                if (points[k], points[k + 1]) == (lo, hi):
+                    raise util.UserError("Too many commits failed")
+                lo, hi = points[k], points[k + 1]
+
+            return lo, hi
+
+        try:
+            if parallel == 1:
+                lo, result = do_search(0, len(commit_hashes) - 1)
+            else:
+                lo, result = do_search_parallel(0, len(commit_hashes) - 1)
+        finally:
+            for env_copy in envs[1:]:
+                if os.path.isdir(env_copy._path):
+                    util.long_path_rmtree(env_copy._path)
 
         commit_name = repo.get_decorated_hash(commit_hashes[result], 8)
 
@@ -277,4 +450,8 @@ class Find(Command):
 
         log.info(f"Greatest {direction} found: {commit_name}")
 
+        p = get_p_value(lo, result)
+        if p is not None:
+            log.info(f"Confidence: {100 * (1 - p):.1f}% (Mann-Whitney U p-value {p:.2g})")
+
         return 0
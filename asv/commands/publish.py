@@ -94,6 +94,10 @@ class Publish(Command):
         machines = {}
         benchmark_names = set()
 
+        tile_points = getattr(conf, 'graph_tile_points', None)
+        if tile_points is not None and tile_points < 1:
+            raise util.UserError(f"graph_tile_points must be at least 1, got {tile_points}")
+
         log.set_nitems(6 + len(list(util.iter_subclasses(OutputPublisher))))
 
         if os.path.exists(conf.html_dir):
@@ -242,23 +246,31 @@ class Publish(Command):
                     if graph.params not in graph_param_list:
                         graph_param_list.append(graph.params)
 
-        log.step()
-        log.info("Detecting steps")
-        with log.indent():
-            n_processes = multiprocessing.cpu_count()
-            pool = util.get_multiprocessing_pool(n_processes)
-            try:
+        n_processes = multiprocessing.cpu_count()
+        pool = util.get_multiprocessing_pool(n_processes)
+        try:
+            log.step()
+            log.info("Detecting steps")
+            with log.indent():
                 graphs.detect_steps(pool, dots=log.dot)
-                pool.close()
-                pool.join()
-            finally:
-                pool.terminate()
 
-        log.step()
-        log.info("Generating graphs")
-        with log.indent():
-            # Save files
-            graphs.save(conf.html_dir, dots=log.dot)
+            log.step()
+            log.info("Generating graphs")
+            with log.indent():
+                # Save files
+                graphs.save(
+                    conf.html_dir,
+                    dots=log.dot,
+                    lowres_points=getattr(conf, 'graph_lowres_points', None),
+                    tile_points=tile_points,
+                    pool=pool,
+                    bundle=getattr(conf, 'graph_bundles', False),
+                )
+
+            pool.close()
+            pool.join()
+        finally:
+            pool.terminate()
 
         pages = []
         classes = sorted(util.iter_subclasses(OutputPublisher), key=lambda cls: cls.order)
@@ -295,6 +307,9 @@ class Publish(Command):
                 'machines': machines,
                 'tags': tags,
                 'pages': pages,
+                'graph_lowres_points': getattr(conf, 'graph_lowres_points', None),
+                'graph_tile_points': getattr(conf, 'graph_tile_points', None),
+                'graph_bundles': getattr(conf, 'graph_bundles', False),
             },
             compact=True,
         )
@@ -6,7 +6,7 @@ import sys
 import textwrap
 import time
 import traceback
-from collections import defaultdict
+from collections import Counter, defaultdict
 
 from .. import environment, util
 from ..benchmarks import Benchmarks
@@ -31,7 +31,26 @@ def _do_build(args):
     except util.ProcessError:
         pass
     duration = time.time() - started_at
-    return (env.name, (success, duration))
+    return (env.name, (success, duration, env.build_cache_status))
+
+
+def _do_prebuild(args):
+    """
+    multiprocessing callback to build the project for a following
+    commit, while benchmarks run in the main process.
+    """
+    env, conf, repo, commit_hash, cpu_affinity = args
+    try:
+        if cpu_affinity and hasattr(os, 'sched_setaffinity'):
+            # Also applies to the build commands started from here
+            os.sched_setaffinity(0, cpu_affinity)
+        with log.set_level(logging.WARNING):
+            env.prebuild_project(conf, repo, commit_hash)
+    except util.ProcessError:
+        # Built again (and the failure reported) on install
+        pass
+    except BaseException as exc:
+        raise util.ParallelFailure(str(exc), exc.__class__, traceback.format_exc())
 
 
 def _do_build_multiprocess(args_sets):
@@ -152,6 +171,7 @@ class Run(Command):
             existing environment.""",
         )
         common_args.add_launch_method(parser)
+        common_args.add_rediscover(parser)
         parser.add_argument(
             "--dry-run",
             "-n",
@@ -212,6 +232,23 @@ class Run(Command):
             help=argparse.SUPPRESS,
         )
         parser.add_argument("--no-pull", action="store_true", help="Do not pull the repository")
+        parser.add_argument(
+            "--pipeline",
+            action="store_true",
+            help="""Build the next commit in the background while
+            benchmarking the current one.  The background builds run on
+            the CPUs given by --build-cpu-affinity, or if not given, on
+            the CPUs not used for benchmarking by --cpu-affinity.  A
+            warning is shown if the builds and the benchmarks do not
+            run on separate CPUs.""",
+        )
+        parser.add_argument(
+            "--build-cpu-affinity",
+            type=common_args.cpu_list,
+            default=None,
+            help="""CPUs to use for background builds with --pipeline,
+            in format: 0 or 0,1,2 or 0-3.""",
+        )
 
     @classmethod
     def run_from_conf_args(cls, conf, args, **kwargs):
@@ -239,6 +276,9 @@ class Run(Command):
             interleave_rounds=args.interleave_rounds,
             launch_method=args.launch_method,
             durations=args.durations,
+            pipeline=args.pipeline,
+            build_cpu_affinity=args.build_cpu_affinity,
+            rediscover=args.rediscover,
             **kwargs,
         )
 
@@ -269,7 +309,11 @@ class Run(Command):
         interleave_rounds=False,
         launch_method=None,
         durations=0,
+        pipeline=False,
+        build_cpu_affinity=None,
+        rediscover=False,
         _returns={},  # noqa: B006
+        _round_callback=None,
     ):
         machine_params = Machine.load(machine_name=machine, _path=_machine_file, interactive=True)
         machine_params.save(conf.results_dir)
@@ -375,7 +419,9 @@ class Run(Command):
                         "No range spec may be specified if benchmarking in an existing environment"
                     )
 
-        benchmarks = Benchmarks.discover(conf, repo, environments, commit_hashes, regex=bench)
+        benchmarks = Benchmarks.discover(
+            conf, repo, environments, commit_hashes, regex=bench, rediscover=rediscover
+        )
         benchmarks.save()
         if len(benchmarks) == 0:
             if bench == ["just-discover"]:
@@ -453,159 +499,268 @@ class Run(Command):
                     for commit_hash in commit_hashes:
                         yield run_rounds, commit_hash
 
+                if _round_callback is not None and run_rounds is not None and run_rounds[0] > 1:
+                    # Drop benchmarks the callback considers done from
+                    # the remaining rounds
+                    done = _round_callback(max_rounds - run_rounds[0] + 1)
+                    for env_name, name in done:
+                        for commit_hash in commit_hashes:
+                            skipped_benchmarks[(commit_hash, env_name)].add(name)
+
         build_durations = defaultdict(lambda: 0)
+        build_cache_stats = Counter()
+
+        prebuild_pool = None
+        prebuilds = {}
+        if pipeline:
+            bench_cpu_affinity = attribute.get('cpu_affinity') if attribute else None
+            if build_cpu_affinity is None and bench_cpu_affinity:
+                build_cpu_affinity = [
+                    j for j in range(os.cpu_count()) if j not in bench_cpu_affinity
+                ]
+            if (
+                not build_cpu_affinity
+                or not bench_cpu_affinity
+                or set(build_cpu_affinity) & set(bench_cpu_affinity)
+            ):
+                log.warning(
+                    "The background builds of --pipeline run on the same CPUs as the "
+                    "benchmarks, which disturbs the measurements: use --cpu-affinity "
+                    "and --build-cpu-affinity to give them separate CPUs"
+                )
+            prebuild_pool = util.get_multiprocessing_pool(1)
 
-        for run_rounds, commit_hash in iter_rounds_commits():
-            if commit_hash in skipped_benchmarks:
-                for env in environments:
-                    for bench in benchmarks:
-                        if interleave_rounds:
-                            log.step()
-                        else:
-                            for _ in range(max_rounds):
+        def get_next_commit(run_rounds, commit_hash):
+            # The commit following in the same round
+            if interleave_rounds and run_rounds[0] % 2 == 0:
+                order = commit_hashes[::-1]
+            else:
+                order = commit_hashes
+            for next_hash in order[order.index(commit_hash) + 1 :]:
+                if next_hash not in skipped_benchmarks:
+                    return next_hash
+            return None
+
+        def wait_prebuilds(envs):
+            # Environments with the same dir_name share the build cache
+            for env in envs:
+                prebuild = prebuilds.pop(env.dir_name, None)
+                if prebuild is not None:
+                    try:
+                        prebuild.get()
+                    except util.ParallelFailure as exc:
+                        exc.reraise()
+
+        try:
+            for run_rounds, commit_hash in iter_rounds_commits():
+                if commit_hash in skipped_benchmarks:
+                    for env in environments:
+                        for bench in benchmarks:
+                            if interleave_rounds:
                                 log.step()
-                continue
+                            else:
+                                for _ in range(max_rounds):
+                                    log.step()
+                    continue
 
-            for env in environments:
-                skip_list = skipped_benchmarks[(commit_hash, env.name)]
-                for bench in benchmarks:
-                    if bench in skip_list:
-                        if interleave_rounds:
-                            log.step()
-                        else:
-                            for _ in range(max_rounds):
+                for env in environments:
+                    skip_list = skipped_benchmarks[(commit_hash, env.name)]
+                    for bench in benchmarks:
+                        if bench in skip_list:
+                            if interleave_rounds:
                                 log.step()
+                            else:
+                                for _ in range(max_rounds):
+                                    log.step()
+
+                active_environments = [
+                    env
+                    for env in environments
+                    if set(benchmarks.keys()).difference(
+                        skipped_benchmarks[(commit_hash, env.name)]
+                    )
+                ]
 
-            active_environments = [
-                env
-                for env in environments
-                if set(benchmarks.keys()).difference(skipped_benchmarks[(commit_hash, env.name)])
-            ]
-
-            if not active_environments:
-                continue
+                if not active_environments:
+                    continue
 
-            if commit_hash:
-                if interleave_rounds:
-                    round_info = f" (round {max_rounds - run_rounds[0] + 1}/{max_rounds})"
+                if prebuild_pool is not None:
+                    next_hash = get_next_commit(run_rounds, commit_hash)
                 else:
-                    round_info = ""
-
-                commit_name = repo.get_decorated_hash(commit_hash, 8)
-                log.info(f"For {conf.project} commit {commit_name}{round_info}:")
-
-            with log.indent():
-                for subenv in util.iter_chunks(active_environments, parallel):
-                    successes = {
-                        env.name: (env.installed_commit_hash == commit_hash, 0) for env in subenv
-                    }
-
-                    env_to_install = [
-                        env for env in subenv if env.installed_commit_hash != commit_hash
-                    ]
-
-                    subenv_name = ', '.join([x.name for x in env_to_install])
-
-                    if subenv_name:
-                        log.info(f"Building for {subenv_name}")
-
-                    with log.indent():
-                        args = [(env, conf, repo, commit_hash) for env in env_to_install]
-
-                        if parallel != 1:
-                            # Parallel run only for environments with different dir_names
-                            args_sets = defaultdict(list)
-                            for arg in args:
-                                args_sets[arg[0].dir_name].append(arg)
-                            args_sets = args_sets.values()
-
-                            try:
-                                with util.get_multiprocessing_pool(parallel) as pool:
-                                    res = []
-                                    for r in pool.map(_do_build_multiprocess, args_sets):
-                                        res.extend(r)
-                                    successes.update(dict(res))
-                            except util.ParallelFailure as exc:
-                                exc.reraise()
-                        else:
-                            successes.update(dict(map(_do_build, args)))
-
-                    for env in subenv:
-                        success, duration = successes[env.name]
-
-                        build_duration_key = (commit_hash, env.name)
-                        build_durations[build_duration_key] += duration
-                        build_duration = build_durations[build_duration_key]
-
-                        params = dict(machine_params.__dict__)
-                        params['python'] = env.python
-                        params.update(env.requirements)
-
-                        skip_save = dry_run or (
-                            isinstance(env, environment.ExistingEnvironment)
-                            and set_commit_hash is None
-                        )
-
-                        skip_list = skipped_benchmarks[(commit_hash, env.name)]
-                        benchmark_set = benchmarks.filter_out(skip_list)
-
-                        if set_commit_hash is not None:
-                            commit_hash = set_commit_hash
-
-                        result = Results(
-                            params,
-                            env.requirements,
-                            commit_hash,
-                            repo.get_date(commit_hash),
-                            env.python,
-                            env.name,
-                            env.env_vars,
-                        )
-
-                        if not skip_save:
-                            result.load_data(conf.results_dir)
-
-                        if build_duration != 0:
-                            result.set_build_duration(build_duration)
-
-                        # If we are interleaving commits, we need to
-                        # append samples (except for the first round)
-                        # and record samples (except for the final
-                        # round).
-                        force_append_samples = interleave_rounds and run_rounds[0] < max_rounds
-                        force_record_samples = interleave_rounds and run_rounds[0] > 1
-
-                        if success:
-                            run_benchmarks(
-                                benchmark_set,
-                                env,
-                                results=result,
-                                show_stderr=show_stderr,
-                                quick=quick,
-                                profile=profile,
-                                extra_params=attribute,
-                                record_samples=(record_samples or force_record_samples),
-                                append_samples=(append_samples or force_append_samples),
-                                run_rounds=run_rounds,
-                                launch_method=launch_method,
+                    next_hash = None
+
+                if commit_hash:
+                    if interleave_rounds:
+                        round_info = f" (round {max_rounds - run_rounds[0] + 1}/{max_rounds})"
+                    else:
+                        round_info = ""
+
+                    commit_name = repo.get_decorated_hash(commit_hash, 8)
+                    log.info(f"For {conf.project} commit {commit_name}{round_info}:")
+
+                with log.indent():
+                    for subenv in util.iter_chunks(active_environments, parallel):
+                        successes = {
+                            env.name: (env.installed_commit_hash == commit_hash, 0, None)
+                            for env in subenv
+                        }
+
+                        env_to_install = [
+                            env for env in subenv if env.installed_commit_hash != commit_hash
+                        ]
+
+                        subenv_name = ', '.join([x.name for x in env_to_install])
+
+                        wait_prebuilds(env_to_install)
+
+                        if subenv_name:
+                            log.info(f"Building for {subenv_name}")
+
+                        with log.indent():
+                            args = [(env, conf, repo, commit_hash) for env in env_to_install]
+
+                            if parallel != 1:
+                                # Parallel run only for environments with different dir_names
+                                args_sets = defaultdict(list)
+                                for arg in args:
+                                    args_sets[arg[0].dir_name].append(arg)
+                                args_sets = args_sets.values()
+
+                                try:
+                                    with util.get_multiprocessing_pool(parallel) as pool:
+                                        res = []
+                                        for r in pool.map(_do_build_multiprocess, args_sets):
+                                            res.extend(r)
+                                        successes.update(dict(res))
+                                except util.ParallelFailure as exc:
+                                    exc.reraise()
+                            else:
+                                successes.update(dict(map(_do_build, args)))
+
+                        if next_hash is not None:
+                            # Build the next commit while benchmarking this one
+                            for env in subenv:
+                                if (
+                                    env.dir_name not in prebuilds
+                                    and env.can_install_project()
+                                    and env.installed_commit_hash != next_hash
+                                ):
+                                    prebuilds[env.dir_name] = prebuild_pool.apply_async(
+                                        _do_prebuild,
+                                        ((env, conf, repo, next_hash, build_cpu_affinity),),
+                                    )
+
+                        for env in subenv:
+                            success, duration, cache_status = successes[env.name]
+                            if cache_status is not None:
+                                build_cache_stats[cache_status] += 1
+
+                            build_duration_key = (commit_hash, env.name)
+                            build_durations[build_duration_key] += duration
+                            build_duration = build_durations[build_duration_key]
+
+                            params = dict(machine_params.__dict__)
+                            params['python'] = env.python
+                            params.update(env.requirements)
+
+                            skip_save = dry_run or (
+                                isinstance(env, environment.ExistingEnvironment)
+                                and set_commit_hash is None
                             )
-                        else:
-                            skip_benchmarks(benchmark_set, env, results=result)
 
-                        if not skip_save:
-                            result.save(conf.results_dir)
+                            skip_list = skipped_benchmarks[(commit_hash, env.name)]
+                            benchmark_set = benchmarks.filter_out(skip_list)
 
-                        failures = failures or any(code != 0 for code in result.errcode.values())
+                            if set_commit_hash is not None:
+                                commit_hash = set_commit_hash
+
+                            result = Results(
+                                params,
+                                env.requirements,
+                                commit_hash,
+                                repo.get_date(commit_hash),
+                                env.python,
+                                env.name,
+                                env.env_vars,
+                            )
 
-                        if durations > 0:
-                            duration_set = Show._get_durations([(machine, result)], benchmark_set)
-                            log.info(
-                                cls.format_durations(duration_set[(machine, env.name)], durations)
+                            if not skip_save:
+                                result.load_data(conf.results_dir)
+
+                            if build_duration != 0:
+                                result.set_build_duration(build_duration)
+
+                            # If we are interleaving commits, we need to
+                            # append samples (except for the first round)
+                            # and record samples (except for the final
+                            # round).
+                            force_append_samples = interleave_rounds and run_rounds[0] < max_rounds
+                            force_record_samples = interleave_rounds and run_rounds[0] > 1
+
+                            if success:
+                                run_benchmarks(
+                                    benchmark_set,
+                                    env,
+                                    results=result,
+                                    show_stderr=show_stderr,
+                                    quick=quick,
+                                    profile=profile,
+                                    extra_params=attribute,
+                                    record_samples=(record_samples or force_record_samples),
+                                    append_samples=(append_samples or force_append_samples),
+                                    run_rounds=run_rounds,
+                                    launch_method=launch_method,
+                                )
+                            else:
+                                skip_benchmarks(benchmark_set, env, results=result)
+
+                            if not skip_save:
+                                result.save(conf.results_dir)
+
+                            failures = failures or any(
+                                code != 0 for code in result.errcode.values()
                             )
 
+                            if durations > 0:
+                                duration_set = Show._get_durations(
+                                    [(machine, result)], benchmark_set
+                                )
+                                log.info(
+                                    cls.format_durations(
+                                        duration_set[(machine, env.name)], durations
+                                    )
+                                )
+
+            if prebuild_pool is not None:
+                prebuild_pool.close()
+                prebuild_pool.join()
+        finally:
+            if prebuild_pool is not None:
+                prebuild_pool.terminate()
+
+        if build_cache_stats:
+            log.info(cls.format_build_cache_stats(build_cache_stats, environments))
+
         if failures:
             return 2
 
+    @classmethod
+    def format_build_cache_stats(cls, stats, environments):
+        hits = stats['hit'] + stats['shared']
+        total = hits + stats['miss']
+        msg = f"Build cache hit rate: {100 * hits / total:.0f}% ({hits}/{total})"
+        if stats['shared']:
+            msg += f", {stats['shared']} from the shared cache"
+
+        count = size = 0
+        # Environments with the same dir_name share the build cache
+        for env in {env.dir_name: env for env in environments}.values():
+            env_count, env_size = env.get_build_cache_size()
+            count += env_count
+            size += env_size
+        msg += f"; {count} cached builds, {util.human_file_size(size)} on disk"
+        return msg
+
     @classmethod
     def format_durations(cls, durations, num_durations):
         items = list(durations.items())
@@ -10,15 +10,15 @@ from ..console import log
 from . import Command, common_args
 
 
-def _create(env):
+def _create(env, template=None):
     with log.set_level(logging.WARNING):
-        env.create()
+        env.create(template=template)
 
 
 def _create_parallel(envs):
     try:
-        for env in envs:
-            _create(env)
+        for env, template in envs:
+            _create(env, template)
     except BaseException as exc:
         raise util.ParallelFailure(str(exc), exc.__class__, traceback.format_exc())
 
@@ -61,19 +61,38 @@ class Setup(Command):
 
         parallel, multiprocessing = util.get_multiprocessing(parallel)
 
+        templates = environment.get_environment_templates(environments)
+        unique_templates = {template._path: template for template in templates.values()}
+
         log.info("Creating environments")
         with log.indent():
-            if parallel != 1:
-                try:
-                    # Run creation in parallel only for environments with
-                    # different dir_names
-                    environment_groups = defaultdict(list)
-                    for env in environments:
-                        environment_groups[env.dir_name].append(env)
-
-                    with util.get_multiprocessing_pool(parallel) as pool:
-                        pool.map(_create_parallel, environment_groups.values())
-                except util.ParallelFailure as exc:
-                    exc.reraise()
-            else:
-                list(map(_create, environments))
+            try:
+                if unique_templates:
+                    cls._create_environments(
+                        [(template, None) for template in unique_templates.values()], parallel
+                    )
+                cls._create_environments(
+                    [(env, templates.get(env.dir_name)) for env in environments], parallel
+                )
+            finally:
+                for template in unique_templates.values():
+                    if os.path.exists(template._path):
+                        util.long_path_rmtree(template._path)
+
+    @staticmethod
+    def _create_environments(items, parallel):
+        if parallel != 1:
+            try:
+                # Run creation in parallel only for environments with
+                # different dir_names
+                environment_groups = defaultdict(list)
+                for env, template in items:
+                    environment_groups[env.dir_name].append((env, template))
+
+                with util.get_multiprocessing_pool(parallel) as pool:
+                    pool.map(_create_parallel, environment_groups.values())
+            except util.ParallelFailure as exc:
+                exc.reraise()
+        else:
+            for env, template in items:
+                _create(env, template)
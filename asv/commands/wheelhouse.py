@@ -0,0 +1,81 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+
+import os
+
+from .. import environment, util
+from ..console import log
+from . import Command, common_args
+from .setup import Setup
+
+
+class Wheelhouse(Command):
+    @classmethod
+    def setup_arguments(cls, subparsers):
+        parser = subparsers.add_parser(
+            "wheelhouse",
+            help="Download environment requirements for offline use",
+            description="""Download the requirements of each environment
+            into a local directory (a wheelhouse), so that environments
+            can later be created without network access.  The
+            environments are set up as with the ``setup`` command.  The
+            directory is given by the ``wheelhouse_dir`` configuration
+            option, or the ``--dir`` argument.""",
+        )
+
+        parser.add_argument(
+            "--dir",
+            dest="wheelhouse_dir",
+            default=None,
+            help="""Directory to download the requirements to.  Overrides
+            the ``wheelhouse_dir`` configuration option.""",
+        )
+
+        common_args.add_parallel(parser)
+
+        common_args.add_environment(parser)
+
+        parser.set_defaults(func=cls.run_from_args)
+
+        return parser
+
+    @classmethod
+    def run_from_conf_args(cls, conf, args):
+        return cls.run(
+            conf=conf,
+            wheelhouse_dir=args.wheelhouse_dir,
+            parallel=args.parallel,
+            env_spec=args.env_spec,
+        )
+
+    @classmethod
+    def run(cls, conf, wheelhouse_dir=None, parallel=-1, env_spec=None):
+        if wheelhouse_dir is None:
+            wheelhouse_dir = getattr(conf, 'wheelhouse_dir', None)
+        if not wheelhouse_dir:
+            raise util.UserError(
+                "No wheelhouse directory given: set wheelhouse_dir in the "
+                "configuration file, or use --dir"
+            )
+        wheelhouse_dir = os.path.abspath(wheelhouse_dir)
+
+        # The environments are set up from the network, not from the
+        # wheelhouse that is being filled
+        conf.wheelhouse_dir = None
+
+        environments = list(environment.get_environments(conf, env_spec))
+        Setup.perform_setup(environments, parallel=parallel)
+
+        os.makedirs(wheelhouse_dir, exist_ok=True)
+
+        log.info(f"Downloading requirements to {wheelhouse_dir}")
+        with log.indent():
+            for env in environments:
+                try:
+                    env.download_requirements(wheelhouse_dir)
+                except NotImplementedError:
+                    log.warning(
+                        f"Environment type {env.tool_name} does not support "
+                        f"wheelhouses, skipping {env.name}"
+                    )
+
+        return environments
@@ -5,16 +5,21 @@ Manages an environment -- a combination of a version of Python and set
 of dependencies.
 """
 
+import contextlib
+import copy
 import hashlib
 import importlib
 import itertools
+import json
 import os
 import re
+import shutil
 import subprocess
 import sys
+import time
 from pathlib import Path
 
-from . import build_cache, util
+from . import build_cache, source_trees, util, wheel_install
 from .console import log
 
 if sys.version_info >= (3, 11):
@@ -24,6 +29,10 @@ else:
 
 WIN = os.name == "nt"
 
+# Script for installing wheels without pip, run by the Python of the
+# environment (see Environment._unpack_wheel)
+WHEEL_INSTALL_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "wheel_install.py")
+
 
 def iter_matrix(environment_type, pythons, conf, explicit_selection=False):
     """
@@ -298,6 +307,17 @@ def _untag_env_vars(tagged_env_vars, build=False):
     return vars
 
 
+def _get_requirement_name(requirement):
+    """
+    Get the normalized package name from a requirement key, e.g.
+    ``"pip+setuptools>=61"`` -> ``"setuptools"``.
+    """
+    if '+' in requirement:
+        requirement = requirement.split('+', 1)[1]
+    m = re.match(r'[A-Za-z0-9._-]*', requirement.strip())
+    return re.sub(r'[-_.]+', '-', m.group(0)).lower()
+
+
 def get_environments(conf, env_specifiers, verbose=True):
     """
     Iterator returning `Environment` objects for all of the
@@ -458,6 +478,114 @@ def is_existing_only(environments):
     return all(isinstance(env, ExistingEnvironment) for env in environments)
 
 
+def get_environment_templates(environments):
+    """
+    Find template environments, from which the given environments can
+    be created by cloning.
+
+    Environments that are not yet set up, have ``environment_templates``
+    enabled, and differ only in their requirements are grouped
+    together.  For each group of at least two environments, a template
+    containing the requirements common to the group is made.
+
+    Returns
+    -------
+    templates : dict
+        Mapping from environment ``dir_name`` to the template
+        environment.  The templates need to be created with `create`
+        before use.
+
+    """
+    groups = {}
+    for env in environments:
+        if not (env._use_templates and env.supports_templates):
+            continue
+        if env.check_presence():
+            continue
+        groups.setdefault(env._get_template_key(), {})[env.dir_name] = env
+
+    templates = {}
+    for group in groups.values():
+        if len(group) < 2:
+            continue
+
+        envs = list(group.values())
+        common = dict(envs[0]._requirements)
+        for env in envs[1:]:
+            common = {
+                key: value for key, value in common.items() if env._requirements.get(key) == value
+            }
+
+        template = envs[0].make_template(common)
+        for dir_name in group:
+            templates[dir_name] = template
+
+    return templates
+
+
+def _clone_environment(src, dst):
+    """
+    Copy an environment directory to a new location.
+
+    Files inside package directories in ``site-packages`` are hardlinked
+    when possible; installers replace rather than modify such files, so
+    the copies stay independent.  Other files are copied, and references
+    to the old location in text files (scripts, activation scripts and
+    configuration) are rewritten.  Bytecode caches are not copied, as
+    they record the original source paths.
+    """
+    src = os.path.abspath(src)
+    dst = os.path.abspath(dst)
+    src_bytes = os.fsencode(src)
+    dst_bytes = os.fsencode(dst)
+
+    def copy_link(src_fn, dst_fn):
+        target = os.readlink(src_fn)
+        if target == src or target.startswith(src + os.sep):
+            target = dst + target[len(src) :]
+        os.symlink(target, dst_fn)
+
+    for root, dirs, files in os.walk(src):
+        rel = os.path.relpath(root, src)
+        dst_root = os.path.normpath(os.path.join(dst, rel))
+        os.makedirs(dst_root, exist_ok=True)
+        in_package = 'site-packages' in rel.split(os.sep)[:-1]
+
+        for name in list(dirs):
+            if name == '__pycache__':
+                dirs.remove(name)
+            elif os.path.islink(os.path.join(root, name)):
+                copy_link(os.path.join(root, name), os.path.join(dst_root, name))
+                dirs.remove(name)
+
+        for name in files:
+            src_fn = os.path.join(root, name)
+            dst_fn = os.path.join(dst_root, name)
+
+            if os.path.islink(src_fn):
+                copy_link(src_fn, dst_fn)
+                continue
+
+            if in_package:
+                try:
+                    os.link(src_fn, dst_fn)
+                    continue
+                except OSError:
+                    pass
+
+            shutil.copy2(src_fn, dst_fn)
+
+            if in_package or os.path.getsize(dst_fn) > 1024 * 1024:
+                continue
+
+            with open(dst_fn, 'rb') as f:
+                data = f.read()
+            if src_bytes in data and b'\0' not in data:
+                with open(dst_fn, 'wb') as f:
+                    f.write(data.replace(src_bytes, dst_bytes))
+            shutil.copystat(src_fn, dst_fn)
+
+
 class EnvironmentUnavailable(BaseException):
     pass
 
@@ -471,6 +599,8 @@ class Environment:
 
     tool_name = None
     matches_python_fallback = True
+    supports_templates = False
+    supports_wheelhouse = False
 
     def __init__(self, conf, python, requirements, tagged_env_vars):
         """
@@ -513,6 +643,23 @@ class Environment:
         self._cache = build_cache.BuildCache(conf, self._path)
         self._build_root = os.path.abspath(os.path.join(self._path, 'project'))
 
+        if getattr(conf, 'global_build_cache_dir', None):
+            self._global_cache = build_cache.GlobalBuildCache(conf)
+        else:
+            self._global_cache = None
+        self._abi_tag = None
+
+        if getattr(conf, 'shared_source_trees', False):
+            self._source_trees = source_trees.SharedSourceTrees(
+                os.path.join(os.path.abspath(self._env_dir), 'asv-source-trees')
+            )
+        else:
+            self._source_trees = None
+
+        # Outcome of the build cache lookup in the last install_project:
+        # 'hit', 'shared', 'miss', or None if nothing was built
+        self.build_cache_status = None
+
         self._requirements = requirements
         # These are needed for asv to build and run the project, not part of
         # benchmark name mangling
@@ -563,8 +710,18 @@ class Environment:
                 del self._requirements[key]
 
         self._build_command = conf.build_command
+        self._incremental_build = getattr(conf, 'incremental_build', False)
+        self._use_templates = getattr(conf, 'environment_templates', False)
+        wheelhouse_dir = getattr(conf, 'wheelhouse_dir', None)
+        self._wheelhouse_dir = os.path.abspath(wheelhouse_dir) if wheelhouse_dir else None
         self._install_command = conf.install_command
         self._uninstall_command = conf.uninstall_command
+        # Only replaces the default pip install commands
+        self._fast_install = (
+            getattr(conf, 'fast_install', False)
+            and self._install_command is None
+            and self._uninstall_command is None
+        )
 
         self._global_env_vars = {}
         self._global_env_vars['ASV'] = 'true'
@@ -726,10 +883,82 @@ class Environment:
 
         return True
 
-    def create(self):
+    def copy(self, conf, suffix):
+        """
+        Return a copy of the environment, residing in a separate
+        directory, so that different commits can be installed in the
+        copies at the same time.  The copy needs to be created with
+        `create` before use.
+
+        Parameters
+        ----------
+        conf : dict
+            asv configuration object
+        suffix : str
+            Suffix added to the environment directory name.
+
+        """
+        env = copy.copy(self)
+        env._path = f"{self._path}-{suffix}"
+        env._is_setup = False
+        env._cache = build_cache.BuildCache(conf, env._path)
+        env._build_root = os.path.abspath(os.path.join(env._path, 'project'))
+        env._global_env_vars = dict(self._global_env_vars)
+        env._global_env_vars['ASV_ENV_DIR'] = env._path
+        env._set_commit_hash(env._get_installed_commit_hash())
+        return env
+
+    def _get_template_key(self):
+        """
+        Environments with the same key differ only in their requirements,
+        and can be cloned from a common template.
+        """
+        return json.dumps(
+            [self.tool_name, self._python, self._base_requirements, self.build_env_vars],
+            sort_keys=True,
+        )
+
+    def make_template(self, requirements):
+        """
+        Return a copy of the environment with only the given
+        requirements, residing in a separate directory, for use as a
+        template in `create`.  The template needs to be created with
+        `create` before use, and is not meant for installing the
+        project.
+
+        Parameters
+        ----------
+        requirements : dict (str -> str)
+            Mapping from package names to versions
+
+        """
+        key = hashlib.sha256(
+            json.dumps([self._get_template_key(), requirements], sort_keys=True).encode('utf-8')
+        ).hexdigest()[:12]
+
+        env = copy.copy(self)
+        env._requirements = dict(requirements)
+        env._path = os.path.abspath(os.path.join(self._env_dir, f"template-{key}"))
+        env._is_setup = False
+        env._global_env_vars = dict(self._global_env_vars)
+        env._global_env_vars['ASV_ENV_NAME'] = env.name
+        env._global_env_vars['ASV_ENV_DIR'] = env._path
+        env._set_commit_hash(None)
+        return env
+
+    def create(self, template=None):
         """
         Create the environment on disk.  If it doesn't exist, it is
         created.  Then, all of the requirements are installed into it.
+
+        Parameters
+        ----------
+        template : Environment, optional
+            Template environment made with `make_template` and already
+            created.  If given, and the environment supports it, the
+            environment is created by cloning the template and
+            installing the remaining requirements.
+
         """
         if self._is_setup:
             return
@@ -752,7 +981,10 @@ class Environment:
                     pass
 
             try:
-                self._setup()
+                if template is not None and self.supports_templates:
+                    self._setup_from_template(template)
+                else:
+                    self._setup()
             except Exception:
                 log.error(f"Failure creating environment for {self.name}")
                 if os.path.exists(self._path):
@@ -769,6 +1001,110 @@ class Environment:
         """
         raise NotImplementedError()
 
+    @contextlib.contextmanager
+    def _log_duration(self, phase):
+        """
+        Context manager logging, at debug level, the time taken by a
+        phase of setting up the environment.
+        """
+        start = time.perf_counter()
+        yield
+        duration = time.perf_counter() - start
+        log.debug(f"{phase} for {self.name} took {util.human_time(duration)}")
+
+    def _setup_from_template(self, template):
+        """
+        Set up the environment by cloning the template environment, and
+        installing the requirements it does not have.
+        """
+        log.info(f"Cloning {template.name} for {self.name}")
+        with self._log_duration("Cloning template"):
+            _clone_environment(template._path, self._path)
+
+        requirements = {
+            key: value
+            for key, value in self._requirements.items()
+            if template._requirements.get(key) != value
+        }
+        if requirements:
+            log.info(f"Installing requirements for {self.name}")
+            self._install_requirements(requirements)
+
+    def _get_pip_declarations(self, requirements):
+        pip_args = []
+
+        for key, val in requirements.items():
+            if key.startswith("pip+"):
+                pip_args.append(f"{key[4:]} {val}")
+            else:
+                pip_args.append(f"{key} {val}")
+
+        return [util.ParsedPipDeclaration(declaration) for declaration in pip_args]
+
+    def _install_requirements(self, requirements=None):
+        """
+        Install requirements into the environment with pip, run via
+        ``_run_pip``.  If *requirements* is None, pip and wheel are
+        upgraded first and all the requirements of the environment are
+        installed.
+        """
+        env = dict(os.environ)
+        env.update(self.build_env_vars)
+
+        if self._wheelhouse_dir:
+            index_args = ['--no-index', f'--find-links={self._wheelhouse_dir}']
+        else:
+            index_args = []
+
+        if requirements is None:
+            pip_args = ['install', '-v'] + index_args + ['wheel', 'pip>=8']
+            with self._log_duration("Installing pip and wheel"):
+                self._run_pip(pip_args, env=env)
+            requirements = {**self._requirements, **self._base_requirements}
+
+        declarations = self._get_pip_declarations(requirements)
+
+        # Install plain requirements with a single resolver run; editable,
+        # path, URL and flagged declarations are installed one by one
+        batch = [d for d in declarations if util.can_batch_pip_declaration(d)]
+        declarations = [d for d in declarations if not util.can_batch_pip_declaration(d)]
+
+        if batch:
+            pip_call = util.construct_pip_batch_call(self._run_pip, batch, index_args)
+            with self._log_duration(f"Installing {len(batch)} requirements"):
+                pip_call(env=env)
+
+        for parsed_declaration in declarations:
+            pip_call = util.construct_pip_call(self._run_pip, parsed_declaration, index_args)
+            name = parsed_declaration.pkgname or parsed_declaration.path
+            with self._log_duration(f"Installing {name}"):
+                pip_call()
+
+    def download_requirements(self, path):
+        """
+        Download the requirements of the environment into a local
+        directory (a wheelhouse), from which environments can later be
+        created without network access (see ``wheelhouse_dir``).
+        """
+        if not self.supports_wheelhouse:
+            raise NotImplementedError()
+
+        env = dict(os.environ)
+        env.update(self.build_env_vars)
+
+        log.info(f"Downloading requirements for {self.name}")
+
+        pip_args = ['download', '-v', '-d', path, 'wheel', 'pip>=8']
+        requirements = {**self._requirements, **self._base_requirements}
+        for parsed_declaration in self._get_pip_declarations(requirements):
+            if util.can_batch_pip_declaration(parsed_declaration):
+                pip_args.append(util.get_pip_requirement(parsed_declaration))
+            else:
+                name = parsed_declaration.pkgname or parsed_declaration.path
+                log.warning(f"Not adding {name} to the wheelhouse: not a plain requirement")
+
+        self._run_pip(pip_args, env=env)
+
     def run(self, args, **kwargs):
         """
         Start up the environment's python executable with the given
@@ -848,17 +1184,48 @@ class Environment:
         Check out the working tree of the project at given commit hash
         """
         self._set_commit_hash(commit_hash)
-        repo.checkout(self._build_root, commit_hash)
+        self._build_root = self._checkout_source_tree(
+            repo, commit_hash, self._path, os.path.join(self._path, 'project')
+        )
+
+    def _checkout_source_tree(self, repo, commit_hash, user, path):
+        """
+        Check out a source tree, either at the given path, or a shared
+        one if enabled.  Returns the path to the tree.
+        """
+        if self._source_trees is None:
+            repo.checkout(path, commit_hash, incremental=self._incremental_build)
+            return os.path.abspath(path)
+
+        return self._source_trees.acquire(repo, self._get_source_tree_key(), commit_hash, user)
+
+    def _get_source_tree_key(self):
+        """
+        Environments with the same key can build from the same source tree.
+        """
+        data = json.dumps([self._repo_subdir, self._build_command])
+        return hashlib.sha256(data.encode('utf-8')).hexdigest()[:16]
+
+    def _lock_source_tree(self, build_root):
+        """
+        Context manager for exclusive use of a shared source tree.
+        """
+        if self._source_trees is None:
+            return contextlib.nullcontext()
+        return self._source_trees.lock(build_root)
+
+    def _get_build_dir(self, build_root):
+        if self._repo_subdir:
+            return os.path.join(build_root, self._repo_subdir)
+        else:
+            return build_root
 
     def install_project(self, conf, repo, commit_hash):
         """
         Build and install the benchmarked project into the environment.
         Uninstalls any installed copy of the project first.
         """
-        if self._repo_subdir:
-            build_dir = os.path.join(self._build_root, self._repo_subdir)
-        else:
-            build_dir = self._build_root
+        self.build_cache_status = None
 
         # Check first if anything needs to be done
         installed_commit_hash = self._get_installed_commit_hash()
@@ -870,22 +1237,28 @@ class Environment:
         # Checkout first, so that uninstall can access build_dir
         # (for e.g. Makefiles)
         self.checkout_project(repo, commit_hash)
-        self._set_build_dirs(build_dir, None)
+        build_dir = self._get_build_dir(self._build_root)
 
-        # Uninstall
-        self._uninstall_project()
+        with self._lock_source_tree(self._build_root):
+            self._set_build_dirs(build_dir, None)
 
-        # Build if not in cache
-        cache_dir = self._cache.get_cache_dir(commit_hash)
-        if cache_dir is not None:
-            self._set_build_dirs(build_dir, cache_dir)
-        else:
-            cache_dir = self._cache.create_cache_dir(commit_hash)
-            self._set_build_dirs(build_dir, cache_dir)
-            self._build_project(repo, commit_hash, build_dir)
+            # Uninstall
+            self._uninstall_project()
+
+            # Build if not in cache
+            cache_dir = self._cache.get_cache_dir(commit_hash)
+            if cache_dir is not None:
+                self._set_build_dirs(build_dir, cache_dir)
+                self.build_cache_status = 'hit'
+            else:
+                cache_dir = self._cache.create_cache_dir(commit_hash)
+                self._set_build_dirs(build_dir, cache_dir)
+                self._build_or_fetch_project(
+                    repo, commit_hash, self._build_root, build_dir, cache_dir
+                )
 
-        # Install
-        self._install_project(repo, commit_hash, build_dir)
+            # Install
+            self._install_project(repo, commit_hash, build_dir)
 
         # Mark cached build as valid
         self._cache.finalize_cache_dir(commit_hash)
@@ -893,10 +1266,140 @@ class Environment:
         # Mark installation as updated
         self._set_installed_commit_hash(commit_hash)
 
+    def _build_or_fetch_project(self, repo, commit_hash, build_root, build_dir, cache_dir):
+        """
+        Fill the build cache directory, from the global build cache if
+        possible, and otherwise by running the build commands.
+        """
+        if self._global_cache is None:
+            self.build_cache_status = 'miss'
+            self._build_project_with_fallback(repo, commit_hash, build_root, build_dir, cache_dir)
+            return
+
+        key = self._get_global_cache_key(commit_hash)
+        with self._global_cache.lock(key):
+            if self._global_cache.fetch(key, cache_dir):
+                log.info(f"Using shared build of {commit_hash[:8]}")
+                self.build_cache_status = 'shared'
+            else:
+                self.build_cache_status = 'miss'
+                self._build_project_with_fallback(
+                    repo, commit_hash, build_root, build_dir, cache_dir
+                )
+                self._global_cache.store(key, cache_dir)
+
+    def _build_project_with_fallback(self, repo, commit_hash, build_root, build_dir, cache_dir):
+        """
+        Run build commands.  If an incremental build fails, retry it
+        from a clean checkout.
+        """
+        if not self._incremental_build:
+            self._build_project(repo, commit_hash, build_dir)
+            return
+
+        try:
+            self._build_project(repo, commit_hash, build_dir)
+        except util.ProcessError:
+            log.warning("Incremental build failed, retrying from a clean checkout")
+            repo.checkout(build_root, commit_hash)
+            util.long_path_rmtree(cache_dir)
+            os.makedirs(cache_dir)
+            self._build_project(repo, commit_hash, build_dir)
+
+    def prebuild_project(self, conf, repo, commit_hash):
+        """
+        Build the benchmarked project into the build cache, without
+        installing it.
+
+        The build uses a separate source tree, so that it can be done
+        in another process while benchmarks run in the environment.
+        It must not be run concurrently with `install_project`.
+        """
+        if self._cache.get_cache_dir(commit_hash) is not None:
+            return
+
+        self._set_commit_hash(commit_hash)
+        build_root = self._checkout_source_tree(
+            repo,
+            commit_hash,
+            f"{self._path}#prebuild",
+            os.path.join(self._path, 'project-prebuild'),
+        )
+        build_dir = self._get_build_dir(build_root)
+
+        # Build outside the cache, so that the cache cleanup does not
+        # consider the partial build stale
+        tmp_dir = os.path.join(self._path, 'asv-prebuild', commit_hash)
+        if os.path.isdir(tmp_dir):
+            util.long_path_rmtree(tmp_dir)
+        os.makedirs(tmp_dir)
+        try:
+            with self._lock_source_tree(build_root):
+                self._set_build_dirs(build_dir, tmp_dir)
+                self._build_or_fetch_project(repo, commit_hash, build_root, build_dir, tmp_dir)
+            self._cache.add_cache_dir(commit_hash, tmp_dir)
+        finally:
+            if os.path.isdir(tmp_dir):
+                util.long_path_rmtree(tmp_dir)
+
+    def get_build_cache_size(self):
+        """
+        Return the number of builds in the environment's build cache,
+        and their total size in bytes.
+        """
+        return self._cache.get_size()
+
+    def _get_abi_tag(self):
+        """
+        Get a string identifying the binary interface of the Python in
+        the environment.
+        """
+        if self._abi_tag is None:
+            self._abi_tag = self.run(
+                [
+                    '-c',
+                    'import sys, sysconfig; '
+                    'print(sys.implementation.cache_tag + getattr(sys, "abiflags", "") '
+                    '+ "-" + sysconfig.get_platform())',
+                ],
+                display_error=False,
+            ).strip()
+        return self._abi_tag
+
+    def _get_global_cache_key(self, commit_hash):
+        """
+        Get the key of a build in the global build cache.
+
+        The key includes the requirements needed for building the
+        project, and the versions chosen in the matrix for them, but
+        not other requirements.
+        """
+        requirements = dict(self._base_requirements)
+        build_names = {_get_requirement_name(key) for key in self._base_requirements}
+        for key, value in self._requirements.items():
+            if _get_requirement_name(key) in build_names:
+                requirements[key] = value
+
+        return build_cache.GlobalBuildCache.get_key(
+            commit_hash,
+            self._get_abi_tag(),
+            requirements,
+            self.build_env_vars,
+            self._build_command,
+            self._repo_subdir,
+        )
+
     def _install_project(self, repo, commit_hash, build_dir):
         """
         Run install commands
         """
+        if self._fast_install:
+            if self._unpack_wheel(repo, commit_hash):
+                return
+            # Fall back to pip, running the uninstall deferred by
+            # _uninstall_project
+            self._run_uninstall_commands()
+
         cmd = self._install_command
         if cmd is None:
             # Run pip via python -m pip, avoids shebang length limit on Linux.
@@ -920,6 +1423,13 @@ class Environment:
         # Mark installation invalid first
         self._set_installed_commit_hash(None)
 
+        if self._fast_install:
+            # The installed files are replaced in _install_project
+            return
+
+        self._run_uninstall_commands()
+
+    def _run_uninstall_commands(self):
         cmd = self._uninstall_command
         if cmd is None:
             # Run pip via python -m pip, avoids shebang length limit on Linux
@@ -932,6 +1442,54 @@ class Environment:
                 cmd, default_cwd=self._env_dir, extra_env=self.build_env_vars
             )
 
+    def _unpack_wheel(self, repo, commit_hash):
+        """
+        Install the built wheel by unpacking it directly into the
+        environment, replacing the files of the installed copy of the
+        project, without running pip.
+
+        Returns
+        -------
+        success : bool
+            False if the wheel could not be installed this way, and the
+            install commands need to be run instead.
+
+        """
+        cache_dir = self._global_env_vars.get('ASV_BUILD_CACHE_DIR')
+        if cache_dir is None or not os.path.isdir(cache_dir):
+            return False
+
+        wheels = [fn for fn in os.listdir(cache_dir) if fn.lower().endswith('.whl')]
+        if len(wheels) != 1:
+            return False
+
+        commit_name = repo.get_decorated_hash(commit_hash, 8)
+        log.info(f"Unpacking {commit_name} into {self.name}")
+
+        env_vars = dict(os.environ)
+        env_vars.update(self.env_vars)
+
+        out, err, retcode = self.run(
+            [WHEEL_INSTALL_SCRIPT, self._project, os.path.join(cache_dir, wheels[0])],
+            cwd=self._path,
+            env=env_vars,
+            timeout=self._install_timeout,
+            valid_return_codes=None,
+            return_stderr=True,
+            redirect_stderr=True,
+            dots=False,
+        )
+
+        if retcode == 0:
+            return True
+
+        if retcode == wheel_install.CANNOT_INSTALL:
+            log.debug(out.strip())
+        else:
+            log.warning("Unpacking the wheel failed, installing with pip instead")
+            log.debug(out.strip())
+        return False
+
     def _build_project(self, repo, commit_hash, build_dir):
         """
         Run build commands
@@ -1,11 +1,18 @@
 # Licensed under a 3-clause BSD style license - see LICENSE.rst
 
+import array
+import json
 import math
 import os
 import traceback
 
 from . import step_detect, util
-from .util import geom_mean_na, is_na, mean_na
+from .util import geom_mean_na, is_na
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 # This is the maximum number of points to include in summary graphs.
 # It is based on the number of pixels in the summary graph display on
@@ -61,11 +68,45 @@ class GraphSet:
             if dots is not None:
                 dots()
 
-    def save(self, html_dir, dots=None):
-        for graph in self._graphs.values():
-            graph.save(html_dir)
-            if dots is not None:
-                dots()
+    def save(
+        self, html_dir, dots=None, lowres_points=None, tile_points=None, pool=None, bundle=False
+    ):
+        """
+        Save all graphs to .json files used by the frontend.
+
+        Parameters
+        ----------
+        html_dir : str
+            The root of the HTML tree.
+        dots : callable, optional
+            Called after each saved graph, or bundle.
+        lowres_points, tile_points : int, optional
+            See `Graph.save`.
+        pool : multiprocessing.Pool, optional
+            Pool to use for serializing and writing the graphs.
+            If not given, run in serial.
+        bundle : bool, optional
+            Whether to pack the graphs of each benchmark into a
+            single bundle file, see `_save_graph_bundle`.
+
+        """
+        kwargs = {'lowres_points': lowres_points, 'tile_points': tile_points}
+        if bundle:
+            jobs = [(_save_graph_bundle, (graphs, html_dir)) for graphs in self._groups.values()]
+        else:
+            jobs = [(_save_graph, (graph, html_dir)) for graph in self._graphs.values()]
+
+        if pool is None:
+            for func, args in jobs:
+                func(*args, reraise=False, **kwargs)
+                if dots is not None:
+                    dots()
+        else:
+            results = [pool.apply_async(func, args, kwargs) for func, args in jobs]
+            for result in results:
+                result.get()
+                if dots is not None:
+                    dots()
 
     def __iter__(self):
         return iter(self._graphs.items())
@@ -80,8 +121,28 @@ class Graph:
 
     Unlike "results", which contain the timings for a single commit,
     these contain the timings for a single benchmark.
+
+    The data is not stored point by point. Instead, each distinct
+    revision gets a slot in a set of flat typed arrays, holding the
+    running sums and counts of the values and weights added for that
+    revision, from which the per-revision means are computed.
     """
 
+    __slots__ = (
+        '_revisions',
+        '_slots',
+        '_steps',
+        '_value_counts',
+        '_value_sums',
+        '_weight_counts',
+        '_weight_sums',
+        'benchmark_name',
+        'n_series',
+        'params',
+        'path',
+        'scalar_series',
+    )
+
     def __init__(self, benchmark_name, params):
         """
         Initially the graph contains no data.  It must be added using
@@ -99,8 +160,15 @@ class Graph:
         """
         self.benchmark_name = benchmark_name
         self.params = params
-        self.data_points = {}
-        self.data_weights = {}
+
+        # Map revision -> slot index in the arrays below. The value
+        # arrays are laid out as slot * n_series + series index.
+        self._slots = {}
+        self._revisions = array.array('q')
+        self._value_sums = array.array('d')
+        self._value_counts = array.array('q')
+        self._weight_sums = array.array('d')
+        self._weight_counts = array.array('q')
 
         self.path = self.get_file_path(self.params, benchmark_name)
         self.n_series = None
@@ -130,6 +198,26 @@ class Graph:
         parts.append(util.sanitize_filename(benchmark_name))
         return os.path.join(*parts)
 
+    def _get_slot(self, revision):
+        slot = self._slots.get(revision)
+        if slot is None:
+            if self._revisions.typecode == 'q' and not isinstance(revision, int):
+                # Non-integer revisions: switch to float storage
+                self._revisions = array.array('d', self._revisions)
+            slot = len(self._revisions)
+            self._slots[revision] = slot
+            self._revisions.append(revision)
+            if self.n_series is not None:
+                self._grow(self.n_series)
+        return slot
+
+    def _grow(self, count):
+        zeros = bytes(8 * count)
+        self._value_sums.frombytes(zeros)
+        self._value_counts.frombytes(zeros)
+        self._weight_sums.frombytes(zeros)
+        self._weight_counts.frombytes(zeros)
+
     def add_data_point(self, revision, value, weight=None):
         """
         Add a data point to the graph.
@@ -147,8 +235,7 @@ class Graph:
             Missing estimates are indicated with None.
 
         """
-        self.data_points.setdefault(revision, [])
-        self.data_weights.setdefault(revision, [])
+        slot = self._get_slot(revision)
         if not is_na(value):
             if not hasattr(value, '__len__'):
                 value = [value]
@@ -158,60 +245,117 @@ class Graph:
 
             if self.n_series is None:
                 self.n_series = len(value)
+                self._grow(len(self._revisions) * self.n_series)
             elif len(value) != self.n_series:
                 raise ValueError("Mismatching number of data series in graph")
 
-            if weight is None:
-                weight = [None] * len(value)
+            pos = slot * self.n_series
+            for j, v in enumerate(value):
+                if not is_na(v):
+                    self._value_sums[pos + j] += v
+                    self._value_counts[pos + j] += 1
 
-            self.data_points[revision].append(value)
-            self.data_weights[revision].append(weight)
+            if weight is not None:
+                for j, w in enumerate(weight):
+                    if not is_na(w):
+                        self._weight_sums[pos + j] += w
+                        self._weight_counts[pos + j] += 1
 
-    def get_data(self):
-        """
-        Get the sorted and reduced data and weights.
+    def _get_columns(self):
         """
+        Get the sorted and reduced data as columns.
 
+        Returns
+        -------
+        x : list
+            Revisions, in increasing order, with the revisions that
+            have missing data at the edges discarded.
+        ys : list of list
+            Mean values for each data series, corresponding to `x`.
+            Missing values are None.
+        ws : list of list
+            Mean weights for each data series, corresponding to `x`.
+
+        """
         if self.n_series is None:
             # No non-null data points
             self.n_series = 1
+            self._grow(len(self._revisions))
 
-        def mean_axis0(v):
-            if not v:
-                return [None] * self.n_series
-            return [mean_na(x[j] for x in v) for j in range(self.n_series)]
+        n_series = self.n_series
+        revisions = self._revisions
+        value_counts = self._value_counts
 
-        # Average data over commit log
-        val = []
-        for k in self.data_points.keys():
-            v = mean_axis0(self.data_points[k])
-            w = mean_axis0(self.data_weights[k])
-            val.append((k, v, w))
-            del v, w
-        val.sort()
+        order = sorted(range(len(revisions)), key=revisions.__getitem__)
 
         # Discard missing data at edges
+        def has_data(slot):
+            pos = slot * n_series
+            return any(value_counts[pos : pos + n_series])
+
         i = 0
-        for i in range(len(val)):
-            if any(not is_na(v) for v in val[i][1]):
-                break
-        else:
-            i = len(val)
+        while i < len(order) and not has_data(order[i]):
+            i += 1
+        j = len(order)
+        while j > i and not has_data(order[j - 1]):
+            j -= 1
+        order = order[i:j]
+
+        def means(sums, counts, j):
+            res = []
+            for slot in order:
+                pos = slot * n_series + j
+                count = counts[pos]
+                res.append(sums[pos] / count if count else None)
+            return res
+
+        x = [revisions[slot] for slot in order]
+        ys = [means(self._value_sums, value_counts, j) for j in range(n_series)]
+        ws = [means(self._weight_sums, self._weight_counts, j) for j in range(n_series)]
+        return x, ys, ws
+
+    def _get_column_arrays(self):
+        """
+        Same as `_get_columns`, but return the revisions and the mean
+        values as Numpy arrays, with missing values as NaN. Weights
+        are not included.
+        """
+        if self.n_series is None:
+            self.n_series = 1
+            self._grow(len(self._revisions))
 
-        j = i
-        for j in range(len(val) - 1, i, -1):
-            if any(not is_na(v) for v in val[j][1]):
-                break
+        revisions = np.array(self._revisions)
+        sums = np.array(self._value_sums).reshape(-1, self.n_series).T
+        counts = np.array(self._value_counts).reshape(-1, self.n_series).T
 
-        val = val[i : j + 1]
+        order = np.argsort(revisions, kind='stable')
+        sums = sums[:, order]
+        counts = counts[:, order]
+
+        # Discard missing data at edges
+        has_data = np.flatnonzero(counts.any(axis=0))
+        if len(has_data) == 0:
+            return revisions[:0], np.empty((self.n_series, 0))
+        i, j = has_data[0], has_data[-1] + 1
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            ys = np.where(counts[:, i:j] > 0, sums[:, i:j] / counts[:, i:j], np.nan)
+
+        return revisions[order[i:j]], ys
+
+    def get_data(self):
+        """
+        Get the sorted and reduced data and weights.
+        """
+        x, ys, ws = self._get_columns()
 
         # Single-element series
         if self.scalar_series:
-            val = [(k, v[0], w[0]) for k, v, w in val]
+            return list(zip(x, ys[0], ws[0]))
 
-        return val
+        return [(k, [y[i] for y in ys], [w[i] for w in ws]) for i, k in enumerate(x)]
 
-    def save(self, html_dir):
+    def save(self, html_dir, lowres_points=None, tile_points=None):
         """
         Save the graph to a .json file used by the frontend.
 
@@ -219,13 +363,97 @@ class Graph:
         ----------
         html_dir : str
             The root of the HTML tree.
+        lowres_points : int, optional
+            If given, also save a low-resolution version of the graph,
+            downsampled to at most this many points per data series,
+            to a ``.lowres.json`` file. The frontend loads it first,
+            and fetches the full data only when zooming in.
+        tile_points : int, optional
+            If given, also save the graph as multi-resolution tiles
+            with at most this many points per data series in each
+            tile, see `_save_tiles`.
         """
+        x, ys, val = self._get_saved_data()
+
         filename = os.path.join(html_dir, self.path + ".json")
+        util.write_json(filename, val, compact=True)
 
+        self._save_downsampled(html_dir, x, ys, val, lowres_points, tile_points)
+
+    def _get_saved_data(self):
+        """
+        Get the columns of the graph data, and the data as saved for
+        the frontend, as a list of (x, y) pairs.
+        """
         # Drop weights
-        val = [v[:2] for v in self.get_data()]
+        x, ys, _ = self._get_columns()
+        if self.scalar_series:
+            val = list(zip(x, ys[0]))
+        else:
+            val = list(zip(x, (list(v) for v in zip(*ys))))
+        return x, ys, val
 
-        util.write_json(filename, val, compact=True)
+    def _save_downsampled(self, html_dir, x, ys, val, lowres_points, tile_points):
+        """
+        Save the low-resolution and tiled versions of the graph data.
+        """
+        if lowres_points is not None:
+            idx = _downsample_series(x, ys, lowres_points)
+            lowres = val if idx is None else [val[i] for i in idx]
+            filename = os.path.join(html_dir, self.path + ".lowres.json")
+            util.write_json(filename, lowres, compact=True)
+
+        if tile_points is not None:
+            self._save_tiles(html_dir, x, ys, val, tile_points)
+
+    def _save_tiles(self, html_dir, x, ys, val, tile_points):
+        """
+        Save the graph data as a pyramid of tiles of increasing
+        resolution.
+
+        Level ``k`` splits the data into ``2**k`` tiles with equal
+        numbers of points, and each tile is downsampled to at most
+        `tile_points` points per data series. The last level contains
+        the full data. The tile of level 0 (the coarse overview) and
+        the revision range of each tile are saved in a
+        ``.tiles.json`` index file, and the other tiles in
+        ``.tiles/<level>-<tile>.json`` files. An empty graph has no
+        levels.
+        """
+        if tile_points < 1:
+            raise ValueError(f"tile_points must be at least 1, got {tile_points}")
+
+        n = len(val)
+        levels = []
+        overview = []
+
+        level = 0
+        while n > 0:
+            num_tiles = 2**level
+            bounds = []
+            for i in range(num_tiles):
+                a = i * n // num_tiles
+                b = (i + 1) * n // num_tiles
+                idx = _downsample_series(x[a:b], [y[a:b] for y in ys], tile_points)
+                if idx is None:
+                    tile = val[a:b]
+                else:
+                    tile = [val[a + j] for j in idx]
+
+                bounds.append([x[a], x[b - 1]])
+                if level == 0:
+                    overview = tile
+                else:
+                    filename = os.path.join(html_dir, self.path + ".tiles", f"{level}-{i}.json")
+                    util.write_json(filename, tile, compact=True)
+
+            levels.append(bounds)
+            if n <= num_tiles * tile_points:
+                break
+            level += 1
+
+        filename = os.path.join(html_dir, self.path + ".tiles.json")
+        util.write_json(filename, {'levels': levels, 'overview': overview}, compact=True)
 
     def detect_steps(self, pool=None):
         """
@@ -244,22 +472,19 @@ class Graph:
             # Already computed
             return
 
-        val = self.get_data()
+        x, ys, ws = self._get_columns()
 
-        if not val:
+        if not x:
             # Nothing to compute
             self._steps = [[]] * self.n_series
             return
 
-        if self.scalar_series:
-            items = [val]
-        else:
-            items = [[(v[0], v[1][j], v[2][j]) for v in val] for j in range(self.n_series)]
+        items = [(x, y, w) for y, w in zip(ys, ws)]
 
         if pool is None:
-            self._steps = [_compute_graph_steps(item, reraise=False) for item in items]
+            self._steps = [_compute_graph_steps(*item, reraise=False) for item in items]
         else:
-            self._steps = [pool.apply_async(_compute_graph_steps, (item,)) for item in items]
+            self._steps = [pool.apply_async(_compute_graph_steps, item) for item in items]
 
     def get_steps(self):
         """
@@ -289,12 +514,8 @@ class Graph:
             return self._steps
 
 
-def _compute_graph_steps(data, reraise=True):
+def _compute_graph_steps(x, y, w, reraise=True):
     try:
-        x = [d[0] for d in data]
-        y = [d[1] for d in data]
-        w = [d[2] for d in data]
-
         steps = step_detect.detect_steps(y, w)
         new_steps = []
 
@@ -309,13 +530,68 @@ def _compute_graph_steps(data, reraise=True):
             raise
 
 
+def _save_graph(graph, html_dir, reraise=True, **kwargs):
+    try:
+        graph.save(html_dir, **kwargs)
+    except BaseException as exc:
+        if reraise:
+            raise util.ParallelFailure(str(exc), exc.__class__, traceback.format_exc())
+        else:
+            raise
+
+
+def _save_graph_bundle(graphs, html_dir, reraise=True, **kwargs):
+    """
+    Save the data of the given graphs of a benchmark to a single
+    ``graphs/<benchmark_name>.bundle`` file.
+
+    The first line of the file is a JSON object mapping each graph
+    path to the ``[offset, length]`` of its JSON data in the rest of
+    the file, which contains the data of each graph concatenated. The
+    file contains only ASCII, so that the offsets are valid both in
+    bytes and in characters.
+
+    The low-resolution and tiled versions of the graphs are saved in
+    separate files, as for `Graph.save`.
+    """
+    try:
+        index = {}
+        chunks = []
+        offset = 0
+        for graph in graphs:
+            x, ys, val = graph._get_saved_data()
+            text = json.dumps(val)
+            index[graph.path.replace(os.sep, '/')] = [offset, len(text)]
+            chunks.append(text)
+            offset += len(text)
+
+            graph._save_downsampled(html_dir, x, ys, val, **kwargs)
+
+        filename = os.path.join(
+            html_dir, 'graphs', util.sanitize_filename(graphs[0].benchmark_name) + '.bundle'
+        )
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        with util.long_path_open(filename, 'w', encoding='utf-8') as fd:
+            fd.write(json.dumps(index))
+            fd.write('\n')
+            fd.writelines(chunks)
+    except BaseException as exc:
+        if reraise:
+            raise util.ParallelFailure(str(exc), exc.__class__, traceback.format_exc())
+        else:
+            raise
+
+
 def make_summary_graph(graphs):
-    x, ys = _combine_graph_data(graphs)
-    y = _compute_summary_data_series(*ys)
-    val = list(zip(x, y))
+    if np is not None:
+        val = _make_summary_data_array(graphs)
+    else:
+        x, ys = _combine_graph_data(graphs)
+        y = _compute_summary_data_series(*ys)
+        val = list(zip(x, y))
 
-    # Resample
-    val = resample_data(val)
+        # Resample
+        val = resample_data(val)
 
     # Return as a graph
     graph = Graph(graphs[0].benchmark_name, {'summary': ''})
@@ -413,51 +689,260 @@ def _combine_graph_data(graphs):
         the missing data is indicated by None values.
 
     """
-    datasets = [graph.get_data() for graph in graphs]
-    n_series = sum(graph.n_series for graph in graphs)
+    columns = [graph._get_columns() for graph in graphs]
 
     # Find distinct x-values
     x = set()
-    for dataset in datasets:
-        x.update(k for k, _, _ in dataset)
+    for gx, _, _ in columns:
+        x.update(gx)
 
     x = sorted(x)
     x_idx = dict(zip(x, range(len(x))))
 
     # Get y-values
-    ys = [[None] * len(x_idx) for j in range(n_series)]
-    pos = 0
-    for dataset, graph in zip(datasets, graphs):
-        for k, v, dv in dataset:
-            i = x_idx[k]
-            if graph.scalar_series:
-                v = [v]
-
-            for j, y in enumerate(v):
-                ys[pos + j][i] = y
-        pos += graph.n_series
+    ys = []
+    for gx, gys, _ in columns:
+        idx = [x_idx[k] for k in gx]
+        for gy in gys:
+            y = [None] * len(x)
+            for i, v in zip(idx, gy):
+                y[i] = v
+            ys.append(y)
 
     return x, ys
 
 
 def resample_data(val, num_points=RESAMPLED_POINTS):
-    if len(val) < num_points:
+    """
+    Downsample a list of (x, y) pairs to at most `num_points` points.
+
+    The points are selected with the Largest-Triangle-Three-Buckets
+    algorithm, which keeps the points that matter most for the visual
+    shape of the series, so that e.g. spikes are not averaged away.
+    Missing values are dropped from downsampled data.
+    """
+    if len(val) <= num_points:
         return val
 
-    min_revision = min(x[0] for x in val)
-    max_revision = max(x[0] for x in val)
-    step_size = int((max_revision - min_revision) / num_points)
-
-    if step_size == 0:
-        step_size = max_revision - min_revision + 1
-
-    new_val = []
-    j = 0
-    for i in range(min_revision + step_size, max_revision + step_size, step_size):
-        chunk = []
-        while j < len(val) and val[j][0] < i:
-            chunk.append(val[j][1])
-            j += 1
-        if len(chunk):
-            new_val.append((i, mean_na(chunk)))
-    return new_val
+    val = [item for item in val if not is_na(item[1])]
+    idx = _lttb([x for x, _ in val], [y for _, y in val], int(num_points))
+    return [val[i] for i in idx]
+
+
+def _downsample_series(x, ys, num_points):
+    """
+    Select the indices of points to keep when downsampling the
+    multi-series data ``ys`` to `num_points` points per series.
+
+    Returns the union of the points selected for each series, or None
+    if no series needs to be downsampled.
+    """
+    selected = set()
+    downsampled = False
+    for y in ys:
+        valid = [i for i, v in enumerate(y) if v is not None]
+        if len(valid) <= num_points:
+            selected.update(valid)
+            continue
+        downsampled = True
+        idx = _lttb([x[i] for i in valid], [y[i] for i in valid], num_points)
+        selected.update(valid[i] for i in idx)
+
+    if not downsampled:
+        return None
+    return sorted(selected)
+
+
+def _lttb(x, y, num_points):
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+
+    Returns the indices of the (at most) `num_points` points of the
+    series ``(x, y)`` that are retained. The first and the last point
+    are always kept; out of each bucket in between, the point forming
+    the largest triangle with the previously selected point and the
+    average of the next bucket is selected.
+
+    References
+    ----------
+    S. Steinarsson, "Downsampling Time Series for Visual
+    Representation", MSc thesis, University of Iceland (2013).
+
+    """
+    n = len(x)
+    if n <= num_points or num_points < 3:
+        return list(range(n))
+
+    every = (n - 2) / (num_points - 2)
+    a = 0
+    indices = [0]
+
+    for i in range(num_points - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+
+        avg_x = sum(x[end:next_end]) / (next_end - end)
+        avg_y = sum(y[end:next_end]) / (next_end - end)
+        ax = x[a]
+        ay = y[a]
+
+        max_area = -1
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (y[j] - ay) - (ax - x[j]) * (avg_y - ay))
+            if area > max_area:
+                max_area = area
+                a = j
+
+        indices.append(a)
+
+    indices.append(n - 1)
+    return indices
+
+
+#
+# Numpy implementations of the summary graph computation. These
+# give results identical to the pure-Python versions above: apart
+# from the power function, which is evaluated via the Python builtin,
+# they use only correctly rounded floating point operations, carried
+# out in the same order.
+#
+
+
+def _make_summary_data_array(graphs):
+    """
+    Compute resampled summary graph data for `graphs`, as a list of
+    (x, y) pairs.
+    """
+    x, ys = _combine_graph_data_array(graphs)
+    y = _compute_summary_data_array(ys)
+    return _resample_data_array(x, y)
+
+
+def _combine_graph_data_array(graphs):
+    """
+    Same as `_combine_graph_data`, but return arrays ``x`` and ``ys``
+    of shape ``(n,)`` and ``(n_series, n)``, with missing data as NaN.
+    """
+    columns = [graph._get_column_arrays() for graph in graphs]
+
+    x = np.unique(np.concatenate([gx for gx, _ in columns]))
+
+    ys = np.full((sum(len(gys) for _, gys in columns), len(x)), np.nan)
+    pos = 0
+    for gx, gys in columns:
+        ys[pos : pos + len(gys), np.searchsorted(x, gx)] = gys
+        pos += len(gys)
+
+    return x, ys
+
+
+def _fill_missing_data_array(ys, max_gap_fraction=0.1):
+    """
+    Same as `_fill_missing_data`, applied to each row of ``ys``.
+    """
+    valid = ~np.isnan(ys)
+    max_gap_size = np.ceil(max_gap_fraction * valid.sum(axis=1))
+
+    # Pairs of consecutive valid points on the same row
+    rows, cols = np.nonzero(valid)
+    gap_size = cols[1:] - cols[:-1] - 1
+    mask = (rows[1:] == rows[:-1]) & (gap_size > 0) & (gap_size <= max_gap_size[rows[1:]])
+
+    row = rows[1:][mask]
+    prev_idx = cols[:-1][mask]
+    gap_size = gap_size[mask]
+
+    # Expand each gap to the positions inside it
+    k = np.arange(gap_size.sum()) - np.repeat(np.cumsum(gap_size) - gap_size, gap_size) + 1
+    row = np.repeat(row, gap_size)
+    prev_idx = np.repeat(prev_idx, gap_size)
+    gap_size = np.repeat(gap_size, gap_size)
+
+    prev = ys[row, prev_idx]
+    v = ys[row, prev_idx + gap_size + 1]
+
+    filled = ys.copy()
+    filled[row, prev_idx + k] = (v * k + (gap_size + 1 - k) * prev) / (gap_size + 1)
+    return filled
+
+
+def _compute_summary_data_array(ys):
+    """
+    Same as `_compute_summary_data_series`, for the rows of ``ys``.
+    """
+    filled = _fill_missing_data_array(ys)
+    valid = ~np.isnan(filled)
+    count = valid.sum(axis=0)
+
+    with np.errstate(divide='ignore'):
+        exponent = np.broadcast_to(1 / count, filled.shape)
+
+    factors = np.ones(filled.shape)
+    factors[valid] = np.fromiter(
+        map(pow, np.abs(filled[valid]).tolist(), exponent[valid].tolist()),
+        dtype=float,
+        count=int(count.sum()),
+    )
+
+    # Accumulate row by row, in the same order as geom_mean_na
+    prod = np.ones(filled.shape[1])
+    acc = np.zeros(filled.shape[1])
+    terms = np.where(valid, filled, 0.0)
+    for j in range(filled.shape[0]):
+        prod *= factors[j]
+        acc += terms[j]
+
+    res = np.where(acc >= 0, prod, -prod)
+    res[~(~np.isnan(ys)).any(axis=0)] = np.nan
+    return res
+
+
+def _resample_data_array(x, y, num_points=RESAMPLED_POINTS):
+    """
+    Same as `resample_data`, for arrays ``x`` and ``y``. Returns a
+    list of (x, y) pairs with missing values as None.
+    """
+    if len(x) <= num_points:
+        return [(k, None if v != v else v) for k, v in zip(x.tolist(), y.tolist())]
+
+    valid = ~np.isnan(y)
+    x = x[valid]
+    y = y[valid]
+    idx = _lttb_array(x, y, int(num_points))
+    return list(zip(x[idx].tolist(), y[idx].tolist()))
+
+
+def _lttb_array(x, y, num_points):
+    """
+    Same as `_lttb`, for arrays ``x`` and ``y``.
+    """
+    n = len(x)
+    if n <= num_points or num_points < 3:
+        return np.arange(n)
+
+    # Bucket averages are summed in Python, for identical rounding
+    x_list = x.tolist()
+    y_list = y.tolist()
+
+    every = (n - 2) / (num_points - 2)
+    a = 0
+    indices = [0]
+
+    for i in range(num_points - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+
+        avg_x = sum(x_list[end:next_end]) / (next_end - end)
+        avg_y = sum(y_list[end:next_end]) / (next_end - end)
+        ax = x_list[a]
+        ay = y_list[a]
+
+        area = np.abs((ax - avg_x) * (y[start:end] - ay) - (ax - x[start:end]) * (avg_y - ay))
+        a = start + int(np.argmax(area))
+
+        indices.append(a)
+
+    indices.append(n - 1)
+    return np.array(indices)
@@ -85,17 +85,39 @@ class Git(Repo):
         self._run_git(['fetch', 'origin'])
         self._pulled = True
 
-    def checkout(self, path, commit_hash):
+    def checkout(self, path, commit_hash, incremental=False):
+        if incremental is True:
+            # Keep all ignored files
+            clean_args = ['clean', '-fd']
+        elif incremental:
+            clean_args = ['clean', '-fdx']
+            for keep_path in incremental:
+                clean_args += ['-e', keep_path]
+        else:
+            clean_args = ['clean', '-fdx']
+
         def checkout_existing(display_error):
-            # Deinit fails if no submodules, so ignore its failure
-            self._run_git(
-                ['-c', 'protocol.file.allow=always', 'submodule', 'deinit', '-f', '.'],
-                cwd=path,
-                display_error=False,
-                valid_return_codes=None,
-            )
+            if not incremental:
+                # Deinit fails if no submodules, so ignore its failure
+                self._run_git(
+                    ['-c', 'protocol.file.allow=always', 'submodule', 'deinit', '-f', '.'],
+                    cwd=path,
+                    display_error=False,
+                    valid_return_codes=None,
+                )
+            else:
+                # Files whose stat information is out of date would be
+                # rewritten by checkout even if their content is the same
+                self._run_git(
+                    ['update-index', '-q', '--refresh'],
+                    cwd=path,
+                    display_error=False,
+                    valid_return_codes=None,
+                )
+            # Checkout rewrites only the files that differ, so that the
+            # modification times of the others are preserved
             self._run_git(['checkout', '-f', commit_hash], cwd=path, display_error=display_error)
-            self._run_git(['clean', '-fdx'], cwd=path, display_error=display_error)
+            self._run_git(clean_args, cwd=path, display_error=display_error)
             self._run_git(
                 [
                     '-c',
@@ -120,6 +142,23 @@ class Git(Repo):
             self._run_git(['clone', '--shared', '--recursive', self._path, path], cwd=None)
             checkout_existing(display_error=True)
 
+    def add_worktree(self, path, commit_hash):
+        self._run_git(['worktree', 'add', '--detach', '--force', path, commit_hash])
+        self._run_git(
+            ['-c', 'protocol.file.allow=always', 'submodule', 'update', '--init', '--recursive'],
+            cwd=path,
+        )
+
+    def remove_worktree(self, path):
+        self._run_git(
+            ['worktree', 'remove', '--force', '--force', path],
+            display_error=False,
+            valid_return_codes=None,
+        )
+        if os.path.isdir(path):
+            util.long_path_rmtree(path)
+        self._run_git(['worktree', 'prune'], display_error=False, valid_return_codes=None)
+
     def get_date(self, hash):
         return (
             int(
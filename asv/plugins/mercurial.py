@@ -103,15 +103,26 @@ class Hg(Repo):
         self._repo.pull()
         self._pulled = True
 
-    def checkout(self, path, commit_hash):
+    def checkout(self, path, commit_hash, incremental=False):
         # Need to pull -- the copy is not updated automatically, since
         # the repository data is not shared
 
+        purge_args = [b"--config", b"extensions.purge=", b"purge"]
+        if incremental is True:
+            # Keep all ignored files
+            pass
+        elif incremental:
+            purge_args.append(b"--all")
+            for keep_path in incremental:
+                purge_args += [b"--exclude", self._encode_filename(keep_path)]
+        else:
+            purge_args.append(b"--all")
+
         def checkout_existing():
             with hglib.open(self._encode_filename(path)) as subrepo:
                 subrepo.pull()
                 subrepo.update(self._encode(commit_hash), clean=True)
-                subrepo.rawcommand([b"--config", b"extensions.purge=", b"purge", b"--all"])
+                subrepo.rawcommand(purge_args)
 
         if os.path.isdir(path):
             try:
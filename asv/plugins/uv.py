@@ -14,6 +14,8 @@ class Uv(environment.Environment):
     """
 
     tool_name = "uv"
+    supports_templates = True
+    supports_wheelhouse = True
 
     def __init__(self, conf, python, requirements, tagged_env_vars):
         """
@@ -90,41 +92,22 @@ class Uv(environment.Environment):
 
         log.info(f"Creating virtualenv for {self.name}")
 
-        util.check_call(
-            [
-                'uv',
-                'venv',
-                f'--python={self._python}',
-                '--no-project',
-                '--seed',
-                self._path,
-            ],
-            env=env,
-        )
+        with self._log_duration("Creating virtualenv"):
+            util.check_call(
+                [
+                    'uv',
+                    'venv',
+                    f'--python={self._python}',
+                    '--no-project',
+                    '--seed',
+                    self._path,
+                ],
+                env=env,
+            )
 
         log.info(f"Installing requirements for {self.name}")
         self._install_requirements()
 
-    def _install_requirements(self):
-        pip_args = ['install', '-v', 'wheel', 'pip>=8']
-
-        env = dict(os.environ)
-        env.update(self.build_env_vars)
-
-        self._run_pip(pip_args, env=env)
-        pip_args = []
-
-        for key, val in {**self._requirements, **self._base_requirements}.items():
-            if key.startswith("pip+"):
-                pip_args.append(f"{key[4:]} {val}")
-            else:
-                pip_args.append(f"{key} {val}")
-
-        for declaration in pip_args:
-            parsed_declaration = util.ParsedPipDeclaration(declaration)
-            pip_call = util.construct_pip_call(self._run_pip, parsed_declaration)
-            pip_call()
-
     def _run_pip(self, args, **kwargs):
         # Run pip via python -m pip, so that it works on Windows when
         # upgrading pip itself, and avoids shebang length limit on Linux
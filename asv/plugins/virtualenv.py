@@ -17,6 +17,8 @@ class Virtualenv(environment.Environment):
     """
 
     tool_name = "virtualenv"
+    supports_templates = True
+    supports_wheelhouse = True
 
     def __init__(self, conf, python, requirements, tagged_env_vars):
         """
@@ -126,42 +128,23 @@ class Virtualenv(environment.Environment):
         env.update(self.build_env_vars)
 
         log.info(f"Creating virtualenv for {self.name}")
-        util.check_call(
-            [
-                sys.executable,
-                "-m",
-                "virtualenv",
-                "--setuptools=bundle",
-                "-p",
-                self._executable,
-                self._path,
-            ],
-            env=env,
-        )
+        with self._log_duration("Creating virtualenv"):
+            util.check_call(
+                [
+                    sys.executable,
+                    "-m",
+                    "virtualenv",
+                    "--setuptools=bundle",
+                    "-p",
+                    self._executable,
+                    self._path,
+                ],
+                env=env,
+            )
 
         log.info(f"Installing requirements for {self.name}")
         self._install_requirements()
 
-    def _install_requirements(self):
-        pip_args = ['install', '-v', 'wheel', 'pip>=8']
-
-        env = dict(os.environ)
-        env.update(self.build_env_vars)
-
-        self._run_pip(pip_args, env=env)
-        pip_args = []
-
-        for key, val in {**self._requirements, **self._base_requirements}.items():
-            if key.startswith("pip+"):
-                pip_args.append(f"{key[4:]} {val}")
-            else:
-                pip_args.append(f"{key} {val}")
-
-        for declaration in pip_args:
-            parsed_declaration = util.ParsedPipDeclaration(declaration)
-            pip_call = util.construct_pip_call(self._run_pip, parsed_declaration)
-            pip_call()
-
     def _run_pip(self, args, **kwargs):
         # Run pip via python -m pip, so that it works on Windows when
         # upgrading pip itself, and avoids shebang length limit on Linux
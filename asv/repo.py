@@ -52,7 +52,7 @@ class Repo:
             "as the source."
         )
 
-    def checkout(self, path, commit_hash):
+    def checkout(self, path, commit_hash, incremental=False):
         """
         Check out a clean working tree from the current repository
         to the given path
@@ -63,10 +63,31 @@ class Repo:
             The local path to check out into
         commit_hash : str
             The commit hash to check out
+        incremental : bool or list of str, optional
+            If True, keep files ignored by the version control system
+            (e.g. build artifacts) in an existing working tree.  If a
+            list, keep the given paths (in ignore file syntax) instead.
 
         """
         raise NotImplementedError()
 
+    def add_worktree(self, path, commit_hash):
+        """
+        Check out a new working tree at the given commit to a path that
+        does not exist yet.  The tree is removed with `remove_worktree`.
+
+        By default, this is the same as `checkout`.  Version control
+        systems supporting multiple working trees for one repository
+        can avoid making a full copy.
+        """
+        self.checkout(path, commit_hash)
+
+    def remove_worktree(self, path):
+        """
+        Remove a working tree created by `add_worktree`.
+        """
+        util.long_path_rmtree(path)
+
     @classmethod
     def url_match(cls, url):
         """
@@ -251,7 +272,7 @@ class NoRepository(Repo):
     def url_match(cls, url):
         return False
 
-    def checkout(self, path, commit_hash):
+    def checkout(self, path, commit_hash, incremental=False):
         self._check_branch(commit_hash)
 
     def get_date(self, hash):
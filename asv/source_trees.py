@@ -0,0 +1,132 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+
+import contextlib
+import os
+
+from . import util
+
+
+class SharedSourceTrees:
+    """
+    Checked-out source trees shared between environments
+
+    Data is stored in a directory tree::
+
+        {self._path}/
+            {self._path}/{name}/*
+            {self._path}/{name}.refs
+            {self._path}/{name}.lock
+            {self._path}/asv-source-trees.lock
+
+    where ``name`` is ``{key}-{commit_hash}``, and ``key`` identifies the
+    part of the configuration that the source tree contents depend on.
+
+    The ``.refs`` files contain the list of users (environments)
+    currently using the tree.  A user holds at most one tree for each
+    key; acquiring a new tree releases the previous one, and trees that
+    are no longer used by anyone are removed.  The
+    ``asv-source-trees.lock`` file is locked while references are
+    updated, and the ``.lock`` file of a tree while it is built in.
+
+    """
+
+    def __init__(self, path):
+        self._path = os.path.abspath(path)
+
+    def _get_tree_dir(self, name):
+        path = os.path.join(self._path, name)
+        return path, path + ".refs"
+
+    def _load_refs(self, name):
+        path, refs_fn = self._get_tree_dir(name)
+        if not os.path.isfile(refs_fn):
+            return []
+        try:
+            return util.load_json(refs_fn, api_version=1)['users']
+        except util.UserError:
+            return []
+
+    def _save_refs(self, name, users):
+        path, refs_fn = self._get_tree_dir(name)
+        util.write_json(refs_fn, {'users': users}, api_version=1)
+
+    def _remove_tree(self, repo, name):
+        path, refs_fn = self._get_tree_dir(name)
+        if os.path.isdir(path):
+            repo.remove_worktree(path)
+        for fn in (refs_fn, path + ".lock"):
+            if os.path.exists(fn):
+                os.unlink(fn)
+
+    def _release(self, repo, key, user, keep=None):
+        for fn in os.listdir(self._path):
+            name, ext = os.path.splitext(fn)
+            if ext != '.refs' or not name.startswith(key + '-') or name == keep:
+                continue
+
+            users = self._load_refs(name)
+            if user not in users:
+                continue
+
+            users.remove(user)
+            if users:
+                self._save_refs(name, users)
+            else:
+                self._remove_tree(repo, name)
+
+    def acquire(self, repo, key, commit_hash, user):
+        """
+        Get a source tree checked out at the given commit, and mark it
+        used by `user`.  Releases the tree with the same key previously
+        held by `user`.
+
+        Returns
+        -------
+        path : str
+            Path to the source tree.
+
+        """
+        name = f"{key}-{commit_hash}"
+        path, refs_fn = self._get_tree_dir(name)
+
+        os.makedirs(self._path, exist_ok=True)
+        with util.file_lock(os.path.join(self._path, 'asv-source-trees.lock')):
+            self._release(repo, key, user, keep=name)
+
+            users = self._load_refs(name)
+            if not users and os.path.isdir(path):
+                # Left over from an interrupted run
+                self._remove_tree(repo, name)
+
+            if not os.path.isdir(path):
+                try:
+                    repo.add_worktree(path, commit_hash)
+                except util.ProcessError:
+                    if os.path.isdir(path):
+                        repo.remove_worktree(path)
+                    raise
+
+            if user not in users:
+                users.append(user)
+            self._save_refs(name, users)
+
+        return path
+
+    def release(self, repo, key, user):
+        """
+        Release the source tree with the given key held by `user`.
+        """
+        if not os.path.isdir(self._path):
+            return
+
+        with util.file_lock(os.path.join(self._path, 'asv-source-trees.lock')):
+            self._release(repo, key, user)
+
+    @contextlib.contextmanager
+    def lock(self, path):
+        """
+        Context manager holding an exclusive lock on the source tree at
+        the given path, for building in it.
+        """
+        with util.file_lock(path + ".lock"):
+            yield
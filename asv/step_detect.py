@@ -1,6 +1,7 @@
 # Licensed under a 3-clause BSD style license - see LICENSE.rst
 
 import collections
+import concurrent.futures
 import heapq
 import math
 from statistics import median
@@ -10,13 +11,18 @@ try:
 except ImportError:
     _rangemedian = None
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 
 #
 # Detecting regressions
 #
 
 
-def detect_steps(y, w=None):
+def detect_steps(y, w=None, method='approx', parallel=None):
     """
     Detect steps in a (noisy) signal.
 
@@ -27,6 +33,13 @@ def detect_steps(y, w=None):
     w : list of float, none or nan
         Data point relative weights. Missing weights are set equal
         to the median weight.
+    method : {'approx', 'pelt'}, optional
+        Solver for the piecewise fits: the approximate linear-time
+        solver `solve_potts_approx`, or the exact pruned solver
+        `solve_potts_pelt`.
+    parallel : int or executor, optional
+        Search for the penalty parameter in parallel, see
+        `solve_potts_autogamma`.
 
     Returns
     -------
@@ -41,6 +54,90 @@ def detect_steps(y, w=None):
 
     """
 
+    return _detect_steps(y, w, method=method, parallel=parallel)[0]
+
+
+def update_steps(y, w, steps, gamma, window=200):
+    """
+    Update step detection results after new data is appended to a series.
+
+    Only the trailing part of the series is refitted, with the
+    penalty parameter from the previous fit. The earlier segments are
+    reused as they are, and the new points are appended to the last
+    segment. If the refit finds a new step in the trailing window, or
+    the new data does not fit in it, the whole series is refitted
+    as in `detect_steps`.
+
+    Parameters
+    ----------
+    y : list of float, none or nan
+        Full benchmark result series, including the new data points
+    w : list of float, none or nan
+        Data point relative weights, as in `detect_steps`.
+    steps : list of (left_pos, right_pos, value, min_value, err_est)
+        Previous result for the leading part of `y`, or None.
+    gamma : float
+        Penalty parameter of the previous result, or None.
+    window : int, optional
+        Number of trailing data points to refit.
+
+    Returns
+    -------
+    steps : list of (left_pos, right_pos, value, min_value, err_est)
+        Decomposition of the data, as returned by `detect_steps`.
+    gamma : float
+        Penalty parameter to pass to the next update.
+
+    """
+    if not steps or gamma is None:
+        return _detect_steps(y, w)
+
+    y_filtered, w_filtered, index_map = _filter_data(y, w)
+    n = len(y_filtered)
+    filtered_pos = {j: k for k, j in index_map.items()}
+
+    last_left, last_right = steps[-1][:2]
+    if last_left not in filtered_pos or last_right - 1 not in filtered_pos:
+        # Previous result is not for this data
+        return _detect_steps(y, w)
+
+    l = filtered_pos[last_left]
+    new_pos = filtered_pos[last_right - 1] + 1
+
+    if new_pos == n:
+        # No new data
+        return list(steps), gamma
+
+    if n - new_pos > window // 2:
+        # Too much new data for the trailing window
+        return _detect_steps(y, w)
+
+    # Refit the trailing window; it must remain a single segment
+    start = max(l, n - window)
+    right, values, dists = solve_potts_approx(y_filtered[start:], w_filtered[start:], gamma=gamma)
+    if len(right) != 1:
+        return _detect_steps(y, w)
+
+    mu_dist = get_mu_dist(y_filtered[l:], w_filtered[l:])
+    value = mu_dist.mu(0, n - l - 1)
+    dist = mu_dist.dist(0, n - l - 1)
+
+    steps = list(steps[:-1]) + _get_steps(y_filtered, index_map, [n], [value], [dist], l=l)
+    return steps, gamma
+
+
+def _filter_data(y, w):
+    """
+    Drop missing data points and normalize the weights.
+
+    Returns
+    -------
+    y_filtered, w_filtered : list of float
+        Data points and weights
+    index_map : dict
+        Map from filtered indices to indices in `y`.
+
+    """
     index_map = {}
     y_filtered = []
     for j, x in enumerate(y):
@@ -72,16 +169,25 @@ def detect_steps(y, w=None):
             if w[jj] is not None and w[jj] == w[jj]:
                 w_filtered[j] = w[jj] / w_median
 
+    return y_filtered, w_filtered, index_map
+
+
+def _detect_steps(y, w, method='approx', parallel=None):
+    y_filtered, w_filtered, index_map = _filter_data(y, w)
+
     # Find piecewise segments
-    right, values, dists, gamma = solve_potts_autogamma(y_filtered, w=w_filtered)
+    right, values, dists, gamma = solve_potts_autogamma(
+        y_filtered, w=w_filtered, method=method, parallel=parallel
+    )
+
+    return _get_steps(y_filtered, index_map, right, values, dists), gamma
+
 
+def _get_steps(y, index_map, right, values, dists, l=0):
     # Extract the steps, mapping indices back etc.
     steps = []
-    l = 0
     for r, v, d in zip(right, values, dists):
-        steps.append(
-            (index_map[l], index_map[r - 1] + 1, v, min(y_filtered[l:r]), abs(d / (r - l)))
-        )
+        steps.append((index_map[l], index_map[r - 1] + 1, v, min(y[l:r]), abs(d / (r - l))))
         l = r
     return steps
 
@@ -263,22 +369,7 @@ def solve_potts(y, w, gamma, min_size=1, max_size=None, min_pos=None, max_pos=No
     if hasattr(mu_dist, 'find_best_partition'):
         p = mu_dist.find_best_partition(gamma, min_size, max_size, min_pos, max_pos)
     else:
-        i0 = min_pos
-        i1 = max_pos
-
-        B = [-gamma] * (i1 - i0 + 1)
-        p = [0] * (i1 - i0)
-        for r in range(i0, i1):
-            B[r + 1 - i0] = math.inf
-            a = max(r + 1 - max_size, i0)
-            b = max(r + 1 - min_size + 1, i0)
-            for l in range(a, b):
-                b = B[l - i0] + gamma + dist(l, r)
-                if b <= B[r + 1 - i0]:
-                    B[r + 1 - i0] = b
-                    p[r - i0] = l - 1
-
-            mu_dist.cleanup_cache()
+        p = _find_best_partition(mu_dist, gamma, min_size, max_size, min_pos, max_pos)
 
     # Routine "Segmentation from partition" in [1]
     # Convert interval representation computed above
@@ -301,7 +392,136 @@ def solve_potts(y, w, gamma, min_size=1, max_size=None, min_pos=None, max_pos=No
     return right, values, dists
 
 
-def solve_potts_autogamma(y, w, beta=None, **kw):
+def _find_best_partition(mu_dist, gamma, min_size, max_size, min_pos, max_pos):
+    """
+    Pure-Python version of the "Find best partition" dynamic program,
+    for Dist objects that do not implement it.
+    """
+    dist = mu_dist.dist
+
+    i0 = min_pos
+    i1 = max_pos
+
+    B = [-gamma] * (i1 - i0 + 1)
+    p = [0] * (i1 - i0)
+    for r in range(i0, i1):
+        B[r + 1 - i0] = math.inf
+        a = max(r + 1 - max_size, i0)
+        b = max(r + 1 - min_size + 1, i0)
+        for l in range(a, b):
+            b = B[l - i0] + gamma + dist(l, r)
+            if b <= B[r + 1 - i0]:
+                B[r + 1 - i0] = b
+                p[r - i0] = l - 1
+
+        mu_dist.cleanup_cache()
+
+    return p
+
+
+def solve_potts_pelt(y, w, gamma, mu_dist=None):
+    """Fit penalized stepwise constant function (Potts model) to data
+    exactly, using pruned dynamic programming.
+
+    This solves the same problem as `solve_potts` without limits on the
+    interval sizes, using the PELT method of
+    :cite:t:`plt-killickOptimalDetectionChangepoints2012`. Since the
+    cost function satisfies ``dist(a, c) >= dist(a, b) + dist(b, c)``,
+    left edges that cannot become optimal are dropped from the
+    recursion. Each step of the recursion costs O(m log n) for the m
+    remaining left edges. The pruning keeps m small when the number
+    of steps grows linearly with the data size, but drops few left
+    edges from data without steps, for which the computational cost
+    is ~ O(n**2 log n).
+
+    Parameters
+    ----------
+    y : list of floats
+        Input data series
+    w : list of floats
+        Data point weights
+    gamma : float
+        Penalty parameter.
+    mu_dist : Dist, optional
+        Precomputed interval means/medians and cost function values
+
+    Returns
+    -------
+    right : list
+        List of (exclusive) right bounds of the intervals
+    values : list
+        List of values of the intervals
+    dist : list
+        List of ``sum(|y - x|**p)`` for each interval.
+
+    References
+    ----------
+    .. bibliography::
+       :filter: docname in docnames
+       :labelprefix: PLT_
+       :keyprefix: plt-
+
+    """
+    n = len(y)
+
+    if n == 0:
+        return [], [], []
+
+    if len(y) != len(w):
+        raise ValueError("y and w must have same size")
+
+    if mu_dist is None:
+        mu_dist = get_mu_dist(y, w)
+
+    mu, dist = mu_dist.mu, mu_dist.dist
+
+    if hasattr(mu_dist, 'find_best_partition_pelt'):
+        p = mu_dist.find_best_partition_pelt(gamma)
+    else:
+        # Bellman recursion as in solve_potts, over the candidate left
+        # edges remaining after pruning
+        B = [-gamma] * (n + 1)
+        p = [0] * n
+        candidates = [0]
+        for r in range(n):
+            costs = [B[l] + dist(l, r) for l in candidates]
+
+            B[r + 1] = math.inf
+            for l, b in zip(candidates, costs):
+                b += gamma
+                if b <= B[r + 1]:
+                    B[r + 1] = b
+                    p[r] = l - 1
+
+            candidates = [l for l, b in zip(candidates, costs) if b <= B[r + 1]]
+            candidates.append(r + 1)
+
+            mu_dist.cleanup_cache()
+
+    # Extract solution
+    right = []
+    values = []
+    dists = []
+    r = n - 1
+    l = p[r]
+    while r >= 0:
+        right.append(r + 1)
+        values.append(mu(l + 1, r))
+        dists.append(dist(l + 1, r))
+        r = l
+        l = p[r]
+    right.reverse()
+    values.reverse()
+    dists.reverse()
+
+    return right, values, dists
+
+
+# Number of gamma values evaluated concurrently in solve_potts_autogamma
+AUTOGAMMA_GRID_SIZE = 8
+
+
+def solve_potts_autogamma(y, w, beta=None, method='approx', parallel=None, **kw):
     """Solve Potts problem with automatically determined gamma.
 
     The optimal value is determined by minimizing the information measure::
@@ -317,8 +537,20 @@ def solve_potts_autogamma(y, w, beta=None, **kw):
          Penalty parameter. Default is 4*ln(n)/n, similar to Bayesian
          information criterion for gaussian model with unknown variance
          assuming 4 DOF per breakpoint.
+    method : {'approx', 'pelt'}, optional
+         Solver to use for fixed gamma: `solve_potts_approx` or
+         `solve_potts_pelt`.
+    parallel : int or executor, optional
+         If given, evaluate the information measure concurrently on
+         a grid of gamma values, refined around the minimum, instead
+         of a sequential golden section search. An integer gives the
+         number of threads to use. Alternatively, an object with a
+         `map` method, such as a `concurrent.futures.ProcessPoolExecutor`
+         or a `multiprocessing.Pool`, is used to evaluate the grid.
 
     """
+    solve = _get_potts_solver(method)
+
     n = len(y)
 
     if n == 0:
@@ -342,60 +574,124 @@ def solve_potts_autogamma(y, w, beta=None, **kw):
     best_obj = [math.inf]
     best_gamma = [None]
 
-    def f(x):
-        gamma = gamma_0 * math.exp(x)
-        r, v, d = solve_potts_approx(y, w, gamma=gamma, mu_dist=mu_dist, **kw)
-
-        # MLE fit noise correlation
-        def sigma_star(rights, values, rho):
-            """
-            |E_0| + sum_{j>0} |E_j - rho E_{j-1}|
-            """
-            l = 1
-            E_prev = y[0] - values[0]
-            s = abs(E_prev) * w[0]
-            for r, v in zip(rights, values):
-                for yv, wv in zip(y[l:r], w[l:r]):
-                    E = yv - v
-                    s += abs(E - rho * E_prev) * wv
-                    E_prev = E
-                l = r
-            return s
-
-        rho_best = golden_search(
-            lambda rho: sigma_star(r, v, rho), -1, 1, xatol=0.05, expand_bounds=True
-        )
-
-        # Measurement noise floor
-        if len(v) > 2:
-            absdiff = [abs(v[j + 1] - v[j]) for j in range(len(v) - 1)]
-            sigma_0 = 0.1 * min(absdiff)
-        else:
-            absv = [abs(z) for z in v]
-            sigma_0 = 0.001 * min(absv)
-        sigma_0 = max(1e-300, sigma_0)
-
-        # Objective function
-        s = sigma_star(r, v, rho_best)
-        obj = beta * len(r) + math.log(sigma_0 + s)
-
-        # Done
+    def add_result(gamma, obj, r, v, d):
         if obj < best_obj[0]:
             best_r[0] = r
             best_v[0] = v
             best_d[0] = d
             best_gamma[0] = gamma
             best_obj[0] = obj
+
+    def f(x):
+        gamma = gamma_0 * math.exp(x)
+        obj, r, v, d = _autogamma_objective(y, w, gamma, beta, solve, mu_dist, kw)
+        add_result(gamma, obj, r, v, d)
         return obj
 
     # Try to find best gamma (golden section search on log-scale); we
     # don't need an accurate value for it however
     a = math.log(0.1 / n)
     b = 0.0
-    golden_search(f, a, b, xatol=abs(a) * 0.1, ftol=0, expand_bounds=True)
+    xatol = abs(a) * 0.1
+
+    if parallel is not None:
+        # Evaluate on a grid concurrently, and repeat on a finer grid
+        # around the best point until the grid spacing is small enough
+        if isinstance(parallel, int):
+            executor = concurrent.futures.ThreadPoolExecutor(parallel)
+            map_func = executor.map
+        else:
+            executor = None
+            map_func = parallel.map
+
+        try:
+            values = {}
+            while True:
+                h = (b - a) / (AUTOGAMMA_GRID_SIZE - 1)
+                xs = [a + h * j for j in range(AUTOGAMMA_GRID_SIZE)]
+
+                new_xs = [x for x in xs if x not in values]
+                items = [(y, w, gamma_0 * math.exp(x), beta, method, kw) for x in new_xs]
+                for x, item, result in zip(new_xs, items, map_func(_autogamma_grid_point, items)):
+                    add_result(item[2], *result)
+                    values[x] = result[0]
+
+                if h <= xatol:
+                    break
+
+                # The bracket may extend outside the previous grid
+                x_best = min(xs, key=values.__getitem__)
+                a = x_best - h
+                b = x_best + h
+        finally:
+            if executor is not None:
+                executor.shutdown()
+    else:
+        golden_search(f, a, b, xatol=xatol, ftol=0, expand_bounds=True)
+
     return best_r[0], best_v[0], best_d[0], best_gamma[0]
 
 
+def _get_potts_solver(method):
+    if method == 'approx':
+        return solve_potts_approx
+    elif method == 'pelt':
+        return solve_potts_pelt
+    else:
+        raise ValueError(f"Unknown step detection method: {method!r}")
+
+
+def _autogamma_objective(y, w, gamma, beta, solve, mu_dist, kw):
+    """
+    Information measure minimized by solve_potts_autogamma, and the
+    Potts solution, for the given gamma.
+    """
+    r, v, d = solve(y, w, gamma=gamma, mu_dist=mu_dist, **kw)
+
+    # MLE fit noise correlation
+    def sigma_star(rights, values, rho):
+        """
+        |E_0| + sum_{j>0} |E_j - rho E_{j-1}|
+        """
+        l = 1
+        E_prev = y[0] - values[0]
+        s = abs(E_prev) * w[0]
+        for r, v in zip(rights, values):
+            for yv, wv in zip(y[l:r], w[l:r]):
+                E = yv - v
+                s += abs(E - rho * E_prev) * wv
+                E_prev = E
+            l = r
+        return s
+
+    rho_best = golden_search(
+        lambda rho: sigma_star(r, v, rho), -1, 1, xatol=0.05, expand_bounds=True
+    )
+
+    # Measurement noise floor
+    if len(v) > 2:
+        absdiff = [abs(v[j + 1] - v[j]) for j in range(len(v) - 1)]
+        sigma_0 = 0.1 * min(absdiff)
+    else:
+        absv = [abs(z) for z in v]
+        sigma_0 = 0.001 * min(absv)
+    sigma_0 = max(1e-300, sigma_0)
+
+    # Objective function
+    s = sigma_star(r, v, rho_best)
+    obj = beta * len(r) + math.log(sigma_0 + s)
+
+    return obj, r, v, d
+
+
+def _autogamma_grid_point(item):
+    # Evaluate _autogamma_objective in a worker, which cannot share
+    # the Dist object with others
+    y, w, gamma, beta, method, kw = item
+    solve = _get_potts_solver(method)
+    return _autogamma_objective(y, w, gamma, beta, solve, get_mu_dist(y, w), kw)
+
+
 def solve_potts_approx(y, w, gamma=None, min_size=1, **kw):
     """
     Fit penalized stepwise constant function (Potts model) to data
@@ -555,9 +851,143 @@ class L1Dist:
         self.dist_memo.clear()
 
 
+class NumpyL1Dist:
+    """
+    Vectorized computations for the L1 distance measures, using Numpy.
+
+    This computes the same `mu` and `dist` as :py:class:`L1Dist`. The
+    values for all intervals up to a given size are computed at once
+    with batched array operations, when first needed by
+    `find_best_partition`. Larger intervals are computed one at a
+    time on demand.
+
+    """
+
+    # Maximum interval size for which the values are precomputed
+    max_batch_size = 128
+
+    # Number of intervals processed in each array operation
+    batch_rows = 65536
+
+    def __init__(self, y, w):
+        self.y = np.asarray(y, dtype=float)
+        self.w = np.asarray(w, dtype=float)
+        self._table_size = 0
+        self._mu_rows = None
+        self._dist_rows = None
+        self.mu_memo = {}
+        self.dist_memo = {}
+
+    def _compute_windows(self, y, w):
+        """
+        Weighted medians and L1 distances for each row of the 2-D
+        arrays `y` and `w`, computed as in `weighted_median`.
+        """
+        size = y.shape[1]
+        rows = np.arange(y.shape[0])
+
+        order = np.lexsort((w, y), axis=-1)
+        y_sorted = np.take_along_axis(y, order, axis=-1)
+        w_cumsum = np.cumsum(np.take_along_axis(w, order, axis=-1), axis=-1)
+        midpoint = np.cumsum(w, axis=-1)[:, -1] / 2
+
+        above = w_cumsum >= midpoint[:, None]
+        i = np.argmax(above, axis=-1)
+        mu = y_sorted[rows, i]
+
+        # Midpoint hit exactly: average with the next value
+        tie = (w_cumsum[rows, i] == midpoint) & (i + 1 < size)
+        mu_next = y_sorted[rows, np.minimum(i + 1, size - 1)]
+        mu = np.where(tie, (mu + mu_next) / 2, mu)
+
+        # No crossing, due to rounding errors: fall back to the mean
+        mu = np.where(above.any(axis=-1), mu, np.cumsum(y, axis=-1)[:, -1] / size)
+
+        dist = np.cumsum(w * np.abs(y - mu[:, None]), axis=-1)[:, -1]
+        return mu, dist
+
+    def _precompute(self, max_size):
+        n = len(self.y)
+        max_size = min(max_size, n)
+        if max_size <= self._table_size:
+            return
+
+        mu_table = np.full((n, max_size), np.nan)
+        dist_table = np.full((n, max_size), np.nan)
+
+        for size in range(1, max_size + 1):
+            y = np.lib.stride_tricks.sliding_window_view(self.y, size)
+            w = np.lib.stride_tricks.sliding_window_view(self.w, size)
+            for start in range(0, len(y), self.batch_rows):
+                mu, dist = self._compute_windows(
+                    y[start : start + self.batch_rows], w[start : start + self.batch_rows]
+                )
+                mu_table[start : start + len(mu), size - 1] = mu
+                dist_table[start : start + len(mu), size - 1] = dist
+
+        self._table_size = max_size
+        self._mu_rows = mu_table.tolist()
+        self._dist_rows = dist_table.tolist()
+
+    def _compute_interval(self, l, r):
+        mu, dist = self._compute_windows(self.y[None, l : r + 1], self.w[None, l : r + 1])
+        self.mu_memo[l, r] = float(mu[0])
+        self.dist_memo[l, r] = float(dist[0])
+
+    def mu(self, l, r):
+        if r - l < self._table_size:
+            return self._mu_rows[l][r - l]
+        if (l, r) not in self.mu_memo:
+            self._compute_interval(l, r)
+        return self.mu_memo[l, r]
+
+    def dist(self, l, r):
+        if r - l < self._table_size:
+            return self._dist_rows[l][r - l]
+        if (l, r) not in self.dist_memo:
+            self._compute_interval(l, r)
+        return self.dist_memo[l, r]
+
+    def cleanup_cache(self):
+        # Reset cache if it is too big
+        if len(self.mu_memo) < 500000:
+            return
+
+        self.mu_memo.clear()
+        self.dist_memo.clear()
+
+    def find_best_partition(self, gamma, min_size, max_size, min_pos, max_pos):
+        if max_size > self.max_batch_size:
+            return _find_best_partition(self, gamma, min_size, max_size, min_pos, max_pos)
+
+        self._precompute(max_size)
+        dist_rows = self._dist_rows
+
+        # Same recursion as in _find_best_partition, reading the
+        # interval distances from the precomputed table
+        i0 = min_pos
+        i1 = max_pos
+
+        B = [-gamma] * (i1 - i0 + 1)
+        p = [0] * (i1 - i0)
+        for r in range(i0, i1):
+            B[r + 1 - i0] = math.inf
+            a = max(r + 1 - max_size, i0)
+            b = max(r + 1 - min_size + 1, i0)
+            for l in range(a, b):
+                b = B[l - i0] + gamma + dist_rows[l][r - l]
+                if b <= B[r + 1 - i0]:
+                    B[r + 1 - i0] = b
+                    p[r - i0] = l - 1
+
+        return p
+
+
 def get_mu_dist(y, w):
     if _rangemedian is not None:
         return _rangemedian.RangeMedian(y, w)
+    elif np is not None:
+        return NumpyL1Dist(y, w)
     else:
         return L1Dist(y, w)
 
@@ -5,6 +5,7 @@ Various low-level utilities.
 """
 
 import collections
+import contextlib
 import datetime
 import errno
 import functools
@@ -29,7 +30,10 @@ from asv_runner.util import _human_time_units, human_float, human_time
 
 WIN = os.name == 'nt'
 
-if not WIN:
+if WIN:
+    import msvcrt
+else:
+    import fcntl
     from select import PIPE_BUF
 
 
@@ -1289,6 +1293,41 @@ def get_multiprocessing_pool(parallel=None):
     return multiprocessing.Pool(parallel, initializer=_init_global_locks, initargs=(_global_locks, env))
 
 
+@contextlib.contextmanager
+def file_lock(path, blocking=True):
+    """
+    Context manager holding an exclusive lock on the given file, which
+    is created if it does not exist.  Works across processes.
+
+    If *blocking* is False, raises BlockingIOError instead of waiting
+    if the lock is held elsewhere.
+    """
+    with open(path, 'a+b') as f:
+        if WIN:
+            f.seek(0)
+            while True:
+                try:
+                    mode = msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK
+                    msvcrt.locking(f.fileno(), mode, 1)
+                    break
+                except OSError as exc:
+                    if not blocking:
+                        raise BlockingIOError(str(exc)) from exc
+                    # LK_LOCK gives up after 10 seconds
+                    continue
+        else:
+            flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+            fcntl.flock(f.fileno(), flags)
+        try:
+            yield
+        finally:
+            if WIN:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
 try:
     from shlex import quote as shlex_quote
 except ImportError:
@@ -1445,8 +1484,8 @@ class ParsedPipDeclaration:
                     self.specification = f"=={version_match.group(0)}"
 
 
-def construct_pip_call(pip_caller, parsed_declaration: ParsedPipDeclaration):
-    pargs = ['install', '-v', '--upgrade']
+def construct_pip_call(pip_caller, parsed_declaration: ParsedPipDeclaration, extra_args=()):
+    pargs = ['install', '-v', '--upgrade'] + list(extra_args)
 
     if parsed_declaration.flags:
         pargs += parsed_declaration.flags
@@ -1461,6 +1500,36 @@ def construct_pip_call(pip_caller, parsed_declaration: ParsedPipDeclaration):
     return functools.partial(pip_caller, pargs)
 
 
+def can_batch_pip_declaration(parsed_declaration: ParsedPipDeclaration):
+    """
+    Whether the declaration is a plain requirement (no flags, paths or
+    URLs), which can be installed together with others in one pip call.
+    """
+    return not (
+        parsed_declaration.flags or parsed_declaration.path or parsed_declaration.is_editable
+    )
+
+
+def get_pip_requirement(parsed_declaration: ParsedPipDeclaration):
+    """
+    Get the requirement specifier of a plain declaration, e.g.
+    ``"numpy==1.18.5"``.
+    """
+    if parsed_declaration.specification:
+        return f"{parsed_declaration.pkgname}{parsed_declaration.specification}"
+    return parsed_declaration.pkgname
+
+
+def construct_pip_batch_call(pip_caller, parsed_declarations, extra_args=()):
+    """
+    Construct a single pip call installing all the given declarations,
+    which must be plain requirements (see `can_batch_pip_declaration`).
+    """
+    pargs = ['install', '-v', '--upgrade'] + list(extra_args)
+    pargs += [get_pip_requirement(d) for d in parsed_declarations]
+    return functools.partial(pip_caller, pargs)
+
+
 if hasattr(sys, 'pypy_version_info'):
     ON_PYPY = True
 else:
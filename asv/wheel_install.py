@@ -0,0 +1,310 @@
+# Licensed under a 3-clause BSD style license - see LICENSE.rst
+"""\
+Usage: python wheel_install.py PROJECT WHEEL_FILE
+
+Replace the installed copy of PROJECT in the running Python environment
+with the contents of WHEEL_FILE, by unpacking the wheel directly instead
+of running pip.
+
+The files listed in the RECORD of the installed copy are removed, and
+the wheel is unpacked according to its RECORD and the installation
+scheme of the environment.  The installed top-level modules are then
+imported, to validate the installation.
+
+Exits with code 2 without changing anything if the wheel cannot be
+installed this way (no installed copy to replace, changed dependencies,
+or unsupported wheel contents), and with code 1 on other errors.
+
+This script is run by the Python of the environment, so it must only
+use the standard library.
+"""
+
+import base64
+import csv
+import hashlib
+import importlib
+import io
+import os
+import re
+import shutil
+import sys
+import sysconfig
+import zipfile
+from email.parser import Parser
+
+CANNOT_INSTALL = 2
+
+SCRIPT_TEMPLATE = """\
+#!{executable}
+# -*- coding: utf-8 -*-
+import re
+import sys
+from {module} import {import_name}
+if __name__ == "__main__":
+    sys.argv[0] = re.sub(r"(-script\\.pyw|\\.exe)?$", "", sys.argv[0])
+    sys.exit({func}())
+"""
+
+
+class CannotInstall(Exception):
+    pass
+
+
+def normalize_name(name):
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def record_hash(data):
+    digest = hashlib.sha256(data).digest()
+    return "sha256=" + base64.urlsafe_b64encode(digest).decode("ascii").rstrip("=")
+
+
+def parse_metadata(text):
+    return Parser().parsestr(text, headersonly=True)
+
+
+def read_record(text):
+    return [row for row in csv.reader(io.StringIO(text)) if row]
+
+
+def find_installed(project):
+    """
+    Find the dist-info directory of the installed copy of the project.
+    """
+    paths = sysconfig.get_paths()
+    for site_dir in {paths["purelib"], paths["platlib"]}:
+        if not os.path.isdir(site_dir):
+            continue
+        for fn in os.listdir(site_dir):
+            if not fn.endswith(".dist-info"):
+                continue
+            name = fn[: -len(".dist-info")].rsplit("-", 1)[0]
+            if normalize_name(name) == normalize_name(project):
+                return os.path.join(site_dir, fn)
+    return None
+
+
+def get_entry_points(text):
+    """
+    Parse console and GUI scripts from entry_points.txt.
+    """
+    scripts = []
+    section = None
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith(("#", ";")):
+            continue
+        if line.startswith("["):
+            section = line.strip("[]").strip()
+        elif section in ("console_scripts", "gui_scripts"):
+            name, value = (s.strip() for s in line.split("=", 1))
+            value = value.split("[", 1)[0].strip()
+            module, func = (s.strip() for s in value.split(":", 1))
+            scripts.append((name, module, func))
+    return scripts
+
+
+class Wheel:
+    """
+    Contents of a wheel, checked for installing without pip.
+    """
+
+    def __init__(self, filename, project):
+        self.zip = zipfile.ZipFile(filename)
+        names = self.zip.namelist()
+
+        dist_infos = {n.split("/")[0] for n in names if n.split("/")[0].endswith(".dist-info")}
+        if len(dist_infos) != 1:
+            raise CannotInstall("wheel must have one .dist-info directory")
+        self.dist_info = dist_infos.pop()
+        self.data_dir = self.dist_info[: -len(".dist-info")] + ".data"
+
+        name = self.dist_info[: -len(".dist-info")].rsplit("-", 1)[0]
+        if normalize_name(name) != normalize_name(project):
+            raise CannotInstall(f"wheel is for {name}, not {project}")
+
+        self.metadata = parse_metadata(self.read_text("METADATA"))
+        wheel = parse_metadata(self.read_text("WHEEL"))
+        self.root_is_purelib = wheel.get("Root-Is-Purelib", "true").strip().lower() == "true"
+
+        self.hashes = {row[0]: row[1] for row in read_record(self.read_text("RECORD"))}
+
+        if f"{self.dist_info}/entry_points.txt" in names:
+            self.scripts = get_entry_points(self.read_text("entry_points.txt"))
+        else:
+            self.scripts = []
+        if self.scripts and os.name == "nt":
+            raise CannotInstall("script launchers are not supported on Windows")
+
+        for name in names:
+            parts = name.split("/")
+            if parts[0] == self.data_dir and parts[1] not in (
+                "purelib",
+                "platlib",
+                "scripts",
+                "data",
+            ):
+                raise CannotInstall(f"unsupported data directory {parts[1]}")
+
+    def verify(self):
+        """
+        Check the contents of the wheel against its RECORD.
+        """
+        for info in self.zip.infolist():
+            name = info.filename
+            if name.endswith("/") or name == f"{self.dist_info}/RECORD":
+                continue
+            expected = self.hashes.get(name)
+            if expected and expected != record_hash(self.zip.read(info)):
+                raise CannotInstall(f"hash mismatch for {name} in wheel")
+
+    def read_text(self, name):
+        return self.zip.read(f"{self.dist_info}/{name}").decode("utf-8")
+
+    def install(self):
+        """
+        Unpack the wheel, and return the RECORD rows of the installed
+        files, relative to the directory containing the dist-info.
+        """
+        paths = sysconfig.get_paths()
+        root = paths["purelib"] if self.root_is_purelib else paths["platlib"]
+        record = []
+
+        def write(dest, data, executable=False):
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            with open(dest, "wb") as f:
+                f.write(data)
+            if executable:
+                os.chmod(dest, os.stat(dest).st_mode | 0o111)
+            record.append([os.path.relpath(dest, root), record_hash(data), str(len(data))])
+
+        # The RECORD is written also if unpacking fails partway, so that
+        # the files can be uninstalled
+        try:
+            for info in self.zip.infolist():
+                name = info.filename
+                if name.endswith("/") or name == f"{self.dist_info}/RECORD":
+                    continue
+
+                data = self.zip.read(info)
+                parts = name.split("/")
+                executable = bool((info.external_attr >> 16) & 0o111)
+                if parts[0] == self.data_dir:
+                    scheme = parts[1]
+                    dest = os.path.join(paths[scheme], *parts[2:])
+                    if scheme == "scripts":
+                        executable = True
+                        if re.match(rb"^#!pythonw?(\r?\n|\s)", data):
+                            rest = data.split(b"\n", 1)[1] if b"\n" in data else b""
+                            data = b"#!" + os.fsencode(sys.executable) + b"\n" + rest
+                else:
+                    dest = os.path.join(root, *parts)
+
+                write(dest, data, executable)
+
+            for name, module, func in self.scripts:
+                script = SCRIPT_TEMPLATE.format(
+                    executable=sys.executable,
+                    module=module,
+                    import_name=func.split(".")[0],
+                    func=func,
+                )
+                write(os.path.join(paths["scripts"], name), script.encode("utf-8"), True)
+
+            write(os.path.join(root, self.dist_info, "INSTALLER"), b"asv\n")
+        finally:
+            record.append([f"{self.dist_info}/RECORD", "", ""])
+            record_file = os.path.join(root, self.dist_info, "RECORD")
+            os.makedirs(os.path.dirname(record_file), exist_ok=True)
+            with open(record_file, "w", newline="") as f:
+                csv.writer(f).writerows(record)
+
+        return root, record
+
+    def get_top_level(self, record):
+        """
+        Names of the top-level modules installed from the wheel.
+        """
+        if f"{self.dist_info}/top_level.txt" in self.zip.namelist():
+            return [s.strip() for s in self.read_text("top_level.txt").split() if s.strip()]
+
+        modules = set()
+        for row in record:
+            parts = row[0].replace(os.sep, "/").split("/")
+            if parts[0].startswith("..") or parts[0].endswith((".dist-info", ".data")):
+                continue
+            if len(parts) > 1 and parts[-1] == "__init__.py":
+                modules.add(parts[0])
+            elif len(parts) == 1 and parts[0].endswith((".py", ".so", ".pyd")):
+                modules.add(parts[0].split(".")[0])
+        return sorted(modules)
+
+
+def remove_installed(dist_info):
+    """
+    Remove the files listed in the RECORD of an installed distribution.
+    """
+    base = os.path.dirname(dist_info)
+    with open(os.path.join(dist_info, "RECORD"), newline="") as f:
+        record = read_record(f.read())
+
+    dirs = set()
+    for row in record:
+        path = os.path.normpath(os.path.join(base, row[0]))
+        if os.path.isfile(path) or os.path.islink(path):
+            os.unlink(path)
+            dirs.add(os.path.dirname(path))
+
+        # Bytecode written on import is not in RECORD
+        if path.endswith(".py"):
+            cache_dir = os.path.join(os.path.dirname(path), "__pycache__")
+            module = os.path.basename(path)[:-3]
+            if os.path.isdir(cache_dir):
+                for fn in os.listdir(cache_dir):
+                    if fn.startswith(module + ".") and fn.endswith(".pyc"):
+                        os.unlink(os.path.join(cache_dir, fn))
+                dirs.add(cache_dir)
+
+    shutil.rmtree(dist_info, ignore_errors=True)
+
+    # Remove directories left empty inside site-packages
+    for path in sorted(dirs, key=len, reverse=True):
+        while path.startswith(base + os.sep) and os.path.isdir(path) and not os.listdir(path):
+            os.rmdir(path)
+            path = os.path.dirname(path)
+
+
+def main(project, wheel_file):
+    try:
+        wheel = Wheel(wheel_file, project)
+
+        dist_info = find_installed(project)
+        if dist_info is None or not os.path.isfile(os.path.join(dist_info, "RECORD")):
+            raise CannotInstall(f"no installed copy of {project} to replace")
+
+        with open(os.path.join(dist_info, "METADATA"), encoding="utf-8") as f:
+            installed = parse_metadata(f.read())
+        if sorted(installed.get_all("Requires-Dist") or []) != sorted(
+            wheel.metadata.get_all("Requires-Dist") or []
+        ):
+            raise CannotInstall("dependencies changed")
+
+        wheel.verify()
+    except CannotInstall as exc:
+        print(f"Cannot install without pip: {exc}")
+        return CANNOT_INSTALL
+
+    remove_installed(dist_info)
+    root, record = wheel.install()
+
+    importlib.invalidate_caches()
+    for module in wheel.get_top_level(record):
+        importlib.import_module(module)
+
+    return 0
+
+
+if __name__ == "__main__":
+    # Don't import modules next to this script
+    del sys.path[0]
+    sys.exit(main(*sys.argv[1:]))
@@ -14,6 +14,8 @@ $(document).ready(function() {
     /* Graph data cache */
     var graph_cache = {};
     var graph_cache_max_size = 5;
+    /* Graph bundle cache: {url: promise} */
+    var graph_bundle_cache = {};
 
     var colors = [
         '#247AAD',
@@ -272,28 +274,104 @@ $(document).ready(function() {
         return parts.join('/') + ".json";
     }
 
+    function cache_graph_data(url, data) {
+        if (Object.keys(graph_cache).length > graph_cache_max_size) {
+            $.each(Object.keys(graph_cache), function (i, key) {
+                delete graph_cache[key];
+            });
+        }
+        graph_cache[url] = data;
+    }
+
+    /*
+      Load and cache a graph bundle file written by asv publish: the
+      first line is an index mapping graph paths to [offset, length]
+      of their JSON data in the rest of the file.
+     */
+    function load_graph_bundle(url) {
+        if (!graph_bundle_cache[url]) {
+            if (Object.keys(graph_bundle_cache).length > graph_cache_max_size) {
+                graph_bundle_cache = {};
+            }
+            graph_bundle_cache[url] = $.ajax({
+                url: url + '?timestamp=' + $.asv.main_timestamp,
+                dataType: "text",
+                cache: true
+            }).then(function(text) {
+                var start = text.indexOf('\n') + 1;
+                return {index: JSON.parse(text.slice(0, start)),
+                        text: text,
+                        start: start};
+            });
+            graph_bundle_cache[url].fail(function() {
+                delete graph_bundle_cache[url];
+            });
+        }
+        return graph_bundle_cache[url];
+    }
+
+    /*
+      Find the graph bundle and the path in it for a graph URL, or null
+      if the graph is not bundled.  Only the full resolution benchmark
+      graphs are bundled: the summary graphs, low-resolution graphs and
+      tiles are separate files.
+     */
+    function graph_bundle_location(url) {
+        if (!main_json.graph_bundles) {
+            return null;
+        }
+        if (!/\.json$/.test(url) || /\.(lowres|tiles)\.json$/.test(url) ||
+                url.indexOf('.tiles/') !== -1) {
+            return null;
+        }
+        var parts = url.replace(/\.json$/, '').split('/');
+        if (parts.length < 2 || parts[0] !== 'graphs' || parts[1] === 'summary' ||
+                parts[parts.length - 1] === 'summary') {
+            return null;
+        }
+        try {
+            parts = $.map(parts, function(part) { return decodeURIComponent(part); });
+        }
+        catch (e) {
+            /* Already decoded */
+        }
+        return {url: 'graphs/' + encodeURIComponent(parts[parts.length - 1]) + '.bundle',
+                path: parts.join('/')};
+    }
+
     /*
       Load and cache graph data (on javascript side)
      */
     function load_graph_data(url, success, failure) {
         var dfd = $.Deferred();
+        var bundle_location = graph_bundle_location(url);
         if (graph_cache[url]) {
             setTimeout(function() {
                 dfd.resolve(graph_cache[url]);
             }, 1);
         }
+        else if (bundle_location) {
+            load_graph_bundle(bundle_location.url).done(function(bundle) {
+                var entry = bundle.index[bundle_location.path];
+                if (!entry) {
+                    dfd.reject();
+                    return;
+                }
+                var offset = bundle.start + entry[0];
+                var data = JSON.parse(bundle.text.slice(offset, offset + entry[1]));
+                cache_graph_data(url, data);
+                dfd.resolve(data);
+            }).fail(function() {
+                dfd.reject();
+            });
+        }
         else {
             $.ajax({
                 url: url + '?timestamp=' + $.asv.main_timestamp,
                 dataType: "json",
                 cache: true
             }).done(function(data) {
-                if (Object.keys(graph_cache).length > graph_cache_max_size) {
-                    $.each(Object.keys(graph_cache), function (i, key) {
-                        delete graph_cache[key];
-                    });
-                }
-                graph_cache[url] = data;
+                cache_graph_data(url, data);
                 dfd.resolve(data);
             }).fail(function() {
                 dfd.reject();
@@ -302,6 +380,71 @@ $(document).ready(function() {
         return dfd.promise();
     }
 
+    /*
+      Load graph data from the multi-resolution tiles written by asv
+      publish, for the revision range [min_rev, max_rev] (null for
+      unbounded).  Resolves to the data of the tiles at the coarsest
+      level that has the full tile resolution available for the range,
+      and a flag telling whether the data is at the full resolution.
+     */
+    function load_graph_tiles(url, min_rev, max_rev) {
+        var dfd = $.Deferred();
+        var base = url.replace(/\.json$/, '');
+
+        load_graph_data(base + '.tiles.json').done(function(index) {
+            var levels = index.levels;
+            var level = levels.length - 1;
+            var tiles = [];
+
+            if (levels.length == 0) {
+                /* Empty graph */
+                dfd.resolve(index.overview, true);
+                return;
+            }
+
+            for (var k = 0; k < levels.length; ++k) {
+                /* Visible fraction of the tile resolution */
+                var visible = 0;
+                tiles = [];
+                $.each(levels[k], function(i, bounds) {
+                    var lo = (min_rev === null) ? bounds[0] : Math.max(bounds[0], min_rev);
+                    var hi = (max_rev === null) ? bounds[1] : Math.min(bounds[1], max_rev);
+                    if (lo <= hi) {
+                        tiles.push(i);
+                        visible += (bounds[1] > bounds[0]) ? (hi - lo) / (bounds[1] - bounds[0]) : 1;
+                    }
+                });
+                if (visible >= 0.99) {
+                    level = k;
+                    break;
+                }
+            }
+
+            var complete = (level == levels.length - 1);
+            if (level == 0) {
+                dfd.resolve(index.overview, complete);
+                return;
+            }
+
+            var requests = $.map(tiles, function(i) {
+                return load_graph_data(base + '.tiles/' + level + '-' + i + '.json');
+            });
+            $.when.apply($, requests).done(function() {
+                var data = [];
+                $.each(arguments, function(i, tile) {
+                    data = data.concat(tile);
+                });
+                dfd.resolve(data, complete);
+            }).fail(function() {
+                dfd.reject();
+            });
+        }).fail(function() {
+            dfd.reject();
+        });
+
+        return dfd.promise();
+    }
+
     /*
       Parse hash string, assuming format similar to standard URL
       query strings
@@ -500,6 +643,7 @@ $(document).ready(function() {
     this.param_selection_from_flat_idx = param_selection_from_flat_idx;
     this.graph_to_path = graph_to_path;
     this.load_graph_data = load_graph_data;
+    this.load_graph_tiles = load_graph_tiles;
     this.get_commit_hash = get_commit_hash;
     this.get_revision = get_revision;
 
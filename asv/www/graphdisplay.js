@@ -47,6 +47,8 @@ $(document).ready(function() {
     var end_hash = null;
     var start_revision = null;
     var end_revision = null;
+    /* True when some graphs show low-resolution data */
+    var coarse_data_shown = false;
 
 
     /* UTILITY FUNCTIONS */
@@ -848,11 +850,29 @@ $(document).ready(function() {
             return
         }
 
+        /* Load only the tiles needed for the visible range, or the
+           low-resolution version of the graphs first, if published.
+           More detailed data is loaded when zooming in. */
+        var use_tiles = ($.asv.main_json.graph_tile_points && x_coordinate_axis == 0);
+        var lowres_points = $.asv.main_json.graph_lowres_points;
+        var use_lowres = (lowres_points && x_coordinate_axis == 0 &&
+                          start_revision === null && end_revision === null);
+        coarse_data_shown = false;
+
         current_revisions = [];
         $.each(to_load, function(i, item) {
-            $.asv.load_graph_data(
-                item[0]
-            ).done(function (data) {
+            var request;
+            if (use_tiles) {
+                request = $.asv.load_graph_tiles(item[0], start_revision, end_revision);
+            } else if (use_lowres) {
+                request = $.asv.load_graph_data(item[0].replace(/\.json$/, '.lowres.json'));
+            } else {
+                request = $.asv.load_graph_data(item[0]);
+            }
+            request.done(function (data, complete) {
+                if (use_tiles ? !complete : (use_lowres && data.length >= lowres_points)) {
+                    coarse_data_shown = true;
+                }
                 if (start_revision !== null || end_revision !== null) {
                     data = $.grep(data, function(point) {
                         var rev = point[0];
@@ -1296,6 +1316,11 @@ $(document).ready(function() {
             if (overview) {
                 overview.setSelection(ranges, true);
             }
+
+            // Replace low-resolution data with more detailed data
+            if (coarse_data_shown) {
+                replace_graphs();
+            }
         });
 
         overview_div.off("plotselected");
@@ -0,0 +1,22 @@
+import contextlib
+import io
+
+try:
+    from asv.commands.compare import Compare as CompareCommand
+except ImportError:
+    pass
+
+from .synthetic import SyntheticResults
+
+
+class Compare(SyntheticResults):
+    def time_print_table(self, trees, size):
+        with contextlib.redirect_stdout(io.StringIO()):
+            CompareCommand.print_table(
+                self.conf,
+                self.hashes[0],
+                self.hashes[-1],
+                factor=1.1,
+                split=False,
+                machine='machine0',
+            )
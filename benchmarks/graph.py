@@ -0,0 +1,33 @@
+import random
+
+try:
+    from asv import graph
+except ImportError:
+    pass
+
+
+class SummaryGraph:
+    params = ([1000, 10000], ['numpy', 'python'])
+    param_names = ['revisions', 'backend']
+
+    def setup(self, revisions, backend):
+        rnd = random.Random(1)
+        self.graphs = []
+        for j in range(20):
+            g = graph.Graph('bench', {'param': str(j)})
+            for k in range(revisions):
+                if rnd.random() < 0.9:
+                    g.add_data_point(k, 1 + j + 0.1 * rnd.random())
+            self.graphs.append(g)
+
+        self.np = getattr(graph, 'np', None)
+        if backend == 'numpy' and self.np is None:
+            raise NotImplementedError()
+        if backend == 'python':
+            graph.np = None
+
+    def teardown(self, revisions, backend):
+        graph.np = self.np
+
+    def time_make_summary_graph(self, revisions, backend):
+        graph.make_summary_graph(self.graphs)
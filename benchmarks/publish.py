@@ -0,0 +1,49 @@
+import shutil
+import tempfile
+
+try:
+    from asv import _stats, graph, results
+    from asv.commands.publish import Publish as PublishCommand
+except ImportError:
+    pass
+
+from .synthetic import SyntheticResults
+
+
+class Publish(SyntheticResults):
+    # Graphs cache their steps, so they are rebuilt in setup for each run
+    number = 1
+    repeat = (1, 5, 60.0)
+
+    def setup(self, trees, size):
+        super().setup(trees, size)
+        revisions = {commit_hash: j for j, commit_hash in enumerate(self.hashes)}
+
+        self.graphs = graph.GraphSet()
+        for result in results.iter_results(self.conf.results_dir):
+            for key in result.get_all_result_keys():
+                params = result.get_result_params(key)
+                weights = [_stats.get_weight(s) for s in result.get_result_stats(key, params)]
+                g = self.graphs.get_graph(
+                    key, {'machine': result.params['machine'], 'branch': 'main'}
+                )
+                g.add_data_point(
+                    revisions[result.commit_hash], result.get_result_value(key, params), weights
+                )
+
+        self.tmpdir = tempfile.mkdtemp()
+
+    def teardown(self, trees, size):
+        shutil.rmtree(self.tmpdir)
+
+    def time_publish(self, trees, size):
+        PublishCommand.run(self.conf, pull=False)
+
+    def time_detect_steps(self, trees, size):
+        self.graphs.detect_steps()
+
+    def time_summary_graphs(self, trees, size):
+        list(self.graphs.get_summary_graphs())
+
+    def time_save_graphs(self, trees, size):
+        self.graphs.save(self.tmpdir)
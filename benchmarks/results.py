@@ -0,0 +1,39 @@
+import os
+import shutil
+import tempfile
+
+try:
+    from asv import results
+except ImportError:
+    pass
+
+from .synthetic import SyntheticResults
+
+
+class ResultsIO(SyntheticResults):
+    def setup(self, trees, size):
+        super().setup(trees, size)
+        self.paths = [
+            os.path.join(root, filename)
+            for root, filename, machine in results.iter_results_paths(self.conf.results_dir)
+        ]
+        self.results = [results.Results.load(path) for path in self.paths]
+        self.tmpdir = tempfile.mkdtemp()
+
+    def teardown(self, trees, size):
+        shutil.rmtree(self.tmpdir)
+
+    def time_load(self, trees, size):
+        for path in self.paths:
+            results.Results.load(path)
+
+    def time_save(self, trees, size):
+        for result in self.results:
+            result.save(self.tmpdir)
+
+    def time_iter_results(self, trees, size):
+        for result in results.iter_results(self.conf.results_dir):
+            pass
+
+    def peakmem_iter_results(self, trees, size):
+        list(results.iter_results(self.conf.results_dir))
@@ -0,0 +1,28 @@
+import random
+
+try:
+    from asv import _stats
+except ImportError:
+    pass
+
+
+class MannWhitneyU:
+    params = ([5, 10, 20, 50, 200, 1000], ['auto', 'exact'])
+    param_names = ['size', 'method']
+
+    # Measure cold calls: the cache is cleared in setup
+    number = 1
+    timeout = 300
+
+    def setup(self, size, method):
+        if method == 'exact' and size > 50:
+            raise NotImplementedError()
+
+        _stats._mann_whitney_u_counts.cache_clear()
+
+        rnd = random.Random(1)
+        self.x = [rnd.random() for j in range(size)]
+        self.y = [rnd.random() + 0.1 for j in range(size)]
+
+    def time_mann_whitney_u(self, size, method):
+        _stats.mann_whitney_u(self.x, self.y, method=method)
@@ -1,3 +1,6 @@
+import math
+import random
+
 try:
     from asv import step_detect
 except ImportError:
@@ -20,3 +23,66 @@ class Simple:
 
     def time_solve_potts_approx(self):
         step_detect.solve_potts_approx(self.y, [1] * len(self.y), gamma=0.3)
+
+
+class LargeSeries:
+    params = ([10000, 100000], ['approx', 'pelt'])
+    param_names = ['size', 'method']
+    timeout = 300
+
+    def setup(self, size, method):
+        if not hasattr(step_detect, 'solve_potts_' + method):
+            raise NotImplementedError()
+
+        # Noisy piecewise constant data, with steps every ~1000 points
+        rnd = random.Random(1)
+        self.y = []
+        self.boundaries = []
+        level = 0
+        while len(self.y) < size:
+            level = (level + rnd.randint(1, 4)) % 5
+            self.y += [1 + 0.3 * level + 0.2 * rnd.random() for j in range(rnd.randint(500, 1500))]
+            self.boundaries.append(min(len(self.y), size))
+        del self.y[size:]
+        self.w = [1.0] * size
+
+        mu_dist = step_detect.get_mu_dist(self.y, self.w)
+        self.gamma = 3 * mu_dist.dist(0, size - 1) * math.log(size) / size
+        self.solve = getattr(step_detect, 'solve_potts_' + method)
+
+    def time_solve(self, size, method):
+        self.solve(self.y, self.w, gamma=self.gamma)
+
+    def track_cost(self, size, method):
+        right, values, dists = self.solve(self.y, self.w, gamma=self.gamma)
+        return self.gamma * len(right) + sum(dists)
+
+    track_cost.unit = "cost"
+
+    def track_boundary_error(self, size, method):
+        right, values, dists = self.solve(self.y, self.w, gamma=self.gamma)
+        return sum(min(abs(r - b) for r in right) for b in self.boundaries)
+
+    track_boundary_error.unit = "points"
+
+
+class FlatSeries:
+    params = ([5000, 20000], ['approx', 'pelt'])
+    param_names = ['size', 'method']
+    timeout = 300
+
+    def setup(self, size, method):
+        if not hasattr(step_detect, 'solve_potts_' + method):
+            raise NotImplementedError()
+
+        # Noisy data without steps, for which the PELT pruning is weak
+        rnd = random.Random(1)
+        self.y = [1 + 0.2 * rnd.random() for j in range(size)]
+        self.w = [1.0] * size
+
+        mu_dist = step_detect.get_mu_dist(self.y, self.w)
+        self.gamma = 3 * mu_dist.dist(0, size - 1) * math.log(size) / size
+        self.solve = getattr(step_detect, 'solve_potts_' + method)
+
+    def time_solve(self, size, method):
+        self.solve(self.y, self.w, gamma=self.gamma)
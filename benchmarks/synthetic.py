@@ -0,0 +1,187 @@
+"""
+Synthetic results trees, for benchmarking asv itself at scale.
+"""
+
+import datetime
+import os
+import random
+import subprocess
+
+try:
+    from asv import config, runner, util
+    from asv.results import Results
+except ImportError:
+    pass
+
+
+# Size presets: (machines, commits, benchmarks, params)
+SIZES = {
+    'small': (1, 50, 20, 2),
+    'medium': (2, 200, 50, 5),
+    'large': (3, 500, 50, 4),
+}
+
+COMMIT_TIME_0 = 1600000000
+COMMIT_INTERVAL = 3600
+
+
+def make_repo(path, commits):
+    """
+    Create a git repository with the given number of empty commits on
+    branch main, and return their hashes, oldest first.
+    """
+    os.makedirs(path)
+    subprocess.run(['git', 'init', '-q', '-b', 'main', path], check=True)
+
+    stream = []
+    for j in range(commits):
+        message = f"Commit {j}\n"
+        stream.append(f"commit refs/heads/main\nmark :{j + 1}\n")
+        stream.append(
+            f"committer asv <asv@example.com> {COMMIT_TIME_0 + j * COMMIT_INTERVAL} +0000\n"
+        )
+        stream.append(f"data {len(message)}\n{message}")
+        if j > 0:
+            stream.append(f"from :{j}\n")
+        stream.append("\n")
+
+    subprocess.run(
+        ['git', 'fast-import', '--quiet'],
+        input=''.join(stream).encode('ascii'),
+        cwd=path,
+        check=True,
+    )
+    out = subprocess.run(
+        ['git', 'rev-list', '--reverse', 'main'],
+        cwd=path,
+        check=True,
+        stdout=subprocess.PIPE,
+    ).stdout
+    return out.decode('ascii').split()
+
+
+def make_results_tree(path, machines, commits, benchmarks, params, samples=10, seed=0):
+    """
+    Generate a git repository and a results directory with synthetic
+    results for machines x commits x benchmarks x params.
+
+    Each benchmark series has a few steps, and noisy samples.
+
+    Returns
+    -------
+    hashes : list of str
+        Commit hashes, oldest first.
+
+    """
+    rnd = random.Random(seed)
+    path = os.path.abspath(path)
+    hashes = make_repo(os.path.join(path, 'repo'), commits)
+    results_dir = os.path.join(path, 'results')
+
+    param_values = [repr(str(j)) for j in range(params)]
+    benchmark_list = [
+        {
+            'name': f"suite{k % 10}.time_bench_{k}",
+            'type': 'time',
+            'unit': 'seconds',
+            'params': [param_values],
+            'param_names': ['n'],
+            'version': str(k),
+        }
+        for k in range(benchmarks)
+    ]
+
+    # Piecewise constant base levels, with steps at random commits
+    levels = []
+    for benchmark in benchmark_list:
+        steps = sorted(rnd.randrange(commits) for j in range(3))
+        base = 10 ** rnd.uniform(-6, -1)
+        levels.append([base * (1 + sum(0.3 for s in steps if s <= j)) for j in range(commits)])
+
+    started_at = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+
+    for m in range(machines):
+        machine = f"machine{m}"
+        os.makedirs(os.path.join(results_dir, machine))
+        util.write_json(
+            os.path.join(results_dir, machine, "machine.json"), {'machine': machine, 'version': 1}
+        )
+
+        for j, commit_hash in enumerate(hashes):
+            date = 1000 * (COMMIT_TIME_0 + j * COMMIT_INTERVAL)
+            result = Results(
+                {'machine': machine, 'python': '3.12'},
+                {},
+                commit_hash,
+                date,
+                '3.12',
+                'virtualenv-py3.12',
+                {},
+            )
+            for benchmark, level in zip(benchmark_list, levels):
+                values = [
+                    [level[j] * (1 + p) * (1 + 0.05 * rnd.random()) for s in range(samples)]
+                    for p in range(params)
+                ]
+                value = runner.BenchmarkResult(
+                    result=[min(v) for v in values],
+                    samples=values,
+                    number=[1] * params,
+                    errcode=0,
+                    stderr='',
+                    profile=None,
+                )
+                result.add_result(
+                    benchmark, value, started_at=started_at, duration=1.0, record_samples=True
+                )
+            result.save(results_dir)
+
+    util.write_json(
+        os.path.join(results_dir, "benchmarks.json"),
+        {benchmark['name']: benchmark for benchmark in benchmark_list},
+        api_version=2,
+    )
+
+    return hashes
+
+
+def get_conf(path):
+    """
+    Configuration for a tree made by `make_results_tree`.
+    """
+    path = os.path.abspath(path)
+    return config.Config.from_json(
+        {
+            'project': 'synthetic',
+            'repo': os.path.join(path, 'repo'),
+            'dvcs': 'git',
+            'branches': ['main'],
+            'results_dir': os.path.join(path, 'results'),
+            'html_dir': os.path.join(path, 'html'),
+        }
+    )
+
+
+class SyntheticResults:
+    """
+    Base class for benchmarks on the synthetic results trees.
+
+    The trees for all sizes are generated once in `setup_cache`, which
+    is shared by the subclasses.
+    """
+
+    params = list(SIZES)
+    param_names = ['size']
+    timeout = 600
+
+    def setup_cache(self):
+        trees = {}
+        for size, shape in SIZES.items():
+            trees[size] = make_results_tree(size, *shape)
+        return trees
+
+    setup_cache.timeout = 1800
+
+    def setup(self, trees, size):
+        self.hashes = trees[size]
+        self.conf = get_conf(size)
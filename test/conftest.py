@@ -10,7 +10,7 @@ import selenium
 
 from asv import config, environment, repo, step_detect, util
 from asv.repo import get_repo
-from asv.step_detect import L1Dist
+from asv.step_detect import L1Dist, NumpyL1Dist
 
 from . import tools
 from .test_benchmarks import ASV_CONF_JSON, BENCHMARK_DIR
@@ -439,6 +439,10 @@ def show_fixture(tmpdir, example_results):
 @pytest.fixture(
     params=[
         "python",
+        pytest.param(
+            "numpy",
+            marks=pytest.mark.skipif(step_detect.np is None, reason="numpy required"),
+        ),
         pytest.param(
             "rangemedian",
             marks=pytest.mark.skipif(
@@ -452,15 +456,22 @@ def use_rangemedian(request):
         assert isinstance(step_detect.get_mu_dist([0], [1]), _rangemedian.RangeMedian)
         return True
     else:
+        np = step_detect.np
         step_detect._rangemedian = None
+        if request.param == "python":
+            step_detect.np = None
 
         def restore():
             if HAVE_RANGEMEDIAN:
                 step_detect._rangemedian = _rangemedian
+            step_detect.np = np
 
         request.addfinalizer(restore)
 
-        assert isinstance(step_detect.get_mu_dist([0], [1]), L1Dist)
+        if request.param == "python":
+            assert isinstance(step_detect.get_mu_dist([0], [1]), L1Dist)
+        else:
+            assert isinstance(step_detect.get_mu_dist([0], [1]), NumpyL1Dist)
         return False
 
 
@@ -211,6 +211,58 @@ def test_import_failure_retry(tmpdir, request: pytest.FixtureRequest):
     assert b['time_foo']['number'] == 1
 
 
+def test_discovery_cache(tmpdir, request: pytest.FixtureRequest):
+    tmpdir = str(tmpdir)
+    os.chdir(tmpdir)
+
+    os.makedirs('benchmark')
+    with open(os.path.join('benchmark', '__init__.py'), 'w') as f:
+        f.write("def track_this():\n    return 0\n")
+
+    d = {}
+    d.update(ASV_CONF_JSON)
+    d['env_dir'] = "env"
+    d['environment_type'] = request.config.getoption('environment_type')
+    d['conda_channels'] = ["conda-forge"]
+    d['benchmark_dir'] = 'benchmark'
+    d['repo'] = tools.generate_test_repo(tmpdir, [0]).path
+    d['discovery_cache'] = True
+    conf = config.Config.from_json(d)
+
+    repo = get_repo(conf)
+    envs = list(environment.get_environments(conf, None))
+    commit_hash = repo.get_hash_from_name(repo.get_branch_name())
+
+    b = benchmarks.Benchmarks.discover(conf, repo, envs, [commit_hash])
+    assert list(b) == ['track_this']
+    cache_dir = os.path.join('env', 'asv-discovery-cache')
+    assert len(os.listdir(cache_dir)) == 1
+
+    # Cache hit: the project is not installed
+    def no_install(*args):
+        raise util.UserError("project installed")
+
+    for env in envs:
+        env.install_project = no_install
+    b = benchmarks.Benchmarks.discover(conf, repo, envs, [commit_hash])
+    assert list(b) == ['track_this']
+
+    # Changing the benchmark suite invalidates the cache
+    for env in envs:
+        del env.install_project
+    with open(os.path.join('benchmark', '__init__.py'), 'a') as f:
+        f.write("def track_that():\n    return 0\n")
+    b = benchmarks.Benchmarks.discover(conf, repo, envs, [commit_hash])
+    assert sorted(b) == ['track_that', 'track_this']
+    assert len(os.listdir(cache_dir)) == 2
+
+    # Explicit invalidation
+    for env in envs:
+        env.install_project = no_install
+    with pytest.raises(util.UserError):
+        benchmarks.Benchmarks.discover(conf, repo, envs, [commit_hash], rediscover=True)
+
+
 def test_conf_inside_benchmarks_dir(tmpdir, request: pytest.FixtureRequest):
     # Test that the configuration file can be inside the benchmark suite
 
@@ -403,3 +403,48 @@ def test_compare_fixed_failures(capsys, tmpdir, example_results):
     )
     text, err = capsys.readouterr()
     assert text.strip() == REFERENCE_FIXED_FAIL.strip()
+
+
+def test_compare_fdr_json(capsys, tmpdir, example_results):
+    tmpdir = str(tmpdir)
+    os.chdir(tmpdir)
+
+    conf = config.Config.from_json(
+        {
+            'results_dir': example_results,
+            'repo': tools.generate_test_repo(tmpdir).path,
+            'project': 'asv',
+            'environment_type': "shouldn't matter what",
+        }
+    )
+
+    json_path = join(tmpdir, 'compare.json')
+    tools.run_asv_with_conf(
+        conf,
+        'compare',
+        '22b920c6',
+        'fcf8c079',
+        '--machine=cheetah',
+        '--factor=2',
+        '--environment=py2.7-numpy1.8',
+        '--fdr=0.05',
+        f'--json={json_path}',
+    )
+    text, err = capsys.readouterr()
+
+    # No samples in the results: falls back to CI check, not affected by FDR
+    assert text.strip() == REFERENCE.strip()
+
+    data = util.load_json(json_path, api_version=1)
+    assert data['before'] == '22b920c6'
+    assert data['after'] == 'fcf8c079'
+    assert data['fdr'] == 0.05
+
+    rows = {row['name']: row for row in data['benchmarks']}
+    assert len(rows) == len(data['benchmarks'])
+    assert rows['time_ci_small']['change'] == '+'
+    assert rows['time_ci_small']['ratio'] == 3.0
+    assert rows['time_ci_big']['change'] == ' '
+    assert rows['time_ci_big']['p'] is None
+    assert rows['time_AAA_skip']['before'] is None
+    assert rows['time_with_version_mismatch_other']['change'] == 'x'
@@ -53,3 +53,38 @@ def test_continuous(capfd, basic_conf_2):
         stats = results.get_result_stats('time_examples.TimeSuite.time_example_benchmark_1', [])
         assert stats[0]['repeat'] == 2
     assert result_found
+
+
+def test_continuous_sequential(capfd, basic_conf_2):
+    tmpdir, local, conf, machine_file = basic_conf_2
+
+    python = f"{sys.version_info[0]}.{sys.version_info[1]}"
+    env_type = get_default_environment_type(conf, python)
+    env_spec = ("-E", env_type + ":" + python)
+
+    tools.run_asv_with_conf(
+        conf,
+        'continuous',
+        f"{util.git_default_branch()}^",
+        '--sequential',
+        '--max-rounds=3',
+        '--bench=params_examples.track_find_test',
+        '--bench=time_examples.TimeSuite.time_example_benchmark_1',
+        '--attribute=repeat=1',
+        '--attribute=number=1',
+        '--attribute=warmup_time=0',
+        *env_spec,
+        _machine_file=machine_file,
+    )
+
+    text, err = capfd.readouterr()
+    assert "Settled 2 benchmarks after 2 rounds" in text
+
+    # The track benchmark (in both environments) is settled after two
+    # rounds, the timing benchmark with too few samples runs all rounds
+    assert re.search(r"For.*commit [a-f0-9]+ (<[a-z0-9~^]+> )?\(round 3/3\)", text), text
+    assert "params_examples.track_find_test" in text
+
+    for results in iter_results_for_machine(conf.results_dir, "orangutan"):
+        stats = results.get_result_stats('time_examples.TimeSuite.time_example_benchmark_1', [])
+        assert stats[0]['repeat'] == 3
@@ -2,10 +2,11 @@
 import json
 import os
 import sys
+import zipfile
 
 import pytest
 
-from asv import config, environment, util
+from asv import build_cache, config, environment, util, wheel_install
 from asv.repo import get_repo
 from asv.util import shlex_quote as quote
 
@@ -864,6 +865,199 @@ def test_custom_commands(
         env.install_project(conf, repo, commit_hash)
 
 
+def test_build_cache_eviction(tmpdir):
+    conf = config.Config()
+    conf.build_cache_size = 3
+    conf.build_cache_max_bytes = 250
+    cache = build_cache.BuildCache(conf, str(tmpdir))
+
+    def add(name, size):
+        path = cache.create_cache_dir(name)
+        with open(os.path.join(path, 'wheel'), 'wb') as f:
+            f.write(b'x' * size)
+        cache.finalize_cache_dir(name)
+
+    def set_used(name, t):
+        os.utime(cache._get_cache_dir(name)[1], (t, t))
+
+    add('a', 100)
+    set_used('a', 1000)
+    add('b', 100)
+    set_used('b', 2000)
+    assert cache.get_size() == (2, 200)
+
+    # Hits mark entries as recently used
+    assert cache.get_cache_dir('a') is not None
+
+    # Byte budget evicts the least recently used entry
+    add('c', 100)
+    assert cache.get_cache_dir('b') is None
+    assert cache.get_cache_dir('a') is not None
+    assert cache.get_size() == (2, 200)
+
+    # Count limit
+    conf.build_cache_max_bytes = None
+    cache = build_cache.BuildCache(conf, str(tmpdir.join('2')))
+    for j, name in enumerate('defg'):
+        add(name, 1)
+        set_used(name, 3000 + j)
+    assert cache.get_size() == (3, 3)
+    assert cache.get_cache_dir('d') is None
+
+
+def test_global_build_cache_eviction(tmpdir):
+    conf = config.Config()
+    conf.global_build_cache_dir = str(tmpdir.join('cache'))
+    conf.global_build_cache_size = 1
+    cache = build_cache.GlobalBuildCache(conf)
+
+    def store(key):
+        src = str(tmpdir.join('src-' + key))
+        os.makedirs(src)
+        with open(os.path.join(src, 'wheel'), 'w') as f:
+            f.write(key)
+        cache.store(key, src)
+
+    # Entries locked by a fetch or store elsewhere are not evicted
+    store('a')
+    with cache.lock('a'):
+        store('b')
+    assert cache.get_cache_dir('a') is not None
+
+    store('c')
+    assert cache.get_cache_dir('a') is None
+    assert cache.get_cache_dir('b') is None
+
+    # A failed fetch leaves the destination empty
+    dst = str(tmpdir.join('dst'))
+    os.makedirs(dst)
+    os.makedirs(os.path.join(cache._path, 'c', 'sub'))
+    with open(os.path.join(cache._path, 'c', 'sub', 'wheel'), 'w') as f:
+        f.write('c')
+    with open(os.path.join(dst, 'sub'), 'w') as f:
+        f.write('not a directory')
+    assert not cache.fetch('c', dst)
+    assert os.listdir(dst) == []
+
+
+@pytest.mark.skipif(tools.HAS_PYPY, reason="Flaky on pypy")
+def test_global_build_cache(
+    tmpdir, request: pytest.FixtureRequest, skip_virtualenv: pytest.FixtureRequest
+):
+    # check environments differing only at runtime share builds
+    tmpdir = str(tmpdir)
+
+    dvcs = generate_test_repo(tmpdir, [0], dvcs_type='git')
+
+    build_py = os.path.abspath(os.path.join(tmpdir, 'build.py'))
+    build_log = os.path.abspath(os.path.join(tmpdir, 'build.log'))
+
+    conf = config.Config()
+    conf.env_dir = os.path.join(tmpdir, "env")
+    conf.environment_type = request.config.getoption('environment_type')
+    conf.conda_channels = ["conda-forge"]
+    conf.pythons = [PYTHON_VER1]
+    conf.repo = os.path.abspath(dvcs.path)
+    conf.matrix = {"env_nobuild": {"SOME_VAR": ["1", "2"]}}
+    conf.build_cache_size = 1
+    conf.global_build_cache_dir = os.path.join(tmpdir, "build-cache")
+
+    conf.build_command = [f"python {quote(build_py)} {{build_cache_dir}}"]
+    conf.install_command = ['python -c "pass"']
+    conf.uninstall_command = []
+
+    with open(build_py, 'w') as f:
+        f.write(
+            "import os, sys\n"
+            "with open(os.path.join(sys.argv[1], 'cached'), 'w') as f:\n"
+            "    f.write('data')\n"
+            f"with open({build_log!r}, 'a') as f:\n"
+            "    f.write('built\\n')\n"
+        )
+
+    repo = get_repo(conf)
+    commit_hash = dvcs.get_branch_hashes()[0]
+
+    envs = list(environment.get_environments(conf, None))
+    assert len(envs) == 2
+
+    for env in envs:
+        env.create()
+        env.install_project(conf, repo, commit_hash)
+
+    # Built only once
+    with open(build_log) as f:
+        assert f.read() == "built\n"
+
+    cache_files = [
+        os.path.join(env._path, 'asv-build-cache', commit_hash, 'cached') for env in envs
+    ]
+    for fn in cache_files:
+        with open(fn) as f:
+            assert f.read() == 'data'
+
+    if not WIN:
+        assert os.path.samefile(*cache_files)
+
+    # Different build-time variables give a different key
+    key = envs[0]._get_global_cache_key(commit_hash)
+    assert envs[1]._get_global_cache_key(commit_hash) == key
+    envs[0]._tagged_env_vars = {('build', 'CFLAGS'): '-O0'}
+    assert envs[0]._get_global_cache_key(commit_hash) != key
+
+
+def test_incremental_build_fallback(tmpdir, request: pytest.FixtureRequest):
+    # check a failed incremental build is retried from a clean checkout
+    tmpdir = str(tmpdir)
+
+    dvcs = generate_test_repo(tmpdir, [0, 1], dvcs_type='git')
+    commit_hashes = dvcs.get_branch_hashes()
+
+    build_py = os.path.abspath(os.path.join(tmpdir, 'build.py'))
+    build_log = os.path.abspath(os.path.join(tmpdir, 'build.log'))
+
+    conf = config.Config()
+    conf.env_dir = os.path.join(tmpdir, "env")
+    conf.environment_type = request.config.getoption('environment_type')
+    conf.conda_channels = ["conda-forge"]
+    conf.pythons = [PYTHON_VER2]
+    conf.repo = os.path.abspath(dvcs.path)
+    conf.matrix = {}
+    conf.build_cache_size = 0
+    conf.incremental_build = ['stale']
+
+    conf.build_command = [f"python {quote(build_py)} {{build_dir}} {{build_cache_dir}}"]
+    conf.install_command = ['python -c "pass"']
+    conf.uninstall_command = []
+
+    # The build fails if the build dir has a leftover of a previous build
+    with open(build_py, 'w') as f:
+        f.write(
+            "import os, sys\n"
+            "stale = os.path.join(sys.argv[1], 'stale')\n"
+            "status = 'failed' if os.path.exists(stale) else 'built'\n"
+            f"with open({build_log!r}, 'a') as f:\n"
+            "    f.write(status + '\\n')\n"
+            "if status == 'failed':\n"
+            "    sys.exit(1)\n"
+            "open(stale, 'w').close()\n"
+            "with open(os.path.join(sys.argv[2], 'cached'), 'w') as f:\n"
+            "    f.write('data')\n"
+        )
+
+    repo = get_repo(conf)
+
+    env = next(iter(environment.get_environments(conf, None)))
+    env.create()
+
+    env.install_project(conf, repo, commit_hashes[1])
+    env.install_project(conf, repo, commit_hashes[0])
+    assert env.installed_commit_hash == commit_hashes[0]
+
+    with open(build_log) as f:
+        assert f.read() == "built\nfailed\nbuilt\n"
+
+
 def test_installed_commit_hash(
     tmpdir, request: pytest.FixtureRequest, skip_virtualenv: pytest.FixtureRequest
 ):
@@ -944,6 +1138,73 @@ def test_install_success(
     env.run(['-c', 'import asv_test_repo as t, sys; sys.exit(0 if t.dummy_value == 0 else 1)'])
 
 
+def test_fast_install(tmpdir, request: pytest.FixtureRequest):
+    tmpdir = str(tmpdir)
+
+    dvcs = generate_test_repo(tmpdir, [0, 1], dvcs_type='git')
+    commit_hashes = dvcs.get_branch_hashes()
+
+    conf = config.Config()
+    conf.env_dir = os.path.join(tmpdir, "env")
+    conf.environment_type = request.config.getoption('environment_type')
+    conf.conda_channels = ["conda-forge"]
+    conf.pythons = [PYTHON_VER2]
+    conf.repo = os.path.abspath(dvcs.path)
+    conf.project = "asv_test_repo"
+    conf.matrix = {}
+    conf.fast_install = True
+
+    repo = get_repo(conf)
+
+    env = next(iter(environment.get_environments(conf, None)))
+    env.create()
+
+    commands = []
+    run_commands = env._interpolate_and_run_commands
+
+    def record_commands(cmd, *args, **kwargs):
+        commands.extend(cmd)
+        return run_commands(cmd, *args, **kwargs)
+
+    env._interpolate_and_run_commands = record_commands
+
+    get_info = (
+        'import asv_test_repo as t, glob, os, sys; '
+        'd = glob.glob(os.path.join(os.path.dirname(t.__path__[0]), "asv_test_repo-*.dist-info")); '
+        'sys.stdout.write(f"{t.dummy_value} {len(d)} {open(os.path.join(d[0], \'INSTALLER\')).read()}")'
+    )
+
+    # Nothing to replace yet: installed with pip
+    env.install_project(conf, repo, commit_hashes[1])
+    assert any('pip install' in cmd for cmd in commands)
+    assert env.run(['-c', get_info]).split() == ['0', '1', 'pip']
+
+    # Unpacked directly, replacing the previous version
+    for commit_hash, value in [(commit_hashes[0], '1'), (commit_hashes[1], '0')]:
+        commands.clear()
+        env.install_project(conf, repo, commit_hash)
+        assert not any('pip install' in cmd or 'pip uninstall' in cmd for cmd in commands)
+        assert env.run(['-c', get_info]).split() == [value, '1', 'asv']
+
+
+def test_fast_install_verify(tmpdir):
+    # Corrupt wheels are detected before the installed copy is removed
+    wheel_file = str(tmpdir.join('foo-1.0-py3-none-any.whl'))
+    module = b"x = 1\n"
+    with zipfile.ZipFile(wheel_file, 'w') as zf:
+        zf.writestr('foo.py', module)
+        zf.writestr('foo-1.0.dist-info/METADATA', 'Name: foo\nVersion: 1.0\n')
+        zf.writestr('foo-1.0.dist-info/WHEEL', 'Root-Is-Purelib: true\n')
+        zf.writestr(
+            'foo-1.0.dist-info/RECORD',
+            f"foo.py,{wheel_install.record_hash(b'x = 2')},5\nfoo-1.0.dist-info/RECORD,,\n",
+        )
+
+    wheel = wheel_install.Wheel(wheel_file, 'foo')
+    with pytest.raises(wheel_install.CannotInstall, match="hash mismatch"):
+        wheel.verify()
+
+
 def test_install_env_matrix_values(
     tmpdir, request: pytest.FixtureRequest, skip_virtualenv: pytest.FixtureRequest
 ):
@@ -1149,3 +1410,109 @@ def test_interpolate_multiple_wheels_raises(basic_conf, request):
 
     with pytest.raises(util.UserError, match="Found multiple wheels"):
         env._interpolate_commands(["python -c 'print({wheel_file})'"])
+
+
+def test_environment_templates(tmpdir, dummy_packages, request: pytest.FixtureRequest):
+    from asv.commands.setup import Setup
+
+    if request.config.getoption('environment_type') not in ('virtualenv', 'uv'):
+        pytest.skip("environment templates are only supported by virtualenv and uv")
+
+    conf = config.Config()
+    conf.env_dir = str(tmpdir.join("env"))
+    conf.environment_type = request.config.getoption('environment_type')
+    conf.pythons = [PYTHON_VER2]
+    conf.matrix = {
+        "pip+asv_dummy_test_package_1": [DUMMY1_VERSION],
+        "pip+asv_dummy_test_package_2": DUMMY2_VERSIONS,
+    }
+    conf.environment_templates = True
+
+    environments = list(environment.get_environments(conf, None))
+    assert len(environments) == 2
+
+    templates = environment.get_environment_templates(environments)
+    assert len({template._path for template in templates.values()}) == 1
+    template = next(iter(templates.values()))
+    assert template._requirements == {"pip+asv_dummy_test_package_1": DUMMY1_VERSION}
+
+    Setup.perform_setup(environments, parallel=1)
+
+    # Template is removed after use
+    assert not os.path.exists(template._path)
+
+    for env in environments:
+        assert env.check_presence()
+
+        output = env.run(
+            ['-c', 'import asv_dummy_test_package_1 as p, sys; sys.stdout.write(p.__version__)']
+        )
+        assert output.startswith(DUMMY1_VERSION)
+
+        output = env.run(
+            ['-c', 'import asv_dummy_test_package_2 as p, sys; sys.stdout.write(p.__version__)']
+        )
+        assert output.startswith(env._requirements['pip+asv_dummy_test_package_2'])
+
+    # Common packages are shared with the template
+    package_files = [
+        env.run(['-c', 'import asv_dummy_test_package_1 as p, sys; sys.stdout.write(p.__file__)'])
+        for env in environments
+    ]
+    assert package_files[0] != package_files[1]
+    if not WIN:
+        assert os.path.samefile(*package_files)
+
+    # Existing environments need no templates
+    assert environment.get_environment_templates(environments) == {}
+
+
+@pytest.mark.parametrize(
+    "environment_type",
+    [
+        pytest.param(
+            "virtualenv",
+            marks=pytest.mark.skipif(not HAS_VIRTUALENV, reason="Requires virtualenv"),
+        ),
+        pytest.param("uv", marks=pytest.mark.skipif(not HAS_UV, reason="Requires uv")),
+    ],
+)
+@pytest.mark.parametrize("use_wheelhouse", [False, True])
+def test_install_requirements(tmpdir, environment_type, use_wheelhouse):
+    conf = config.Config()
+    conf.env_dir = str(tmpdir.join("env"))
+    conf.environment_type = environment_type
+    conf.pythons = [PYTHON_VER2]
+    conf.matrix = {
+        "pip+asv_dummy_test_package_1": [DUMMY1_VERSION],
+        "pip+git+https://github.com/asv/dummy.git": [""],
+    }
+    wheelhouse_dir = os.path.abspath(str(tmpdir.join("wheelhouse")))
+    if use_wheelhouse:
+        conf.wheelhouse_dir = wheelhouse_dir
+        index_args = ['--no-index', f'--find-links={wheelhouse_dir}']
+    else:
+        index_args = []
+
+    (env,) = environment.get_environments(conf, None)
+
+    calls = []
+    env._run_pip = lambda args, **kwargs: calls.append(list(args))
+    env._install_requirements()
+
+    assert calls[0] == ['install', '-v'] + index_args + ['wheel', 'pip>=8']
+
+    # Plain requirements in a single call, others separately
+    assert calls[1][: 3 + len(index_args)] == ['install', '-v', '--upgrade'] + index_args
+    assert f'asv_dummy_test_package_1=={DUMMY1_VERSION}' in calls[1]
+    assert 'build' in calls[1]
+    assert calls[2] == ['install', '-v', '--upgrade'] + index_args + [
+        'git+https://github.com/asv/dummy.git'
+    ]
+    assert len(calls) == 3
+
+    calls.clear()
+    env.download_requirements(wheelhouse_dir)
+    assert len(calls) == 1
+    assert calls[0][:6] == ['download', '-v', '-d', wheelhouse_dir, 'wheel', 'pip>=8']
+    assert f'asv_dummy_test_package_1=={DUMMY1_VERSION}' in calls[0]
@@ -1,9 +1,12 @@
 # Licensed under a 3-clause BSD style license - see LICENSE.rst
 
 import os
+import re
 
 import pytest
 
+from asv import runner
+from asv.commands import find
 from asv.util import check_output, git_default_branch, which
 
 from . import tools
@@ -79,6 +82,48 @@ def test_find(capfd, tmpdir):
     assert get_result_files() == prev_result_files
 
 
+@pytest.mark.skipif(tools.HAS_PYPY, reason="Times out randomly on pypy")
+def test_find_parallel(capfd, tmpdir):
+    values = [
+        (1, 1),
+        (1, 1),
+        (1, 1),
+        (None, None),
+        (1, 1),
+        (6, 1),
+        (6, 1),
+        (None, 1),
+        (6, 1),
+        (6, 1),
+    ]
+
+    tmpdir, local, conf, machine_file = generate_basic_conf(
+        tmpdir, values=values, dummy_packages=False
+    )
+
+    tools.run_asv_with_conf(
+        conf,
+        'find',
+        "--parallel=2",
+        f"{git_default_branch()}~9..{git_default_branch()}",
+        "params_examples.track_find_test",
+        _machine_file=machine_file,
+    )
+
+    output, err = capfd.readouterr()
+
+    regression_hash = check_output(
+        [which('git'), 'rev-parse', f'{git_default_branch()}~4'], cwd=conf.repo
+    )
+
+    assert "Running approximately 2 rounds of 2 benchmarks" in output
+    assert "Building 2 commits" in output
+    assert f"Greatest regression found: {regression_hash[:8]}" in output
+
+    # The environment copies are removed
+    assert not [fn for fn in os.listdir(conf.env_dir) if '-find-' in fn]
+
+
 @pytest.mark.skipif(tools.HAS_PYPY, reason="Times out randomly on pypy")
 @pytest.mark.flaky(reruns=1, reruns_delay=5)  # depends on a timeout
 def test_find_timeout(capfd, tmpdir):
@@ -141,3 +186,71 @@ def test_find_inverted(capfd, tmpdir):
 
     formatted = f"Greatest improvement found: {regression_hash[:8]}"
     assert formatted in output
+
+
+@pytest.mark.skipif(tools.HAS_PYPY, reason="Times out randomly on pypy")
+def test_find_extra_rounds(capfd, tmpdir, monkeypatch):
+    values = [(1, 1)] * 5
+
+    tmpdir, local, conf, machine_file = generate_basic_conf(
+        tmpdir, values=values, dummy_packages=False
+    )
+
+    regression_hash = check_output(
+        [which('git'), 'rev-parse', f'{git_default_branch()}^'], cwd=conf.repo
+    ).strip()
+    slow_hashes = {
+        regression_hash,
+        check_output([which('git'), 'rev-parse', git_default_branch()], cwd=conf.repo).strip(),
+    }
+
+    # Noisy benchmark: a single measurement of each commit is the
+    # same, and the regression only shows up when measuring again
+    calls = []
+
+    def run_benchmarks(benchmarks, env, results, append_samples=False, **kwargs):
+        calls.append((results.commit_hash, append_samples))
+        if append_samples:
+            value = 10.0 if results.commit_hash in slow_hashes else 1.0
+            samples = [value] * 15
+        else:
+            samples = [1.0, 2.0, 3.0, 4.0, 5.0]
+        for name, benchmark in benchmarks.items():
+            result = runner.BenchmarkResult(
+                result=[min(samples)] * 2,
+                samples=[samples] * 2,
+                number=[1] * 2,
+                errcode=0,
+                stderr='',
+                profile=None,
+            )
+            results.add_result(
+                benchmark, result, record_samples=True, append_samples=append_samples
+            )
+        return results
+
+    monkeypatch.setattr(find, 'run_benchmarks', run_benchmarks)
+
+    tools.run_asv_with_conf(
+        conf,
+        'find',
+        "--extra-rounds=1",
+        f"{git_default_branch()}~4..{git_default_branch()}",
+        "params_examples.track_find_test",
+        _machine_file=machine_file,
+    )
+
+    output, err = capfd.readouterr()
+
+    # The commits of the first step are measured again, adding samples
+    assert "Differences are not statistically significant, measuring again" in output
+    assert [append for _, append in calls[:6]] == [False] * 3 + [True] * 3
+    assert [h for h, _ in calls[3:6]] == [h for h, _ in calls[:3]]
+
+    assert f"Greatest regression found: {regression_hash[:8]}" in output
+
+    # The confidence is reported from the combined samples
+    match = re.search(r"Confidence: ([0-9.]+)% \(Mann-Whitney U p-value ([0-9.e+-]+)\)", output)
+    assert match is not None
+    assert float(match.group(2)) < 0.002
+    assert float(match.group(1)) == pytest.approx(100 * (1 - float(match.group(2))), abs=0.1)
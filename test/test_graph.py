@@ -1,11 +1,16 @@
 # Licensed under a 3-clause BSD style license - see LICENSE.rst
 
+import json
 import os
+import random
 
-from asv import util
+import pytest
+
+from asv import graph, util
 from asv.graph import (
     RESAMPLED_POINTS,
     Graph,
+    GraphSet,
     _combine_graph_data,
     _fill_missing_data,
     make_summary_graph,
@@ -155,6 +160,21 @@ def test_empty_graph():
     assert data == []
 
 
+def test_graph_trim_edges():
+    g = Graph('foo', {})
+    g.add_data_point(3, None)
+    g.add_data_point(1, None)
+    g.add_data_point(2, 2)
+    g.add_data_point(4, float('nan'))
+    data = g.get_data()
+    assert data == [(2, 2, None)]
+
+    # Non-integer revisions are also accepted
+    g.add_data_point(2.5, 3, 1)
+    data = g.get_data()
+    assert data == [(2, 2, None), (2.5, 3, 1)]
+
+
 def test_nan():
     g = Graph('foo', {})
     g.add_data_point(1, 1)
@@ -183,24 +203,167 @@ def test_summary_graph():
         g.add_data_point(n + i, 0.2)
     g = make_summary_graph([g])
     data = g.get_data()
-    assert len(data) == 512
-    for i in range(256):
-        assert abs(data[i][1] - 0.1) < 1e-7
-        assert abs(data[256 + i][1] - 0.2) < 1e-7
+    assert len(data) == int(RESAMPLED_POINTS)
+    assert data[0][:2] == (0, 0.1)
+    assert data[-1][:2] == (2 * n - 1, 0.2)
+    for x, y, _ in data:
+        assert abs(y - (0.1 if x < n else 0.2)) < 1e-7
 
 
 def test_summary_graph_loop():
     n = int(RESAMPLED_POINTS)
 
-    # Resampling shouldn't get stuck in an infinite loop
+    # Short enough series are not resampled
     g = Graph('foo', {})
     for j in range(n):
         g.add_data_point(j, 0.1)
     g = make_summary_graph([g])
     data = g.get_data()
-    assert len(data) == 1
-    assert data[0][0] == n
-    assert abs(data[0][1] - 0.1) < 1e-7
+    assert len(data) == n
+
+    g = Graph('foo', {})
+    for j in range(n + 1):
+        g.add_data_point(j, 0.1)
+    g = make_summary_graph([g])
+    data = g.get_data()
+    assert len(data) == n
+    assert data[0][0] == 0
+    assert data[-1][0] == n
+
+
+def test_summary_graph_spikes():
+    # Resampling should not average away spikes
+    n = 10 * int(RESAMPLED_POINTS)
+    g = Graph('foo', {})
+    for j in range(n):
+        g.add_data_point(j, 1.0)
+        g.add_data_point(j + n, 3.0)
+    g.add_data_point(n // 3, 3.0)
+    g.add_data_point(n // 2, None)
+    g = make_summary_graph([g])
+    data = g.get_data()
+    assert len(data) == int(RESAMPLED_POINTS)
+    assert (n // 3, 2.0, None) in data
+    assert (n - 1, 1.0, None) in data
+    assert (n, 3.0, None) in data
+
+
+def test_graph_save_lowres(tmpdir):
+    html_dir = str(tmpdir)
+    g = Graph('foo', {})
+    for j in range(1000):
+        g.add_data_point(j, [j % 7, 1.0 if j != 500 else 5.0])
+    g.save(html_dir, lowres_points=50)
+
+    data = util.load_json(os.path.join(html_dir, g.path + ".json"))
+    lowres = util.load_json(os.path.join(html_dir, g.path + ".lowres.json"))
+    assert len(data) == 1000
+    assert 50 <= len(lowres) <= 100
+    assert [500, [3, 5.0]] in lowres
+    assert all(item in data for item in lowres)
+
+    # Short graphs are saved as-is
+    g = Graph('foo', {})
+    g.add_data_point(1, 1)
+    g.add_data_point(2, 2)
+    g.save(html_dir, lowres_points=50)
+    data = util.load_json(os.path.join(html_dir, g.path + ".json"))
+    lowres = util.load_json(os.path.join(html_dir, g.path + ".lowres.json"))
+    assert data == lowres == [[1, 1], [2, 2]]
+
+
+def test_graph_save_tiles(tmpdir):
+    html_dir = str(tmpdir)
+    g = Graph('foo', {})
+    for j in range(1000):
+        g.add_data_point(2 * j, 1.0 if j != 700 else 5.0)
+    g.save(html_dir, tile_points=100)
+
+    index = util.load_json(os.path.join(html_dir, g.path + ".tiles.json"))
+    levels = index['levels']
+    assert [len(bounds) for bounds in levels] == [1, 2, 4, 8, 16]
+    assert levels[0] == [[0, 1998]]
+    assert len(index['overview']) == 100
+    assert [1400, 5.0] in index['overview']
+
+    # The last level contains the full data
+    data = []
+    for i, bounds in enumerate(levels[-1]):
+        tile = util.load_json(os.path.join(html_dir, g.path + ".tiles", f"4-{i}.json"))
+        assert tile[0][0] == bounds[0]
+        assert tile[-1][0] == bounds[1]
+        data += tile
+    assert data == util.load_json(os.path.join(html_dir, g.path + ".json"))
+
+    # Short graphs have only the overview
+    g = Graph('foo', {})
+    g.add_data_point(1, 1)
+    g.save(html_dir, tile_points=100)
+    index = util.load_json(os.path.join(html_dir, g.path + ".tiles.json"))
+    assert index == {'levels': [[[1, 1]]], 'overview': [[1, 1]]}
+
+    # Empty graphs have no levels
+    g = Graph('foo', {})
+    g._save_tiles(html_dir, [], [], [], 100)
+    index = util.load_json(os.path.join(html_dir, g.path + ".tiles.json"))
+    assert index == {'levels': [], 'overview': []}
+
+    with pytest.raises(ValueError):
+        g.save(html_dir, tile_points=0)
+
+
+@pytest.mark.parametrize("bundle", [False, True])
+def test_graphset_save(tmpdir, bundle):
+    html_dir = str(tmpdir)
+    graphs = GraphSet()
+    for name in ['foo', 'bar']:
+        for machine in ['a', 'b']:
+            g = graphs.get_graph(name, {'machine': machine})
+            for j in range(5):
+                g.add_data_point(j, [j, len(name)] if machine == 'a' else j)
+
+    pool = util.get_multiprocessing_pool(2)
+    try:
+        graphs.save(html_dir, pool=pool, bundle=bundle)
+        pool.close()
+        pool.join()
+    finally:
+        pool.terminate()
+
+    for path, g in graphs:
+        expected = [list(item[:2]) for item in g.get_data()]
+        if not bundle:
+            data = util.load_json(os.path.join(html_dir, path + ".json"))
+        else:
+            assert not os.path.exists(os.path.join(html_dir, path + ".json"))
+            filename = os.path.join(html_dir, 'graphs', g.benchmark_name + '.bundle')
+            with open(filename, encoding='utf-8') as f:
+                index = json.loads(f.readline())
+                offset, length = index['/'.join(path.split(os.sep))]
+                f.seek(f.tell() + offset)
+                data = json.loads(f.read(length))
+        assert data == expected
+
+
+@pytest.mark.skipif(graph.np is None, reason="test requires numpy")
+@pytest.mark.parametrize("num_revisions", [50, 2000])
+def test_summary_graph_numpy(num_revisions, monkeypatch):
+    # The vectorized implementation should give identical results
+    rnd = random.Random(1234)
+    graphs = []
+    for j in range(4):
+        g = Graph('foo', {'j': str(j)})
+        for k in rnd.sample(range(num_revisions), num_revisions // 2):
+            values = [rnd.choice([None, rnd.random(), -rnd.random(), 0.0]) for i in range(j + 1)]
+            g.add_data_point(k, values[0] if j == 0 else values)
+        graphs.append(g)
+
+    data = make_summary_graph(graphs).get_data()
+
+    monkeypatch.setattr(graph, 'np', None)
+    expected = make_summary_graph(graphs).get_data()
+
+    assert data == expected
 
 
 def test__fill_missing_data():
@@ -191,6 +191,13 @@ def test_publish_range_spec(generate_result_dir):
         assert set(data['revision_to_hash'].values()) == expected
 
 
+def test_publish_tile_points(generate_result_dir):
+    conf, repo, commits = generate_result_dir(5 * [1])
+    conf.graph_tile_points = 0
+    with pytest.raises(util.UserError, match="graph_tile_points"):
+        tools.run_asv_with_conf(conf, "publish")
+
+
 @pytest.mark.flaky_pypy
 def test_regression_simple(generate_result_dir):
     conf, repo, commits = generate_result_dir(5 * [1] + 5 * [10])
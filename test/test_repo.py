@@ -7,7 +7,7 @@ from os.path import join
 
 import pytest
 
-from asv import config, repo, util
+from asv import config, repo, source_trees, util
 
 try:
     import hglib
@@ -416,6 +416,112 @@ def test_root_ceiling(dvcs_type, tmpdir):
         r.checkout(workcopy_dir, commit2)
 
 
+@pytest.mark.parametrize(
+    'dvcs_type',
+    ["git", pytest.param("hg", marks=pytest.mark.skipif(hglib is None, reason="needs hglib"))],
+)
+def test_incremental_checkout(dvcs_type, tmpdir):
+    tmpdir = str(tmpdir)
+    dvcs = tools.generate_test_repo(tmpdir, [0], dvcs_type=dvcs_type)
+
+    ignore_fn = join(dvcs.path, '.gitignore' if dvcs_type == 'git' else '.hgignore')
+    with open(ignore_fn, 'w') as f:
+        f.write("syntax: glob\nbuild\n" if dvcs_type == 'hg' else "build\n")
+    dvcs.add(ignore_fn)
+    dvcs.commit("Ignore build")
+
+    with open(join(dvcs.path, 'asv_test_repo', '__init__.py'), 'w') as f:
+        f.write("dummy_value = 1\n")
+    dvcs.add(join(dvcs.path, 'asv_test_repo', '__init__.py'))
+    dvcs.commit("Change value")
+
+    commit_b, commit_a = dvcs.get_branch_hashes()[:2]
+
+    conf = config.Config()
+    conf.branches = []
+    conf.dvcs = dvcs_type
+    conf.project = join(tmpdir, "repo")
+    conf.repo = dvcs.path
+    r = repo.get_repo(conf)
+
+    workcopy_dir = join(tmpdir, "workcopy")
+    build_fn = join(workcopy_dir, 'build', 'module.o')
+    untracked_fn = join(workcopy_dir, 'untracked')
+    readme_fn = join(workcopy_dir, 'README')
+
+    r.checkout(workcopy_dir, commit_a)
+    os.makedirs(join(workcopy_dir, 'build'))
+    for fn in (build_fn, untracked_fn):
+        with open(fn, 'w') as f:
+            f.write("data")
+    os.utime(readme_fn, (1000, 1000))
+
+    # Ignored files are kept, and unchanged files not rewritten
+    r.checkout(workcopy_dir, commit_b, incremental=True)
+    assert os.path.isfile(build_fn)
+    assert not os.path.exists(untracked_fn)
+    assert os.stat(readme_fn).st_mtime == 1000
+    with open(join(workcopy_dir, 'asv_test_repo', '__init__.py')) as f:
+        assert f.read() == "dummy_value = 1\n"
+
+    # Only the given paths are kept
+    with open(untracked_fn, 'w') as f:
+        f.write("data")
+    r.checkout(workcopy_dir, commit_a, incremental=['untracked'])
+    assert os.path.isfile(untracked_fn)
+    assert not os.path.exists(build_fn)
+
+    # Non-incremental checkout cleans everything
+    r.checkout(workcopy_dir, commit_a)
+    assert not os.path.exists(untracked_fn)
+
+
+@pytest.mark.parametrize(
+    'dvcs_type',
+    ["git", pytest.param("hg", marks=pytest.mark.skipif(hglib is None, reason="needs hglib"))],
+)
+def test_shared_source_trees(dvcs_type, tmpdir):
+    tmpdir = str(tmpdir)
+    dvcs = tools.generate_test_repo(tmpdir, [0, 1], dvcs_type=dvcs_type)
+    commit_b, commit_a = dvcs.get_branch_hashes()[:2]
+
+    conf = config.Config()
+    conf.branches = []
+    conf.dvcs = dvcs_type
+    conf.project = join(tmpdir, "repo")
+    conf.repo = dvcs.path
+    r = repo.get_repo(conf)
+
+    trees = source_trees.SharedSourceTrees(join(tmpdir, "trees"))
+
+    # Users of the same commit share the tree
+    path_a = trees.acquire(r, "key", commit_a, "env1")
+    assert trees.acquire(r, "key", commit_a, "env2") == path_a
+    assert os.path.isfile(join(path_a, "setup.py"))
+
+    # Trees are removed when no longer used
+    path_b = trees.acquire(r, "key", commit_b, "env1")
+    assert path_b != path_a
+    assert os.path.isdir(path_a)
+    assert trees.acquire(r, "key", commit_b, "env2") == path_b
+    assert not os.path.exists(path_a)
+
+    # Different keys are held independently
+    path_c = trees.acquire(r, "other", commit_a, "env1")
+    assert os.path.isdir(path_b)
+    assert os.path.isfile(join(path_c, "setup.py"))
+
+    trees.release(r, "key", "env1")
+    trees.release(r, "key", "env2")
+    assert not os.path.exists(path_b)
+    assert os.path.isdir(path_c)
+
+    if dvcs_type == "git":
+        worktrees = r._run_git(["worktree", "list", "--porcelain"])
+        assert path_c in worktrees
+        assert path_b not in worktrees
+
+
 @pytest.mark.parametrize(
     'dvcs_type',
     ["git", pytest.param("hg", marks=pytest.mark.skipif(hglib is None, reason="needs hglib"))],
@@ -413,6 +413,61 @@ def test_parallel(basic_conf_2, dummy_packages):
     )
 
 
+def test_run_pipeline(basic_conf, capsys):
+    tmpdir, local, conf, machine_file = basic_conf
+
+    conf.matrix = {}
+    conf.build_cache_size = 1
+
+    tools.run_asv_with_conf(
+        conf,
+        'run',
+        util.git_default_branch(),
+        '--bench',
+        'time_secondary.track_value',
+        '--quick',
+        '--pipeline',
+        _machine_file=machine_file,
+    )
+    text, err = capsys.readouterr()
+
+    # The first commit is installed during benchmark discovery, and the
+    # others built in the background
+    assert "Build cache hit rate: 100% (2/2)" in text
+
+    # Without a CPU split, the builds disturb the measurements
+    assert "run on the same CPUs as the benchmarks" in text
+
+    result_dir = join(tmpdir, 'results_workflow', 'orangutan')
+    assert len([fn for fn in os.listdir(result_dir) if fn != 'machine.json']) == 3
+
+
+def test_run_shared_source_trees(basic_conf):
+    tmpdir, local, conf, machine_file = basic_conf
+
+    conf.matrix = {"env": {"SOME_TEST_VAR": ["1", "2"]}}
+    conf.shared_source_trees = True
+
+    tools.run_asv_with_conf(
+        conf,
+        'run',
+        f"{util.git_default_branch()}~1^!",
+        '--bench',
+        'time_secondary.track_value',
+        '--quick',
+        _machine_file=machine_file,
+    )
+
+    # One source tree, used by both environments
+    trees_dir = join(conf.env_dir, 'asv-source-trees')
+    (refs_fn,) = glob.glob(join(trees_dir, '*.refs'))
+    assert len(util.load_json(refs_fn, api_version=1)['users']) == 2
+    assert os.path.isfile(join(refs_fn[: -len('.refs')], 'setup.py'))
+
+    result_dir = join(tmpdir, 'results_workflow', 'orangutan')
+    assert len([fn for fn in os.listdir(result_dir) if fn != 'machine.json']) == 2
+
+
 def test_filter_date_period(tmpdir, basic_conf):
     tmpdir, local, conf, machine_file = basic_conf
 
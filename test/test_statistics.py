@@ -1,9 +1,10 @@
 # Licensed under a 3-clause BSD style license - see LICENSE.rst
 
+import collections
 import math
 import random
 import warnings
-from itertools import product
+from itertools import combinations, product
 
 import pytest
 from asv_runner.statistics import (
@@ -415,6 +416,39 @@ def test_mann_whitney_u_scipy():
     check(x, y - 2.5)
 
 
+def test_mann_whitney_u_counts():
+    # Compare to brute-force enumeration of orderings
+    for m in range(6):
+        for n in range(6):
+            counts = collections.Counter()
+            for pos in combinations(range(m + n), m):
+                u = sum(p - j for j, p in enumerate(pos))
+                counts[u] += 1
+
+            for u in range(-1, m * n + 2):
+                assert _stats.mann_whitney_u_r(m, n, u) == counts[u], (m, n, u)
+
+
+def test_mann_whitney_u_ties_normal():
+    np = pytest.importorskip("numpy")
+    stats = pytest.importorskip("scipy.stats")
+
+    # Ties within x only, so that U is unambiguous
+    np.random.seed(1)
+    x = np.round(np.random.randn(40), 1)
+    y = np.random.randn(35) + 0.5 + 0.01234
+
+    u0, p0 = stats.mannwhitneyu(
+        x, y, alternative='two-sided', use_continuity=False, method='asymptotic'
+    )
+    u, p = _stats.mann_whitney_u(x.tolist(), y.tolist(), method='normal')
+    assert u == u0
+    assert p == pytest.approx(p0, rel=1e-9, abs=0)
+
+    u, p = _stats.mann_whitney_u([1.0] * 30, [1.0] * 30)
+    assert p == 1.0
+
+
 def test_mann_whitney_u_basic():
     # wilcox.test(a, b, exact=TRUE)
     a = [1, 2, 3, 4]
@@ -436,6 +470,47 @@ def test_mann_whitney_u_basic():
     assert p == pytest.approx(2 / 3, abs=0, rel=1e-10)
 
 
+def test_benjamini_hochberg():
+    # p.adjust(p, method="BH") in R
+    p = [0.01, 0.04, 0.03, 0.005, 0.5]
+    expected = [0.025, 0.05, 0.05, 0.025, 0.5]
+    assert _stats.benjamini_hochberg(p) == pytest.approx(expected, abs=0, rel=1e-12)
+    assert _stats.benjamini_hochberg([]) == []
+
+
+def test_is_different_batch():
+    rnd = random.Random(1)
+    stats = {'ci_99_a': 0, 'ci_99_b': 1}
+
+    same = [[rnd.random() for j in range(10)] for k in range(2)]
+    shifted = [[rnd.random() + 10 * k for j in range(10)] for k in range(2)]
+    # Borderline difference: p = 0.0015
+    borderline = [[float(j) for j in range(10)], [j + 5.5 for j in range(10)]]
+
+    items = [
+        (same[0], same[1], stats, stats),
+        (shifted[0], shifted[1], stats, stats),
+        (borderline[0], borderline[1], stats, stats),
+        (None, None, stats, {'ci_99_a': 2, 'ci_99_b': 3}),
+    ] + [(same[0], same[1], stats, stats)] * 20
+
+    results = _stats.is_different_batch(items)
+    for item, (different, p, p_adjusted) in zip(items, results):
+        assert different == _stats.is_different(*item)
+        if item[0] is None:
+            assert p is None and p_adjusted is None
+        else:
+            assert p >= 0 and p_adjusted >= p
+
+    assert [r[0] for r in results[:4]] == [False, True, True, True]
+    assert results[2][1] < 0.002
+
+    # With FDR control, the borderline result is no longer significant,
+    # given the number of tests
+    results = _stats.is_different_batch(items, fdr=0.01)
+    assert [r[0] for r in results[:4]] == [False, True, False, True]
+
+
 def test_binom():
     for n in range(10):
         for k in range(10):
@@ -1,4 +1,5 @@
 # Licensed under a 3-clause BSD style license - see LICENSE.rst
+import concurrent.futures
 import random
 import sysconfig
 import threading
@@ -15,6 +16,8 @@ from asv.step_detect import (
     solve_potts,
     solve_potts_approx,
     solve_potts_autogamma,
+    solve_potts_pelt,
+    update_steps,
 )
 
 try:
@@ -141,6 +144,66 @@ def test_weighted():
     assert steps_pos == [0, 5, 10, 20, 50, 70]
 
 
+def test_solve_potts_pelt(use_rangemedian):
+    random.seed(1)
+
+    for n in [1, 2, 10, 100]:
+        for noise in [0, 0.3, 1.0]:
+            y = [(j // 13) % 3 + noise * random.random() for j in range(n)]
+            w = [random.choice([0.5, 1, 2]) for j in range(n)]
+
+            for gamma in [0.01, 0.5, 3.0]:
+                expected = solve_potts(y, w, gamma=gamma)
+                assert solve_potts_pelt(y, w, gamma=gamma) == expected
+
+    assert solve_potts_pelt([], [], gamma=1.0) == ([], [], [])
+
+
+@pytest.mark.skipif(step_detect._rangemedian is None, reason="test needs _rangemedian")
+def test_solve_potts_pelt_flat():
+    # Few left edges are pruned from data without steps
+    random.seed(1)
+    n = 10000
+    y = [1 + 0.01 * random.random() for j in range(n)]
+    w = [random.choice([0.5, 1, 2]) for j in range(n)]
+
+    mu_dist = step_detect.get_mu_dist(y, w)
+    right, values, dists = solve_potts_pelt(y, w, gamma=0.1, mu_dist=mu_dist)
+    assert right == [n]
+    assert values == [mu_dist.mu(0, n - 1)]
+    assert dists == pytest.approx([mu_dist.dist(0, n - 1)])
+    assert solve_potts_approx(y, w, gamma=0.1)[0] == right
+
+
+@pytest.mark.skipif(not HAVE_NUMPY, reason="test needs numpy")
+@pytest.mark.parametrize("method", ["approx", "pelt"])
+def test_detect_steps_method(method):
+    np.random.seed(1234)
+    t = np.arange(2000)
+    y = 0.7 * np.random.rand(t.size) + 2.0 * (t >= 1234) - 1.5 * (t >= 1700)
+
+    steps = detect_steps(y.tolist(), method=method)
+    assert [s[:2] for s in steps] == [(0, 1234), (1234, 1700), (1700, 2000)]
+
+    with pytest.raises(ValueError):
+        detect_steps(y.tolist(), method="unknown")
+
+
+@pytest.mark.parametrize("parallel", ["threads", "processes"])
+def test_detect_steps_parallel(use_rangemedian, parallel):
+    random.seed(1)
+    y = [random.random() + 2.0 * (300 <= j < 700) + 1.0 * (j >= 900) for j in range(1200)]
+
+    if parallel == "threads":
+        steps = detect_steps(y, parallel=4)
+    else:
+        with concurrent.futures.ProcessPoolExecutor(2) as executor:
+            steps = detect_steps(y, parallel=executor)
+
+    assert [s[:2] for s in steps] == [s[:2] for s in detect_steps(y)]
+    assert [s[:2] for s in steps] == [(0, 300), (300, 700), (700, 900), (900, 1200)]
+
+
 @pytest.mark.skipif(not HAVE_NUMPY, reason="test needs numpy")
 def test_detect_regressions(use_rangemedian):
     np.random.seed(1234)
@@ -189,6 +252,39 @@ def test_detect_regressions(use_rangemedian):
         assert np.allclose(new_value, 0.7 / 2 - 0.3 + 2, rtol=0.3, atol=0)
 
 
+def test_update_steps(use_rangemedian):
+    random.seed(1)
+
+    y = [random.random() + 3.0 * (j >= 300) for j in range(600)]
+    y[123] = None
+    y[450] = float('nan')
+
+    # Initial fit is a full fit
+    steps, gamma = update_steps(y[:500], None, None, None)
+    assert steps == detect_steps(y[:500])
+    assert [s[:2] for s in steps] == [(0, 300), (300, 500)]
+
+    # Appending data on the same level extends the last segment
+    for n in range(501, 600, 7):
+        steps, gamma2 = update_steps(y[:n], None, steps, gamma)
+        assert gamma2 == gamma
+        assert [s[:2] for s in steps] == [(0, 300), (300, n)]
+        assert steps[-1][2:] == detect_steps(y[300:n])[0][2:]
+
+    # No new data
+    assert update_steps(y[:n], None, steps, gamma) == (steps, gamma)
+
+    # New step in the appended data: full refit
+    y2 = y[:n] + [random.random() + 8.0 for j in range(30)]
+    steps2, gamma2 = update_steps(y2, None, steps, gamma)
+    assert (steps2, gamma2) == step_detect._detect_steps(y2, None)
+    assert [s[:2] for s in steps2] == [(0, 300), (300, n), (n, n + 30)]
+
+    # Too much new data: full refit
+    steps2, gamma2 = update_steps(y, None, steps[:1], gamma, window=100)
+    assert (steps2, gamma2) == step_detect._detect_steps(y, None)
+
+
 def test_golden_search():
     def f(x):
         return 1 + x**3 + x**4
@@ -253,6 +349,32 @@ def test_l1dist(use_rangemedian):
                 assert abs(d - d2) < 1e-10, (i, j)
 
 
+@pytest.mark.skipif(not HAVE_NUMPY, reason="test needs numpy")
+def test_numpy_l1dist():
+    random.seed(1)
+
+    y = [
+        random.choice([0, 1, 2, 2.5, 3]) + random.gauss(0, 0.1) * (j % 3 == 0) for j in range(300)
+    ]
+    w = [random.choice([0.5, 1, 2]) for j in range(len(y))]
+
+    expected = step_detect.L1Dist(y, w)
+    dist = step_detect.NumpyL1Dist(y, w)
+
+    for min_size, max_size in [(1, 20), (3, 40), (1, 200)]:
+        for gamma in [0.01, 0.1, 1.0]:
+            p = dist.find_best_partition(gamma, min_size, max_size, 5, len(y) - 5)
+            p2 = step_detect._find_best_partition(
+                expected, gamma, min_size, max_size, 5, len(y) - 5
+            )
+            assert p == p2
+
+    for l in range(len(y)):
+        for r in range(l, min(l + 60, len(y))):
+            assert dist.mu(l, r) == expected.mu(l, r), (l, r)
+            assert abs(dist.dist(l, r) - expected.dist(l, r)) < 1e-10, (l, r)
+
+
 @pytest.mark.skipif(
     sysconfig.get_config_var("Py_GIL_DISABLED") != 1,
     reason="test requires a free-threaded Python build",
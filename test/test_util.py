@@ -621,6 +621,25 @@ def test_construct_pip_call(declaration, expected_result):
     assert result() == expected_result
 
 
+def test_construct_pip_batch_call():
+    declarations = ["numpy 1.23", "scipy>=1.10", "six", "-e ./localpackage/", "--pre pandas"]
+    parsed_declarations = [util.ParsedPipDeclaration(d) for d in declarations]
+
+    batch = [d for d in parsed_declarations if util.can_batch_pip_declaration(d)]
+    assert [d.pkgname for d in batch] == ["numpy", "scipy", "six"]
+
+    result = util.construct_pip_batch_call(pip_caller, batch, ["--no-index"])
+    assert result() == [
+        "install",
+        "-v",
+        "--upgrade",
+        "--no-index",
+        "numpy==1.23",
+        "scipy>=1.10",
+        "six",
+    ]
+
+
 @pytest.mark.parametrize(
     "arg, new_version, expected",
     [
@@ -457,3 +457,72 @@ def test_web_graph_hash_range_to_url(browser, basic_html):
             browser.find_element(By.ID, 'range').get_attribute('value')
             == f'{short_start}..{short_end}'
         )
+
+
+@pytest.mark.flaky(reruns=1, reruns_delay=5)
+def test_web_graph_bundles(browser, basic_html, tmpdir):
+    html_dir, dvcs = basic_html
+    basedir = dirname(html_dir)
+
+    # Republish the results with the graphs bundled
+    conf = config.Config.from_json(
+        {
+            'results_dir': join(basedir, 'results_workflow'),
+            'html_dir': join(str(tmpdir), 'html'),
+            'repo': join(basedir, 'repo'),
+            'dvcs': 'git',
+            'project': 'asv',
+            'graph_bundles': True,
+            'graph_lowres_points': 2,
+            'graph_tile_points': 2,
+        }
+    )
+    tools.run_asv_with_conf(conf, 'publish')
+
+    graph_dir = join(conf.html_dir, 'graphs')
+    graph_url = None
+    summary_url = None
+    for root, dirs, files in os.walk(graph_dir):
+        rel = os.path.relpath(root, conf.html_dir).replace(os.sep, '/')
+        if 'params_examples.track_find_test.lowres.json' in files:
+            assert 'params_examples.track_find_test.json' not in files
+            assert 'params_examples.track_find_test.tiles.json' in files
+            graph_url = rel + '/params_examples.track_find_test.json'
+        if 'summary.json' in files and rel != 'graphs/summary':
+            summary_url = rel + '/summary.json'
+    assert graph_url is not None
+    assert summary_url is not None
+
+    with tools.preview(conf.html_dir) as base_url:
+        get_with_retry(browser, f'{base_url}#params_examples.track_find_test')
+        browser.find_element(By.CSS_SELECTOR, 'canvas.flot-base')
+
+        # The low-resolution graphs, tiles and summary list graphs are
+        # not in the bundles
+        sizes = browser.execute_async_script(
+            "var done = arguments[arguments.length - 1];"
+            "var url = arguments[0];"
+            "$.when($.asv.load_graph_data(url),"
+            "       $.asv.load_graph_data(url.replace(/\\.json$/, '.lowres.json')),"
+            "       $.asv.load_graph_tiles(url, null, null),"
+            "       $.asv.load_graph_data(arguments[1]))"
+            ".done(function(full, lowres, tiles, summary) {"
+            "    done([full.length, lowres.length, tiles[0].length, summary.length]);"
+            "}).fail(function() { done(null); });",
+            graph_url,
+            summary_url,
+        )
+        assert sizes is not None
+        full_size, lowres_size, tiles_size, summary_size = sizes
+        assert 0 < lowres_size <= full_size
+        assert tiles_size > 0
+        assert summary_size > 0
+
+        # The summary list loads its graphs
+        get_with_retry(browser, base_url)
+        browser.find_element(By.LINK_TEXT, 'Benchmark list').click()
+        base_link = browser.find_element(By.LINK_TEXT, 'params_examples.track_find_test')
+        cur_row = base_link.find_element(By.XPATH, '../..')
+        assert re.match(r'params_examples\.track_find_test \([12]\) 2\.00', cur_row.text), (
+            cur_row.text
+        )